@@ -1,12 +1,43 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes.reviews import router as review_router
+from app.services.converters.executor import conversion_executor
+from app.services.storage import evict_expired_jobs, get_job_store
+from app.review_engine.scheduler import review_scheduler
+from app.config import JOB_EVICTION_INTERVAL_SECONDS
+
+
+async def evict_jobs_periodically():
+    """Remove expired jobs and their files at a fixed interval"""
+    while True:
+        try:
+            await asyncio.to_thread(evict_expired_jobs)
+        except Exception:
+            logging.exception("Job eviction failed")
+        await asyncio.sleep(JOB_EVICTION_INTERVAL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the job store before the first request rather than during it
+    await asyncio.to_thread(get_job_store)
+    eviction_task = asyncio.create_task(evict_jobs_periodically())
+    yield
+    eviction_task.cancel()
+    await review_scheduler.shutdown()
+    # Stop the PDF conversion worker processes
+    conversion_executor.shutdown()
+
 
 # Create FastAPI application
 app = FastAPI(
     title="Deep Critic",
     description="API for reviewing academic papers using multiple LLMs",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -1,16 +1,42 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+import asyncio
+import json
+import mimetypes
+import re
 from app.review_engine.orchestrator import ReviewEngine
 from app.review_engine.aggregator import Review
 from app.review_engine.prompt import PROMPT, UPDATE_REVIEW_PROMPT
+from app.review_engine.scheduler import (
+    INTERACTIVE,
+    PRIORITIES,
+    SchedulerFull,
+    review_scheduler,
+)
+import os
 from app.services.storage import (
     create_job,
     update_job_status,
+    transition_job_status,
     get_job,
     save_markdown,
     load_markdown,
+    save_review_result,
+    load_review_result,
+    store_pdf,
+    STORAGE_DIR,
+    get_images_dir,
 )
-from app.services.converters.pdf import convert_pdf_bytes_to_markdown
+from app.services.converters.cache import conversion_cache, convert_pdf_cached
+from app.services.converters.executor import ConversionQueueFull, conversion_executor
+from app.services.converters.images import extract_images, has_manifest, load_manifest
+from app.services.cache import review_cache
+from app.services.llm.health import health_stats
+from app.services.llm.ratelimit import limiter_stats
+from app.services.uploads import UploadTooLarge, spool_upload
 from pydantic import BaseModel
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Literal, Optional
 
 router = APIRouter()
 
@@ -22,25 +48,177 @@ class PaperTextRequest(BaseModel):
     paper_text: str
 
 
-async def process_pdf_in_background(job_id: str, content: bytes):
+class ReviewJobRequest(BaseModel):
+    paper_text: str
+    priority: Literal["interactive", "bulk"] = "interactive"
+
+
+def raise_review_busy(e: SchedulerFull):
+    raise HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def run_review(
+    paper_text: str,
+    on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+) -> dict:
+    """
+    Run a review through the scheduler in the interactive lane and wait for it.
+
+    With a quorum configured the result may be partial; on_complete is then
+    called with the complete result once the late reviews are in.
+    """
+    try:
+        return await review_scheduler.run(
+            lambda: review_engine.process_text(paper_text, on_complete), INTERACTIVE
+        )
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode a review engine event as a server-sent event"""
+    data = json.dumps(jsonable_encoder(event))
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+def stream_review(
+    paper_text: str,
+    on_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+    cancel_on_disconnect: bool = True,
+) -> StreamingResponse:
+    """
+    Run a review through the scheduler and stream its events as they happen.
+
+    The review runs in a scheduler worker like any other interactive review;
+    its events are handed to the response through a queue. on_done and
+    on_error run in a worker thread, so they may block on storage.
+
+    Args:
+        paper_text: The text content of the paper
+        on_done: Called with the final result when the review completes,
+            and before that with the partial result if a quorum is met
+        on_error: Called with the exception if the review fails
+        cancel_on_disconnect: Stop the review if the client goes away. When
+            False, the review runs to completion so on_done can store it
+
+    Raises:
+        HTTPException: 429 if the scheduler queue is full
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    review_task: Optional[asyncio.Task] = None
+
+    async def review():
+        try:
+            async for event in review_engine.process_text_stream(paper_text):
+                if event["event"] in ("partial", "done") and on_done is not None:
+                    await asyncio.to_thread(on_done, jsonable_encoder(event["result"]))
+                events.put_nowait(event)
+        except Exception as e:
+            if on_error is not None:
+                await asyncio.to_thread(on_error, e)
+            events.put_nowait({"event": "error", "error": str(e)})
+
+    async def produce():
+        nonlocal review_task
+        # Run the review in its own task so a disconnect can cancel it
+        # without cancelling the scheduler worker
+        review_task = asyncio.ensure_future(review())
+        try:
+            await asyncio.wait({review_task})
+        finally:
+            review_task.cancel()
+            events.put_nowait(None)
+
+    try:
+        future = review_scheduler.submit(produce, INTERACTIVE)
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            yield format_sse({"event": "queued", **review_scheduler.stats()})
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            if cancel_on_disconnect:
+                future.cancel()
+                if review_task is not None:
+                    review_task.cancel()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def review_job_in_background(job_id: str, paper_text: str):
+    """Scheduled task that reviews a job's text and stores the result"""
+    await asyncio.to_thread(update_job_status, job_id, "reviewing")
+
+    async def on_complete(result: Dict[str, Any]):
+        # Late reviews of a partial result
+        await asyncio.to_thread(save_review_result, job_id, jsonable_encoder(result))
+
+    try:
+        result = await review_engine.process_text(paper_text, on_complete)
+        # Not saved over the complete result if the late reviews won the race
+        await asyncio.to_thread(save_review_result, job_id, jsonable_encoder(result))
+        await asyncio.to_thread(update_job_status, job_id, "reviewed")
+    except Exception as e:
+        await asyncio.to_thread(
+            update_job_status, job_id, "review_failed", error=str(e)
+        )
+
+
+async def process_pdf_in_background(job_id: str, pdf_path: str, pdf_sha256: str):
     """Background task to process PDF and store results"""
     try:
-        # Convert PDF to markdown
-        markdown_text, images = convert_pdf_bytes_to_markdown(content)
+        # Convert PDF to markdown in the conversion process pool
+        markdown_text, images = await convert_pdf_cached(pdf_path, pdf_sha256)
 
         # Save markdown to file
         file_path = save_markdown(job_id, markdown_text)
 
         # Update job status
-        update_job_status(
+        await asyncio.to_thread(
+            update_job_status,
             job_id,
             "completed",
             markdown_path=file_path,
+            pdf_path=pdf_path,
+            pdf_sha256=pdf_sha256,
             image_count=len(images) if images else 0,
         )
     except Exception as e:
         # Handle errors
-        update_job_status(job_id, "failed", error=str(e))
+        await asyncio.to_thread(update_job_status, job_id, "failed", error=str(e))
+
+
+def raise_conversion_busy():
+    raise HTTPException(
+        status_code=503,
+        detail="Too many documents are being converted, please retry shortly",
+        headers={"Retry-After": "10"},
+    )
+
+
+async def receive_pdf(pdf_file: UploadFile):
+    """Stream an uploaded PDF to disk, enforcing the upload size limit"""
+    try:
+        return await spool_upload(pdf_file, str(STORAGE_DIR))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to read PDF: {str(e)}")
 
 
 @router.post("/upload-pdf")
@@ -61,17 +239,21 @@ async def upload_pdf(
     if not pdf_file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    # Read PDF content
-    try:
-        content = await pdf_file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read PDF: {str(e)}")
+    # Reject early rather than queueing work we cannot start soon
+    if conversion_executor.is_full():
+        raise_conversion_busy()
+
+    # Stream the PDF to disk so conversion workers can read it from there
+    upload = await receive_pdf(pdf_file)
 
     # Create a job to track the processing
-    job_id = create_job(pdf_file.filename)
+    job_id = await asyncio.to_thread(create_job, pdf_file.filename)
+    pdf_path = store_pdf(job_id, upload.path)
 
     # Add processing to background tasks
-    background_tasks.add_task(process_pdf_in_background, job_id, content)
+    background_tasks.add_task(
+        process_pdf_in_background, job_id, pdf_path, upload.sha256
+    )
 
     # Return job ID for status checking
     return {"job_id": job_id, "status": "processing"}
@@ -92,13 +274,17 @@ async def upload_markdown(request: PaperTextRequest):
         raise HTTPException(status_code=400, detail="Paper text is required")
 
     # Create a job (already completed since no processing needed)
-    job_id = create_job("direct_text_input.md", job_type="markdown_upload")
+    job_id = await asyncio.to_thread(
+        create_job, "direct_text_input.md", job_type="markdown_upload"
+    )
 
     # Save the markdown
     file_path = save_markdown(job_id, request.paper_text)
 
     # Mark as completed immediately
-    update_job_status(job_id, "completed", markdown_path=file_path)
+    await asyncio.to_thread(
+        update_job_status, job_id, "completed", markdown_path=file_path
+    )
 
     return {"job_id": job_id, "status": "completed"}
 
@@ -106,7 +292,7 @@ async def upload_markdown(request: PaperTextRequest):
 @router.get("/job-status/{job_id}")
 async def check_job_status(job_id: str):
     """Check the status of a processing job"""
-    job = get_job(job_id)
+    job = await asyncio.to_thread(get_job, job_id)
     if job.get("status") == "not_found":
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -122,13 +308,81 @@ async def check_job_status(job_id: str):
     }
 
 
+@router.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss counters of the LLM review cache and the PDF conversion cache"""
+    return {
+        "reviews": review_cache.stats(),
+        "conversions": conversion_cache.stats(),
+    }
+
+
+async def get_image_manifest(job_id: str) -> list:
+    """Load a job's image manifest, extracting the images on first use"""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job.get("status") == "not_found":
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not job.get("pdf_sha256"):
+        raise HTTPException(status_code=404, detail="No PDF available for this job")
+
+    images_dir = get_images_dir(job["pdf_sha256"])
+    if has_manifest(images_dir):
+        # Mark the images as recently used so eviction keeps them
+        os.utime(images_dir)
+        return load_manifest(images_dir)
+
+    try:
+        return await conversion_executor.run(
+            extract_images, job["pdf_path"], images_dir
+        )
+    except ConversionQueueFull:
+        raise_conversion_busy()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to extract images: {str(e)}"
+        )
+
+
+@router.get("/images/{job_id}")
+async def list_images(job_id: str):
+    """List the distinct images of an uploaded PDF"""
+    manifest = await get_image_manifest(job_id)
+    return {"job_id": job_id, "images": manifest}
+
+
+@router.get("/images/{job_id}/{image_id}")
+async def get_image(job_id: str, image_id: str):
+    """Serve a single extracted image"""
+    if not re.fullmatch(r"[0-9a-f]{64}", image_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    manifest = await get_image_manifest(job_id)
+    image = next((image for image in manifest if image["id"] == image_id), None)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    job = await asyncio.to_thread(get_job, job_id)
+    path = f"{get_images_dir(job['pdf_sha256'])}/{image_id}.{image['ext']}"
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return FileResponse(path, media_type=media_type)
+
+
 @router.post("/review-document/{job_id}")
 async def review_document(job_id: str):
-    job = get_job(job_id)
+    job = await asyncio.to_thread(get_job, job_id)
     if job.get("status") == "not_found":
         raise HTTPException(status_code=404, detail="Job not found")
 
-    if job.get("status") != "completed":
+    try:
+        review_scheduler.check_admission(INTERACTIVE)
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+    # Claim the job atomically so concurrent requests cannot review it twice
+    if not await asyncio.to_thread(
+        transition_job_status, job_id, ["completed"], "reviewing"
+    ):
+        job = await asyncio.to_thread(get_job, job_id)
         raise HTTPException(
             status_code=400,
             detail=f"Document processing not complete. Current status: {job.get('status')}",
@@ -139,18 +393,197 @@ async def review_document(job_id: str):
         if not markdown_text:
             raise HTTPException(status_code=400, detail="Document content not found")
 
-        result = await review_engine.process_text(markdown_text)
+        async def on_complete(late_result: Dict[str, Any]):
+            # Late reviews of a partial result
+            await asyncio.to_thread(
+                save_review_result, job_id, jsonable_encoder(late_result)
+            )
+
+        result = await run_review(markdown_text, on_complete)
 
         # Explicitly convert consensus_review to dict
         if isinstance(result.get('consensus_review'), Review):
             result['consensus_review'] = vars(result['consensus_review'])
 
-        update_job_status(job_id, "reviewed")
+        # Not saved over the complete result if the late reviews won the race
+        await asyncio.to_thread(save_review_result, job_id, jsonable_encoder(result))
+        await asyncio.to_thread(update_job_status, job_id, "reviewed")
         return result
+    except HTTPException as e:
+        if e.status_code == 429:
+            # The scheduler filled up before the review started; hand the
+            # job back so the client can retry after Retry-After
+            await asyncio.to_thread(
+                update_job_status,
+                job_id,
+                "completed",
+                completed_at=job.get("completed_at"),
+            )
+        else:
+            await asyncio.to_thread(
+                update_job_status, job_id, "review_failed", error=str(e.detail)
+            )
+        raise
     except Exception as e:
-        update_job_status(job_id, "review_failed", error=str(e))
+        await asyncio.to_thread(
+            update_job_status, job_id, "review_failed", error=str(e)
+        )
         raise HTTPException(status_code=500, detail=f"Review process failed: {str(e)}")
 
+
+@router.post("/review-jobs", status_code=202)
+async def submit_review_job(request: ReviewJobRequest):
+    """
+    Queue paper text for review and return immediately.
+
+    Args:
+        request: JSON request containing paper_text and an optional priority
+            ('interactive' or 'bulk')
+
+    Returns:
+        Dictionary with the job ID to poll at GET /review-jobs/{job_id}
+    """
+    if not request.paper_text:
+        raise HTTPException(status_code=400, detail="Paper text is required")
+
+    priority = PRIORITIES[request.priority]
+    try:
+        review_scheduler.check_admission(priority)
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+    job_id = await asyncio.to_thread(
+        create_job, "direct_text_input.md", job_type="review"
+    )
+    save_markdown(job_id, request.paper_text)
+    await asyncio.to_thread(update_job_status, job_id, "queued")
+    review_scheduler.submit(
+        lambda: review_job_in_background(job_id, request.paper_text), priority
+    )
+
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.post("/review-jobs/{job_id}", status_code=202)
+async def submit_document_review_job(
+    job_id: str, priority: Literal["interactive", "bulk"] = "interactive"
+):
+    """Queue an uploaded document for review and return immediately"""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job.get("status") == "not_found":
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    lane = PRIORITIES[priority]
+    try:
+        review_scheduler.check_admission(lane)
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+    if not await asyncio.to_thread(
+        transition_job_status, job_id, ["completed"], "queued"
+    ):
+        job = await asyncio.to_thread(get_job, job_id)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Document processing not complete. Current status: {job.get('status')}",
+        )
+
+    markdown_text = load_markdown(job_id)
+    review_scheduler.submit(
+        lambda: review_job_in_background(job_id, markdown_text), lane
+    )
+
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/review-jobs/{job_id}")
+async def get_review_job(job_id: str):
+    """
+    Poll a queued review, including the result once it is done.
+
+    With a quorum configured the result may be partial ("partial": true);
+    it is replaced by the complete result when the late reviews are in.
+    """
+    job = await asyncio.to_thread(get_job, job_id)
+    if job.get("status") == "not_found":
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = load_review_result(job_id) if job.get("status") == "reviewed" else None
+    return {
+        "job_id": job_id,
+        "status": job.get("status"),
+        "error": job.get("error"),
+        "result": result,
+    }
+
+
+@router.get("/review-queue")
+async def review_queue_stats():
+    """Current load of the review scheduler, provider rate limiters and reviewers,
+    and provider health"""
+    return {
+        **review_scheduler.stats(),
+        "rate_limits": limiter_stats(),
+        "health": health_stats(),
+        "reviewers": {
+            reviewer.name: reviewer.stats() for reviewer in review_engine.registry
+        },
+    }
+
+@router.post("/review-stream")
+async def review_text_stream(request: PaperTextRequest):
+    """
+    Review paper text and stream results as server-sent events.
+
+    Each reviewer's scores are sent as soon as they appear in the model's
+    output and its review as soon as the model finishes, followed by stage
+    timings, the consensus review, and a final "done" event carrying the same
+    result as POST /review.
+    """
+    if not request.paper_text:
+        raise HTTPException(status_code=400, detail="Paper text is required")
+
+    return stream_review(request.paper_text)
+
+
+@router.get("/review-document/{job_id}/stream")
+async def review_document_stream(job_id: str):
+    """Review an uploaded document, streaming results as server-sent events"""
+    job = await asyncio.to_thread(get_job, job_id)
+    if job.get("status") == "not_found":
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        review_scheduler.check_admission(INTERACTIVE)
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+    markdown_text = load_markdown(job_id)
+    if not markdown_text:
+        raise HTTPException(status_code=400, detail="Document content not found")
+
+    if not await asyncio.to_thread(
+        transition_job_status, job_id, ["completed"], "reviewing"
+    ):
+        job = await asyncio.to_thread(get_job, job_id)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Document processing not complete. Current status: {job.get('status')}",
+        )
+
+    def on_done(result: Dict[str, Any]):
+        save_review_result(job_id, result)
+        update_job_status(job_id, "reviewed")
+
+    def on_error(e: Exception):
+        update_job_status(job_id, "review_failed", error=str(e))
+
+    # Keep reviewing after a disconnect so the result can still be fetched
+    # from GET /review-jobs/{job_id}
+    return stream_review(
+        markdown_text, on_done=on_done, on_error=on_error, cancel_on_disconnect=False
+    )
+
 # Keep original endpoints for backward compatibility
 
 
@@ -161,18 +594,31 @@ async def upload_and_review(pdf_file: UploadFile = File(...)):
     if not pdf_file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    # Read PDF content
+    if conversion_executor.is_full():
+        raise_conversion_busy()
     try:
-        content = await pdf_file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read PDF: {str(e)}")
+        review_scheduler.check_admission(INTERACTIVE)
+    except SchedulerFull as e:
+        raise_review_busy(e)
+
+    # Stream the PDF to disk so conversion workers can read it from there
+    upload = await receive_pdf(pdf_file)
 
     try:
         # Process the PDF through the review engine
-        result = await review_engine.process_pdf(content)
+        result = await review_scheduler.run(
+            lambda: review_engine.process_pdf(upload.path, upload.sha256),
+            INTERACTIVE,
+        )
         return result
+    except SchedulerFull as e:
+        raise_review_busy(e)
+    except ConversionQueueFull:
+        raise_conversion_busy()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Review process failed: {str(e)}")
+    finally:
+        os.unlink(upload.path)
 
 
 @router.post("/review")
@@ -183,7 +629,9 @@ async def review_text(request: PaperTextRequest):
 
     try:
         # Process the text through the review engine
-        result = await review_engine.process_text(request.paper_text)
+        result = await run_review(request.paper_text)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Review process failed: {str(e)}")
@@ -1,6 +1,7 @@
 """
 Application configuration constants
 """
+import json
 import os
 from dotenv import load_dotenv
 
@@ -17,4 +18,172 @@ API_PREFIX = "/api"
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
 # Debug mode
-DEBUG = os.getenv("DEBUG", "False").lower() in ["true", "1", "yes"]
\ No newline at end of file
+DEBUG = os.getenv("DEBUG", "False").lower() in ["true", "1", "yes"]
+
+# Reviewer registry. REVIEWERS is a JSON list of reviewer backends, e.g.
+# [{"name": "gpt-4o", "provider": "openai", "model": "gpt-4o", "max_in_flight": 4}]
+# Reviewers may also set "temperature", "max_connections", "timeout", "hedge"
+# and "hedge_fallback" (the name of another reviewer to send duplicates to).
+# When unset, one reviewer per provider is configured from the *_MODEL variables.
+REVIEWERS = os.getenv("REVIEWERS", "")
+
+# Default limits applied to reviewers that do not set their own
+REVIEWER_MAX_IN_FLIGHT = int(os.getenv("REVIEWER_MAX_IN_FLIGHT", "4"))
+REVIEWER_MAX_CONNECTIONS = int(os.getenv("REVIEWER_MAX_CONNECTIONS", "8"))
+
+# Directory for uploaded documents, converted markdown and caches
+STORAGE_DIR = os.getenv("STORAGE_DIR", "./tmp_storage")
+
+# Job store: "sqlite" (shared by all workers, survives restarts) or "memory".
+# Jobs and their files are evicted JOB_TTL_SECONDS after creation, unless they
+# are still being converted or reviewed.
+JOB_STORE = os.getenv("JOB_STORE", "sqlite")
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(STORAGE_DIR, "jobs.sqlite3"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+JOB_EVICTION_INTERVAL_SECONDS = int(os.getenv("JOB_EVICTION_INTERVAL_SECONDS", "600"))
+
+# Review cache: an in-memory LRU tier in front of an on-disk tier
+REVIEW_CACHE_ENABLED = os.getenv("REVIEW_CACHE_ENABLED", "True").lower() in ["true", "1", "yes"]
+REVIEW_CACHE_MEMORY_ITEMS = int(os.getenv("REVIEW_CACHE_MEMORY_ITEMS", "256"))
+REVIEW_CACHE_DIR = os.getenv("REVIEW_CACHE_DIR", os.path.join(STORAGE_DIR, "review_cache"))
+REVIEW_CACHE_MAX_BYTES = int(os.getenv("REVIEW_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+REVIEW_CACHE_TTL_SECONDS = int(os.getenv("REVIEW_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# PDF conversion cache, keyed by the SHA-256 of the PDF and the converter settings
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "True").lower() in ["true", "1", "yes"]
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(STORAGE_DIR, "pdf_cache"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PDF_CACHE_TTL_SECONDS = int(os.getenv("PDF_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# PDF conversion process pool. Jobs beyond PDF_CONVERTER_WORKERS wait in a
+# queue of at most PDF_CONVERTER_MAX_QUEUE; further uploads are rejected.
+PDF_CONVERTER_WORKERS = int(os.getenv("PDF_CONVERTER_WORKERS", str(os.cpu_count() or 1)))
+PDF_CONVERTER_MAX_QUEUE = int(os.getenv("PDF_CONVERTER_MAX_QUEUE", "32"))
+PDF_CONVERTER_TIMEOUT_SECONDS = float(os.getenv("PDF_CONVERTER_TIMEOUT_SECONDS", "300"))
+
+# OCR threads per conversion worker. Each thread keeps its own Tesseract engine.
+PDF_OCR_THREADS = int(os.getenv("PDF_OCR_THREADS", "2"))
+
+# Uploads are streamed to disk in chunks and rejected once they exceed this size
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Review scheduler: reviews running at once, and queue depths at which new
+# interactive / bulk reviews are rejected with 429
+REVIEW_MAX_CONCURRENT = int(os.getenv("REVIEW_MAX_CONCURRENT", "4"))
+REVIEW_MAX_QUEUE = int(os.getenv("REVIEW_MAX_QUEUE", "32"))
+REVIEW_BULK_MAX_QUEUE = int(os.getenv("REVIEW_BULK_MAX_QUEUE", "16"))
+
+# Per-provider rate limits, shared by every reviewer of that provider. Set
+# PROVIDER_RATE_LIMITS to a JSON object to override them, e.g.
+# {"openai": {"rpm": 5000, "tpm": 800000, "max_concurrency": 32}}
+DEFAULT_PROVIDER_RATE_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 200000, "max_concurrency": 16},
+    "claude": {"rpm": 50, "tpm": 40000, "max_concurrency": 8},
+    "mistral": {"rpm": 60, "tpm": 500000, "max_concurrency": 8},
+}
+PROVIDER_RATE_LIMITS = {
+    provider: {**DEFAULT_PROVIDER_RATE_LIMITS.get(provider, {}), **limits}
+    for provider, limits in {
+        **DEFAULT_PROVIDER_RATE_LIMITS,
+        **json.loads(os.getenv("PROVIDER_RATE_LIMITS", "{}")),
+    }.items()
+}
+
+# Retries of rate-limited and transient provider errors, with exponential
+# backoff capped at LLM_MAX_BACKOFF_SECONDS unless the provider asks for longer
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+LLM_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "60"))
+
+# Deadline for a single provider request; timed-out requests are retried
+# like other transient errors. Reviewers can override it with "timeout".
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "300"))
+
+# Hedged requests: when a call runs longer than the reviewer's
+# LLM_HEDGE_PERCENTILE latency, a duplicate is sent (to the reviewer's
+# "hedge_fallback" reviewer if it has one) and the first answer wins.
+# Reviewers can override the switch with "hedge".
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "False").lower() in ["true", "1", "yes"]
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Agreement between reviewers: "local" computes it from scores and text,
+# "llm" asks GPT-4o to judge every pair of reviews
+AGREEMENT_MODE = os.getenv("AGREEMENT_MODE", "local")
+
+# Paper compaction: running headers/footers, page numbers and hyphenation
+# are removed before review, and the reference list unless
+# COMPACTION_DROP_REFERENCES is false
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "True").lower() in ["true", "1", "yes"]
+COMPACTION_DROP_REFERENCES = os.getenv("COMPACTION_DROP_REFERENCES", "True").lower() in ["true", "1", "yes"]
+
+# Most tokens of paper text sent to a reviewer. Papers that do not fit this
+# or the model's context window lose their appendix, then their middle.
+PAPER_TOKEN_BUDGET = int(os.getenv("PAPER_TOKEN_BUDGET", "60000"))
+
+# Context windows in tokens, by provider or model name. Set
+# MODEL_CONTEXT_TOKENS to a JSON object to override them, e.g.
+# {"mistral-large-latest": 128000}
+DEFAULT_MODEL_CONTEXT_TOKENS = {"openai": 128000, "claude": 200000, "mistral": 32000}
+MODEL_CONTEXT_TOKENS = {
+    **DEFAULT_MODEL_CONTEXT_TOKENS,
+    **json.loads(os.getenv("MODEL_CONTEXT_TOKENS", "{}")),
+}
+
+# Long-document mode: documents that do not fit a reviewer's budget are
+# split into sections of about LONG_DOCUMENT_SECTION_TOKENS, critiqued in
+# parallel (at most LONG_DOCUMENT_MAX_CONCURRENCY at once) and reviewed from
+# the section notes. LONG_DOCUMENT_MODE is "auto", "always" or "never".
+LONG_DOCUMENT_MODE = os.getenv("LONG_DOCUMENT_MODE", "auto")
+LONG_DOCUMENT_SECTION_TOKENS = int(os.getenv("LONG_DOCUMENT_SECTION_TOKENS", "8000"))
+LONG_DOCUMENT_MAX_CONCURRENCY = int(os.getenv("LONG_DOCUMENT_MAX_CONCURRENCY", "8"))
+
+# Provider JSON modes for review responses (OpenAI and Mistral JSON mode,
+# a "{" prefill for Claude), the output limit of a review request, and how
+# often a response cut off at that limit is continued
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "True").lower() in ["true", "1", "yes"]
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "4000"))
+LLM_MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "2"))
+
+# Consensus review: "local" builds it from the reviews without an LLM call,
+# "polish" additionally has GPT-4o edit the local consensus for readability,
+# "llm" has GPT-4o write it from all reviews. CONSENSUS_SCORE_STATISTIC is
+# the local consensus scores: "mean", "median", "trimmed_mean" or
+# "weighted_mean" (weighted by reviewer confidence).
+CONSENSUS_MODE = os.getenv("CONSENSUS_MODE", "local")
+CONSENSUS_SCORE_STATISTIC = os.getenv("CONSENSUS_SCORE_STATISTIC", "trimmed_mean")
+
+# Debate: after the initial reviews, update rounds run until the reviewers
+# converge or MAX_DEBATE_ROUNDS have run (0 disables the update round).
+# Reviewers have converged when no score's standard deviation, on scales
+# normalized to [0, 1], exceeds DEBATE_SCORE_SPREAD, or when their mean
+# pairwise agreement reaches DEBATE_MIN_AGREEMENT. With
+# DEBATE_SPECULATIVE_ROUNDS, each update round starts before the previous one
+# has been tested for convergence, and is cancelled if it turns out unneeded.
+MAX_DEBATE_ROUNDS = int(os.getenv("MAX_DEBATE_ROUNDS", "2"))
+DEBATE_SCORE_SPREAD = float(os.getenv("DEBATE_SCORE_SPREAD", "0.1"))
+DEBATE_MIN_AGREEMENT = float(os.getenv("DEBATE_MIN_AGREEMENT", "0.8"))
+DEBATE_SPECULATIVE_ROUNDS = os.getenv("DEBATE_SPECULATIVE_ROUNDS", "True").lower() in ["true", "1", "yes"]
+
+# Quorum: once REVIEW_QUORUM reviewers have reviewed successfully and
+# REVIEW_QUORUM_TIMEOUT_SECONDS have passed, a provisional consensus of the
+# reviews so far is returned, marked partial; late reviews are merged into
+# the stored result when they arrive. 0 waits for every reviewer.
+REVIEW_QUORUM = int(os.getenv("REVIEW_QUORUM", "0"))
+REVIEW_QUORUM_TIMEOUT_SECONDS = float(os.getenv("REVIEW_QUORUM_TIMEOUT_SECONDS", "120"))
+# Reviews that returned a partial result run on outside the scheduler; past
+# REVIEW_MAX_BACKGROUND of them, reviews wait for their complete result.
+REVIEW_MAX_BACKGROUND = int(os.getenv("REVIEW_MAX_BACKGROUND", "4"))
+
+# Circuit breakers: a provider's circuit opens when at least
+# CIRCUIT_ERROR_RATE of its requests in the last CIRCUIT_WINDOW_SECONDS
+# failed (with at least CIRCUIT_MIN_CALLS requests), so further requests
+# fail at once; after CIRCUIT_COOLDOWN_SECONDS one probe request is sent.
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "30"))
+
+# Reviewers per paper. When more are configured, the fastest ones (by
+# median latency) with a closed circuit are used. 0 uses every reviewer.
+REVIEWERS_PER_PAPER = int(os.getenv("REVIEWERS_PER_PAPER", "0"))
@@ -1,12 +1,19 @@
 import numpy as np
 import os
-from openai import OpenAI
+from typing import List
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from pydantic import BaseModel
 
+from app.review_engine.parser import ParsedReview, to_score
+from app.services.cache import make_cache_key, review_cache
+from app.services.llm.ratelimit import estimate_tokens, get_limiter
+
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Retries are handled by the OpenAI rate limiter shared with the reviewers
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
 
 class Review(BaseModel):
@@ -23,19 +30,22 @@ class Review(BaseModel):
 
 
 def aggregate_feedback(
-    feedbacks: Review,
+    feedbacks: List[ParsedReview],
 ) -> dict:
     """
     Aggregate parsed feedback from multiple LLM responses.
-    For numeric scores, computes the average.
+    For numeric scores, computes the average over the reviews that gave one.
     For text sections, combines the text.
     Computes a confidence score based on the standard deviation of numeric scores.
     """
-    # Initialize lists for numeric scores
-    soundness_scores = []
-    presentation_scores = []
-    contribution_scores = []
-    rating_scores = []
+    soundness_scores = [fb.soundness for fb in feedbacks if fb.soundness is not None]
+    presentation_scores = [
+        fb.presentation for fb in feedbacks if fb.presentation is not None
+    ]
+    contribution_scores = [
+        fb.contribution for fb in feedbacks if fb.contribution is not None
+    ]
+    rating_scores = [fb.rating for fb in feedbacks if fb.rating is not None]
 
     summaries = []
     strengths_list = []
@@ -44,16 +54,11 @@ def aggregate_feedback(
     limitations_list = []
 
     for i, fb in enumerate(feedbacks):
-        soundness_scores.append(fb.get("soundness"))
-        presentation_scores.append(fb.get("presentation"))
-        contribution_scores.append(fb.get("contribution"))
-        rating_scores.append(fb.get("rating"))
-
-        summaries.append(f"LLM {i+1}: {fb.get('summary')}")
-        strengths_list.append(f"LLM {i+1}: {fb.get('strengths')}")
-        weaknesses_list.append(f"LLM {i+1}: {fb.get('weaknesses')}")
-        questions_list.append(f"LLM {i+1}: {fb.get('questions')}")
-        limitations_list.append(f"LLM {i+1}: {fb.get('limitations')}")
+        summaries.append(f"LLM {i+1}: {fb.summary}")
+        strengths_list.append(f"LLM {i+1}: {fb.strengths}")
+        weaknesses_list.append(f"LLM {i+1}: {fb.weaknesses}")
+        questions_list.append(f"LLM {i+1}: {fb.questions}")
+        limitations_list.append(f"LLM {i+1}: {fb.limitations}")
 
     # Compute averages
     aggregated = {}
@@ -92,24 +97,35 @@ def aggregate_feedback(
     return aggregated
 
 
-def call_conversion_llm(context: str, prompt: str) -> str:
+async def call_conversion_llm(context: str, prompt: str) -> Review:
     """
     Call an LLM to convert the aggregated feedback into an OpenReview style review.
     """
-    client = OpenAI()
-
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": context},
-            {"role": "user", "content": prompt},
-        ],
-        response_format=Review,
+
+    async def compute() -> dict:
+        completion = await get_limiter("openai").call(
+            lambda: client.beta.chat.completions.parse(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": context},
+                    {"role": "user", "content": prompt},
+                ],
+                response_format=Review,
+            ),
+            estimate_tokens(context, prompt),
+        )
+        parsed = completion.choices[0].message.parsed
+        if parsed is None:
+            raise ValueError("Consensus model returned no structured review")
+        return parsed.model_dump()
+
+    key = make_cache_key(
+        provider="openai", model="gpt-4o", prompt=f"consensus:{context}\n{prompt}"
     )
-    return completion.choices[0].message.parsed
+    return Review(**await review_cache.get_or_compute(key, compute))
 
 
-def convert_to_openreview(aggregated_data: dict) -> str:
+async def convert_to_openreview(aggregated_data: dict) -> Review:
     """
     Convert aggregated feedback data into an OpenReview style review.
     aggregated_data should have keys:
@@ -134,27 +150,69 @@ def convert_to_openreview(aggregated_data: dict) -> str:
         f"Rating: {aggregated_data.get('rating')}\n"
         f"Confidence: {aggregated_data.get('confidence')}\n"
     )
-    return call_conversion_llm(context, prompt)
+    return await call_conversion_llm(context, prompt)
 
 
-def get_llm_agreement(context: str, prompt: str) -> str:
+async def polish_review(review: Review) -> Review:
     """
-    Call an LLM to get the agreement between two reviewers.
+    Have an LLM edit a consensus review for readability.
+
+    The scores are kept as they are, whatever the LLM returns.
     """
-    client = OpenAI()
-
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": context},
-            {"role": "user", "content": prompt},
-        ],
+    context = (
+        "The following OpenReview style review was assembled from the reviews of several reviewers. "
+        "Edit it into a coherent review: rewrite the Summary, Strengths, Weaknesses, Questions "
+        "and Limitations as fluent text, keeping every point and adding none. "
+        "Return the scores unchanged."
+    )
+    prompt = (
+        f"Summary: {review.summary}\n"
+        f"Soundness: {review.soundness}\n"
+        f"Presentation: {review.presentation}\n"
+        f"Contribution: {review.contribution}\n"
+        f"Strengths:\n{review.strengths}\n"
+        f"Weaknesses:\n{review.weaknesses}\n"
+        f"Questions:\n{review.questions}\n"
+        f"Limitations:\n{review.limitations}\n"
+        f"Rating: {review.rating}\n"
+        f"Confidence: {review.confidence}\n"
     )
+    polished = await call_conversion_llm(context, prompt)
+    scores = {
+        field: getattr(review, field)
+        for field in ("soundness", "presentation", "contribution", "rating", "confidence")
+    }
+    return polished.model_copy(update=scores)
 
-    return completion.choices[0].message.content
+
+async def get_llm_agreement(context: str, prompt: str) -> str:
+    """
+    Call an LLM to get the agreement between two reviewers.
+    """
+
+    async def compute() -> str:
+        completion = await get_limiter("openai").call(
+            lambda: client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": context},
+                    {"role": "user", "content": prompt},
+                ],
+            ),
+            estimate_tokens(context, prompt),
+        )
+        return completion.choices[0].message.content
+
+    key = make_cache_key(
+        provider="openai", model="gpt-4o", prompt=f"agreement:{context}\n{prompt}"
+    )
+    # Don't keep an answer without a number, e.g. a refusal, for next time
+    return await review_cache.get_or_compute(
+        key, compute, cacheable=lambda text: to_score(text) is not None
+    )
 
 
-def get_agreement(reviewer1: dict, reviewer2: dict) -> str:
+async def get_agreement(reviewer1: dict, reviewer2: dict) -> str:
     """
     Get agreement between two reviewers.
     """
@@ -189,4 +247,4 @@ def get_agreement(reviewer1: dict, reviewer2: dict) -> str:
         f"Rating: {reviewer2.get('rating')}\n"
         f"Confidence: {reviewer2.get('confidence')}\n"
     )
-    return get_llm_agreement(context, prompt)
+    return await get_llm_agreement(context, prompt)
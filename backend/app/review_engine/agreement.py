@@ -0,0 +1,193 @@
+"""
+Local agreement metric between reviewers.
+
+Agreement between two reviews combines how close their scores are with how
+similar their strengths and weaknesses read. Both parts are computed for all
+reviewer pairs at once with NumPy, so scoring a round costs microseconds
+instead of one LLM call per pair.
+"""
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.review_engine.parser import to_score, to_text
+
+# Score fields and the width of their scales
+SCORE_RANGES = {
+    "soundness": (1, 5),
+    "presentation": (1, 5),
+    "contribution": (1, 5),
+    "rating": (1, 10),
+}
+
+# Text fields compared between reviews
+TEXT_FIELDS = ("strengths", "weaknesses")
+
+# Share of the agreement given to scores; the rest goes to text similarity
+SCORE_WEIGHT = 0.5
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9\-]{2,}")
+
+_STOPWORDS = frozenset(
+    """
+    the and for are but not you all any can had her was one our out has
+    his how its may new now see way who did get let say she too use this
+    that with from they will would there their what about which when your
+    been have more some than them then these into only other also such very
+    paper work authors method results approach proposed however could should
+    """.split()
+)
+
+
+def normalized_scores(reviews: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    The reviews' scores, each scaled to [0, 1] by the width of its scale.
+
+    Args:
+        reviews: Parsed reviews
+
+    Returns:
+        N x len(SCORE_RANGES) matrix, NaN where a review gave no score
+    """
+    scores = np.full((len(reviews), len(SCORE_RANGES)), np.nan)
+    for i, review in enumerate(reviews):
+        for j, (field, (low, high)) in enumerate(SCORE_RANGES.items()):
+            score = to_score(review.get(field))
+            if score is not None:
+                scores[i, j] = (min(max(score, low), high) - low) / (high - low)
+    return scores
+
+
+def score_agreement(reviews: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Agreement of the reviews' scores, pairwise.
+
+    Each score is scaled to [0, 1] by the width of its scale, and agreement
+    is one minus the mean absolute difference over the scores both reviews
+    gave.
+
+    Args:
+        reviews: Parsed reviews
+
+    Returns:
+        N x N matrix in [0, 1], NaN where two reviews share no score
+    """
+    scores = normalized_scores(reviews)
+    differences = np.abs(scores[:, None, :] - scores[None, :, :])
+    shared = np.sum(~np.isnan(differences), axis=2)
+    total = np.nansum(differences, axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(shared > 0, 1 - total / shared, np.nan)
+
+
+def score_dispersion(reviews: List[Dict[str, Any]]) -> float:
+    """
+    How far apart the reviews' scores are.
+
+    Args:
+        reviews: Parsed reviews; failed reviews are ignored
+
+    Returns:
+        The largest standard deviation of any score across the reviews, on
+        scales normalized to [0, 1]; NaN unless two reviews share a score
+    """
+    scores = normalized_scores([review for review in reviews if "error" not in review])
+    given = np.sum(~np.isnan(scores), axis=0)
+    if not np.any(given >= 2):
+        return float("nan")
+    return float(np.max(np.nanstd(scores[:, given >= 2], axis=0)))
+
+
+def text_agreement(reviews: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Cosine similarity of the reviews' strengths and weaknesses, pairwise.
+
+    Texts are compared as TF-IDF vectors with sublinear term frequency, so
+    points raised by several reviewers count and boilerplate shared by all of
+    them does not.
+
+    Args:
+        reviews: Parsed reviews
+
+    Returns:
+        N x N matrix in [0, 1]; reviews without text have similarity 0
+    """
+    documents = [
+        [
+            token
+            for field in TEXT_FIELDS
+            for token in _TOKEN_PATTERN.findall(to_text(review.get(field)).lower())
+            if token not in _STOPWORDS
+        ]
+        for review in reviews
+    ]
+    vocabulary = {token: k for k, token in enumerate(sorted(set().union(*documents)))}
+    if not vocabulary:
+        return np.zeros((len(reviews), len(reviews)))
+
+    counts = np.zeros((len(reviews), len(vocabulary)))
+    for i, tokens in enumerate(documents):
+        for token in tokens:
+            counts[i, vocabulary[token]] += 1
+
+    tf = np.log1p(counts)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(reviews)) / (1 + document_frequency)) + 1
+    vectors = tf * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    return np.clip(vectors @ vectors.T, 0, 1)
+
+
+def compute_agreement(reviews: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Pairwise agreement between reviews, combining scores and text.
+
+    Reviews that failed (carrying an "error" key) have no agreement with
+    anyone.
+
+    Args:
+        reviews: Parsed reviews, in registry order
+
+    Returns:
+        Symmetric N x N matrix in [0, 1] with ones on the diagonal and NaN
+        for pairs involving a failed review
+    """
+    n = len(reviews)
+    scores = score_agreement(reviews)
+    text = text_agreement(reviews)
+    agreement = np.where(
+        np.isnan(scores), text, SCORE_WEIGHT * scores + (1 - SCORE_WEIGHT) * text
+    )
+
+    failed = np.array(["error" in review for review in reviews], dtype=bool)
+    agreement[failed, :] = np.nan
+    agreement[:, failed] = np.nan
+    agreement[np.arange(n), np.arange(n)] = 1.0
+    return agreement
+
+
+def matrix_to_json(
+    names: List[str], matrix: np.ndarray, decimals: int = 3
+) -> Dict[str, Any]:
+    """
+    Make an agreement matrix JSON-serializable.
+
+    Args:
+        names: Reviewer names, in the order of the matrix rows
+        matrix: N x N agreement matrix
+        decimals: Decimals to round to
+
+    Returns:
+        Dictionary with the reviewer names and the matrix as nested lists,
+        with None in place of NaN
+    """
+    rounded = np.round(matrix.astype(float), decimals)
+    return {
+        "reviewers": list(names),
+        "matrix": [
+            [None if np.isnan(value) else float(value) for value in row]
+            for row in rounded
+        ],
+    }
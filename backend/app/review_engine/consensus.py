@@ -0,0 +1,266 @@
+"""
+Local consensus review.
+
+Builds the consensus review from the reviewers' parsed reviews without an
+LLM call: scores are combined with robust statistics, and the strengths,
+weaknesses, questions and limitations of all reviewers are merged, with
+points that several reviewers made in different words (found with MinHash
+over word shingles) listed once. The LLM can still polish the result, see
+aggregator.polish_review.
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import CONSENSUS_SCORE_STATISTIC
+from app.review_engine.aggregator import Review
+from app.review_engine.parser import ParsedReview
+
+CONSENSUS_SCORE_FIELDS = (
+    "soundness",
+    "presentation",
+    "contribution",
+    "rating",
+    "confidence",
+)
+CONSENSUS_TEXT_FIELDS = ("strengths", "weaknesses", "questions", "limitations")
+
+# Share of scores cut from each end for the trimmed mean. At least one score
+# is cut from each end once there are three, since a panel is usually too
+# small for the fraction alone to cut anything.
+TRIM_FRACTION = 0.2
+
+# Estimated Jaccard similarity of word shingles above which two points are
+# taken to say the same thing
+DUPLICATE_THRESHOLD = 0.4
+
+SHINGLE_SIZE = 2
+NUM_HASHES = 128
+
+# Hash functions (a * x + b) mod p, seeded so results are reproducible
+_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(0)
+_HASH_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.uint64)
+_HASH_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.uint64)
+
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def score_statistics(
+    values: Sequence[Optional[float]], weights: Optional[Sequence[Optional[float]]] = None
+) -> Dict[str, Optional[float]]:
+    """
+    Robust statistics of the scores reviewers gave for one field.
+
+    Args:
+        values: Each reviewer's score, None where a reviewer gave none
+        weights: Each reviewer's confidence, for the weighted mean
+
+    Returns:
+        Dictionary with the mean, median, trimmed mean (TRIM_FRACTION cut
+        from each end, but at least one score once there are three),
+        confidence-weighted mean, standard deviation and number of scores;
+        all None if no reviewer gave a score
+    """
+    scores = np.array([np.nan if value is None else value for value in values], dtype=float)
+    given = ~np.isnan(scores)
+    if not given.any():
+        return {
+            "mean": None,
+            "median": None,
+            "trimmed_mean": None,
+            "weighted_mean": None,
+            "std": None,
+            "count": 0,
+        }
+
+    present = np.sort(scores[given])
+    trim = int(len(present) * TRIM_FRACTION)
+    if len(present) >= 3:
+        trim = max(trim, 1)
+    trimmed = present[trim : len(present) - trim] if len(present) > 2 * trim else present
+
+    if weights is None:
+        weights = [None] * len(scores)
+    confidence = np.array(
+        [np.nan if weight is None else weight for weight in weights], dtype=float
+    )[given]
+    confidence = np.where(np.isnan(confidence) | (confidence <= 0), 1.0, confidence)
+
+    return {
+        "mean": round(float(present.mean()), 2),
+        "median": round(float(np.median(present)), 2),
+        "trimmed_mean": round(float(trimmed.mean()), 2),
+        "weighted_mean": round(float(np.average(scores[given], weights=confidence)), 2),
+        "std": round(float(present.std()), 2),
+        "count": int(len(present)),
+    }
+
+
+def split_points(text: str) -> List[str]:
+    """Split a review field into its points: bullet lines, or sentences of a paragraph."""
+    lines = [_BULLET.sub("", line).strip() for line in text.split("\n")]
+    lines = [line for line in lines if line]
+    if len(lines) == 1:
+        lines = [
+            sentence.strip()
+            for sentence in _SENTENCE_END.split(lines[0])
+            if sentence.strip()
+        ]
+    return lines
+
+
+def minhash_signatures(texts: Sequence[str]) -> np.ndarray:
+    """
+    MinHash signatures of the texts' word shingles.
+
+    Args:
+        texts: Texts to sign
+
+    Returns:
+        len(texts) x NUM_HASHES array; the share of equal columns of two rows
+        estimates the Jaccard similarity of the texts' shingle sets
+    """
+    signatures = np.full(
+        (len(texts), NUM_HASHES), np.iinfo(np.uint64).max, dtype=np.uint64
+    )
+    for i, text in enumerate(texts):
+        words = _WORD.findall(text.lower())
+        if not words:
+            continue
+        shingles = {
+            " ".join(words[k : k + SHINGLE_SIZE])
+            for k in range(max(1, len(words) - SHINGLE_SIZE + 1))
+        }
+        hashes = np.array(
+            [zlib.crc32(shingle.encode()) for shingle in shingles], dtype=np.uint64
+        )
+        # uint64 products wrap around, which still mixes the bits well
+        permuted = (hashes[:, None] * _HASH_A + _HASH_B) % np.uint64(_PRIME)
+        signatures[i] = permuted.min(axis=0)
+    return signatures
+
+
+def merge_points(points_by_reviewer: Sequence[List[str]]) -> List[Dict[str, object]]:
+    """
+    Merge the points of several reviewers, listing near-duplicates once.
+
+    Points whose estimated shingle similarity reaches DUPLICATE_THRESHOLD are
+    grouped (transitively). Each group is represented by its longest point,
+    which usually carries the most detail.
+
+    Args:
+        points_by_reviewer: Each reviewer's points
+
+    Returns:
+        Merged points with the "text" and the number of reviewers who made
+        it ("support"), most supported first and otherwise in order of
+        first mention
+    """
+    points = [
+        (reviewer, point)
+        for reviewer, items in enumerate(points_by_reviewer)
+        for point in items
+    ]
+    if not points:
+        return []
+
+    signatures = minhash_signatures([point for _, point in points])
+    similarity = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+
+    # Union-find over pairs of similar points
+    parent = list(range(len(points)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(similarity >= DUPLICATE_THRESHOLD, k=1))):
+        parent[find(int(i))] = find(int(j))
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(points)):
+        groups.setdefault(find(i), []).append(i)
+
+    merged = [
+        {
+            "text": max((points[i][1] for i in members), key=len),
+            "support": len({points[i][0] for i in members}),
+            "first": min(members),
+        }
+        for members in groups.values()
+    ]
+    merged.sort(key=lambda point: (-point["support"], point["first"]))
+    return [{"text": point["text"], "support": point["support"]} for point in merged]
+
+
+def _format_points(points: List[Dict[str, object]], reviewers: int) -> str:
+    lines = []
+    for point in points:
+        line = f"- {point['text']}"
+        if point["support"] > 1:
+            line += f" ({point['support']} of {reviewers} reviewers)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _representative_summary(summaries: List[str]) -> str:
+    """The summary most similar to all others, i.e. the medoid."""
+    summaries = [summary for summary in summaries if summary]
+    if len(summaries) <= 2:
+        return summaries[0] if summaries else ""
+    signatures = minhash_signatures(summaries)
+    similarity = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+    return summaries[int(similarity.sum(axis=1).argmax())]
+
+
+def consensus_statistics(
+    reviews: List[ParsedReview],
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """Score statistics for every score field, see score_statistics."""
+    weights = [review.confidence for review in reviews]
+    return {
+        field: score_statistics(
+            [getattr(review, field) for review in reviews],
+            weights if field != "confidence" else None,
+        )
+        for field in CONSENSUS_SCORE_FIELDS
+    }
+
+
+def build_consensus(
+    reviews: List[ParsedReview], statistic: str = CONSENSUS_SCORE_STATISTIC
+) -> Review:
+    """
+    Build the consensus review from the reviewers' reviews.
+
+    Args:
+        reviews: Parsed reviews of the reviewers that succeeded
+        statistic: Which statistic of score_statistics gives the consensus
+            scores
+
+    Returns:
+        The consensus review; scores nobody gave are 0
+    """
+    statistics = consensus_statistics(reviews)
+    scores = {
+        field: statistics[field][statistic] or 0.0 for field in CONSENSUS_SCORE_FIELDS
+    }
+    texts = {
+        field: _format_points(
+            merge_points([split_points(getattr(review, field)) for review in reviews]),
+            len(reviews),
+        )
+        for field in CONSENSUS_TEXT_FIELDS
+    }
+    return Review(
+        summary=_representative_summary([review.summary for review in reviews]),
+        **scores,
+        **texts,
+    )
@@ -0,0 +1,159 @@
+"""
+Dependency-driven task scheduling.
+
+A TaskGraph runs async tasks as soon as the tasks they depend on have
+finished, instead of in stages separated by barriers: a task never waits for
+work it does not use, so one slow task only delays the tasks that need its
+result. Tasks can also be started speculatively and cancelled once it turns
+out their result is not needed.
+"""
+import asyncio
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Set,
+    Tuple,
+)
+
+# Result of a task that had nothing to do, e.g. a debate round after the
+# reviewers converged
+SKIPPED = type("Skipped", (), {"__repr__": lambda self: "SKIPPED"})()
+
+
+
+class TaskCancelled(Exception):
+    """Result of a task cancelled by something other than TaskGraph.cancel."""
+
+    def __init__(self, key: Hashable):
+        super().__init__(f"Task {key!r} was cancelled")
+        self.key = key
+
+
+TaskFunction = Callable[[Dict[Hashable, Any]], Awaitable[Any]]
+
+
+class TaskGraph:
+    """A set of async tasks and the tasks each depends on."""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, Tuple[TaskFunction, Tuple[Hashable, ...]]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._running: Dict[Hashable, asyncio.Future] = {}
+        self._cancelled: Set[Hashable] = set()
+        self._closing = False
+        self.results: Dict[Hashable, Any] = {}
+
+    def add(
+        self, key: Hashable, fn: TaskFunction, deps: Iterable[Hashable] = ()
+    ) -> None:
+        """
+        Add a task.
+
+        Dependencies must be added first, which also rules out cycles.
+
+        Args:
+            key: Unique key of the task
+            fn: Coroutine function called with the results of the
+                dependencies, keyed by their keys
+            deps: Keys of the tasks whose results fn needs
+        """
+        if key in self._tasks:
+            raise ValueError(f"Task {key!r} already exists")
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Unknown dependency {dep!r} of task {key!r}")
+        self._tasks[key] = (fn, deps)
+
+    def emit(self, key: Hashable, payload: Any) -> None:
+        """
+        Report progress of a running task, or any other event the consumer
+        of run() should see; run() yields it right away.
+        """
+        self._queue.put_nowait(("emit", key, payload))
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Cancel a task that is no longer needed. A running task is stopped,
+        one that has not started yet will not be; either way it finishes
+        with SKIPPED as its result. Finished tasks are left alone.
+        """
+        if key in self.results:
+            return
+        self._cancelled.add(key)
+        if key in self._running:
+            self._running[key].cancel()
+
+    async def run(self) -> AsyncIterator[Tuple[str, Hashable, Any]]:
+        """
+        Run all tasks, each as soon as its dependencies have finished.
+
+        A task that raises finishes with the exception as its result, which
+        is passed on to the tasks depending on it like any other result; a
+        task cancelled other than through cancel() finishes with
+        TaskCancelled.
+
+        Yields:
+            ("done", key, result) when a task finishes, and ("emit", key,
+            payload) for progress reported with emit(), in the order they
+            happen
+        """
+        queue = self._queue
+        waiting: Dict[Hashable, Set[Hashable]] = {}
+        dependents: Dict[Hashable, List[Hashable]] = defaultdict(list)
+        for key, (_, deps) in self._tasks.items():
+            waiting[key] = set(deps)
+            for dep in deps:
+                dependents[dep].append(key)
+        running = self._running
+
+        def start(key: Hashable) -> None:
+            fn, deps = self._tasks[key]
+            inputs = {dep: self.results[dep] for dep in deps}
+
+            async def runner():
+                try:
+                    result = SKIPPED if key in self._cancelled else await fn(inputs)
+                except asyncio.CancelledError:
+                    if self._closing:
+                        raise
+                    # A cancellation from inside the task is a failure like
+                    # any other, so run() still gets a result for it
+                    result = SKIPPED if key in self._cancelled else TaskCancelled(key)
+                except Exception as e:
+                    result = e
+                queue.put_nowait(("done", key, result))
+
+            running[key] = asyncio.ensure_future(runner())
+
+        for key, deps in waiting.items():
+            if not deps:
+                start(key)
+
+        remaining = len(self._tasks)
+        try:
+            while remaining:
+                kind, key, value = await queue.get()
+                if kind == "done":
+                    remaining -= 1
+                    running.pop(key, None)
+                    self.results[key] = value
+                    # Start dependents before handing the result to the
+                    # consumer, so they never wait on it
+                    for dependent in dependents[key]:
+                        waiting[dependent].discard(key)
+                        if not waiting[dependent]:
+                            start(dependent)
+                yield kind, key, value
+        finally:
+            # Stop outstanding tasks if the consumer goes away
+            self._closing = True
+            for task in running.values():
+                task.cancel()
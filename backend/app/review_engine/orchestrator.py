@@ -1,353 +1,1266 @@
 import asyncio
-from typing import Dict, List, Any, Optional
+import functools
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
 import numpy as np
 
-from app.services.llm.openai import get_openai_review, get_updated_openai_review
-from app.services.llm.claude import get_claude_review, get_updated_claude_review
-from app.services.llm.mistral import get_mistral_review, get_updated_mistral_review
-from app.services.converters.pdf import convert_pdf_bytes_to_markdown
-from app.review_engine.parser import parse_llm_feedback
+from app.services.llm.base import UsageCallback, add_usage
+from app.services.llm.registry import (
+    ReviewerRegistry,
+    ScoresCallback,
+    default_registry,
+    has_text,
+)
+from app.services.converters.cache import convert_pdf_cached
+from app.services.converters.executor import ConversionQueueFull
+from app.services.llm.ratelimit import ESTIMATED_OUTPUT_TOKENS
+from app.services.compaction import compact, context_budget, count_tokens, fit_to_budget
+from app.config import (
+    AGREEMENT_MODE,
+    COMPACTION_ENABLED,
+    CONSENSUS_MODE,
+    DEBATE_MIN_AGREEMENT,
+    DEBATE_SCORE_SPREAD,
+    DEBATE_SPECULATIVE_ROUNDS,
+    LONG_DOCUMENT_MAX_CONCURRENCY,
+    LONG_DOCUMENT_MODE,
+    LONG_DOCUMENT_SECTION_TOKENS,
+    MAX_DEBATE_ROUNDS,
+    REVIEWERS_PER_PAPER,
+    REVIEW_MAX_BACKGROUND,
+    REVIEW_QUORUM,
+    REVIEW_QUORUM_TIMEOUT_SECONDS,
+)
+from app.review_engine.agreement import (
+    compute_agreement,
+    matrix_to_json,
+    score_dispersion,
+)
+from app.review_engine.parser import ParsedReview, parse_review, repair_json, to_score
+from app.review_engine.prompt import SECTION_REVIEW_PROMPT
+from app.review_engine.sections import format_section_notes, section_request, split_sections
 from app.review_engine.aggregator import (
+    Review,
     aggregate_feedback,
     convert_to_openreview,
     get_agreement,
+    polish_review,
 )
-import json
-import re
+from app.review_engine.consensus import build_consensus, consensus_statistics
+from app.review_engine.dag import SKIPPED, TaskGraph
+
+# A review call, taking an optional scores callback
+ReviewCall = Callable[..., Awaitable[str]]
+
+# Tokens reserved for each peer review in the update round's requests
+PEER_REVIEW_TOKENS = 1500
+
+# Characters from the start of a long document sent with each of its
+# sections, so the section can be read in context
+SECTION_CONTEXT_CHARS = 4000
+
+# Reviews finishing after their partial result was returned, kept here so
+# they are not garbage collected while they run
+_background_reviews: Set[asyncio.Task] = set()
 
 
 class ReviewEngine:
     """Orchestrates the paper review process using multiple LLM services."""
 
-    def __init__(self, review_prompt: str, update_review_prompt: str):
+    def __init__(
+        self,
+        review_prompt: str,
+        update_review_prompt: str,
+        registry: Optional[ReviewerRegistry] = None,
+        agreement_mode: str = AGREEMENT_MODE,
+        compaction: bool = COMPACTION_ENABLED,
+        long_document: str = LONG_DOCUMENT_MODE,
+        consensus_mode: str = CONSENSUS_MODE,
+        max_rounds: int = MAX_DEBATE_ROUNDS,
+        convergence_spread: Optional[float] = DEBATE_SCORE_SPREAD,
+        convergence_agreement: Optional[float] = DEBATE_MIN_AGREEMENT,
+        speculative_rounds: bool = DEBATE_SPECULATIVE_ROUNDS,
+        quorum: int = REVIEW_QUORUM,
+        quorum_timeout: float = REVIEW_QUORUM_TIMEOUT_SECONDS,
+        max_background: int = REVIEW_MAX_BACKGROUND,
+        reviewers_per_paper: int = REVIEWERS_PER_PAPER,
+    ):
         """
         Initialize the ReviewEngine with the prompt to use for reviews.
 
         Args:
             review_prompt: The prompt template to send to LLMs
+            update_review_prompt: The prompt template for the update round
+            registry: Reviewer backends to fan out to, defaults to the configured ones
+            agreement_mode: How agreement between reviewers is measured,
+                "local" or "llm"
+            compaction: Compact the paper text before review, see
+                app.services.compaction
+            long_document: When to review the paper section by section:
+                "auto" when it does not fit a reviewer's budget, "always" or
+                "never"
+            consensus_mode: How the consensus review is written: "local",
+                "polish" (local, then edited by an LLM) or "llm"
+            max_rounds: Most update rounds after the initial reviews
+            convergence_spread: Reviewers have converged when no score's
+                standard deviation (on scales normalized to [0, 1]) exceeds
+                this; None to ignore score spread
+            convergence_agreement: Reviewers have converged when their mean
+                pairwise agreement reaches this; None to ignore agreement
+            speculative_rounds: Start each update round without waiting for
+                the convergence test of the round before, and cancel it if
+                the reviewers converged
+            quorum: Reviewers whose successful reviews are enough for a
+                partial result once quorum_timeout has passed; 0 waits for
+                every reviewer
+            quorum_timeout: Seconds after which a partial result is given
+                if the quorum is met
+            max_background: Reviews that may finish in the background after
+                returning a partial result; beyond that, process_text waits
+                for the complete result
+            reviewers_per_paper: Reviewers to use for each paper, picked by
+                _select_reviewers; 0 uses every reviewer
         """
         self.review_prompt = review_prompt
         self.update_review_prompt = update_review_prompt
+        self.registry = registry if registry is not None else default_registry
+        self.agreement_mode = agreement_mode
+        self.compaction = compaction
+        self.long_document = long_document
+        self.consensus_mode = consensus_mode
+        self.max_rounds = max_rounds
+        self.convergence_spread = convergence_spread
+        self.convergence_agreement = convergence_agreement
+        self.speculative_rounds = speculative_rounds
+        self.quorum = quorum
+        self.quorum_timeout = quorum_timeout
+        self.max_background = max_background
+        self.reviewers_per_paper = reviewers_per_paper
 
-    async def process_pdf(self, pdf_bytes: bytes) -> Dict[str, Any]:
+    async def process_pdf(
+        self, pdf_path: str, pdf_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Process a paper from PDF through the entire review pipeline.
 
         Args:
-            pdf_bytes: Raw bytes of the PDF file
+            pdf_path: Path to the PDF file
+            pdf_sha256: SHA-256 of the file, if already known
 
         Returns:
             Dictionary containing individual reviews and a consensus review
         """
-        # Convert PDF to text
+        # Convert PDF to text in the conversion pool, which reads from disk
         try:
-            paper_text, _ = convert_pdf_bytes_to_markdown(pdf_bytes)
+            paper_text, _ = await convert_pdf_cached(pdf_path, pdf_sha256)
+        except ConversionQueueFull:
+            raise
         except Exception as e:
             raise Exception(f"Failed to convert PDF: {str(e)}")
 
         # Get reviews using the text
         return await self.process_text(paper_text)
 
-    async def process_text(self, paper_text: str) -> Dict[str, Any]:
+    async def process_text(
+        self,
+        paper_text: str,
+        on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+    ) -> Dict[str, Any]:
         """
         Process paper text through the review pipeline.
 
+        With a quorum set, the partial result is returned as soon as the
+        quorum is met (see process_text_stream). The review then finishes in
+        the background if on_complete is given, and is stopped otherwise.
+        Background reviews no longer hold a scheduler slot, so once
+        max_background of them are running, the partial result is passed
+        over and the complete one returned instead.
+
         Args:
             paper_text: The text content of the paper
+            on_complete: Coroutine function called with the complete
+                result of a review that returned a partial one; it runs on
+                the event loop, so blocking work belongs in a thread
 
         Returns:
             Dictionary containing individual reviews, review similarities, updated individual reviews,
             updated review similarities, and a consensus review.
         """
-        # Get reviews from all LLM services
-        individual_reviews = await self._get_all_reviews(paper_text)
+        events = self.process_text_stream(paper_text, stream_scores=False)
+        result = None
+        async for event in events:
+            if event["event"] == "done":
+                result = event["result"]
+            elif event["event"] == "partial":
+                if (
+                    on_complete is not None
+                    and len(_background_reviews) >= self.max_background
+                ):
+                    continue
+                if on_complete is None:
+                    await events.aclose()
+                else:
+                    task = asyncio.ensure_future(
+                        self._finish_review(events, on_complete)
+                    )
+                    _background_reviews.add(task)
+                    task.add_done_callback(_background_reviews.discard)
+                return event["result"]
+        return result
 
-        # Parse the reviews to structured format for consensus generation
-        parsed_reviews = self._parse_reviews(individual_reviews)
+    async def _finish_review(
+        self,
+        events: AsyncIterator[Dict[str, Any]],
+        on_complete: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ) -> None:
+        try:
+            async for event in events:
+                if event["event"] == "done":
+                    await on_complete(event["result"])
+        except Exception:
+            logging.exception("Review failed after returning a partial result")
 
-        # Get similarity between reviews
-        original_similarities = np.ones((3, 3))
-        original_similarities[0, 1] = get_agreement(
-            individual_reviews["openai"], individual_reviews["claude"]
-        )
-        original_similarities[0, 2] = get_agreement(
-            individual_reviews["openai"], individual_reviews["mistral"]
-        )
-        original_similarities[1, 2] = get_agreement(
-            individual_reviews["claude"], individual_reviews["mistral"]
-        )
-        original_similarities[1, 0] = original_similarities[0, 1]
-        original_similarities[2, 0] = original_similarities[0, 2]
-        original_similarities[2, 1] = original_similarities[1, 2]
+    async def process_text_stream(
+        self, paper_text: str, stream_scores: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process paper text through the review pipeline, yielding events as
+        results become available.
 
-        # Get updated reviews from all LLM services
-        updated_reviews = await self._get_all_updated_reviews(
-            paper_text, individual_reviews
-        )
+        Events are dictionaries with an "event" type and the seconds "elapsed"
+        since the pipeline started:
+          section: notes on one section of a long document, see
+            long_document
+          scores: scores found so far in a reviewer's streaming response,
+            sent before the rest of its review has been generated
+          review: one reviewer's review for a stage ("initial" or "updated",
+            with the debate "round"), with the call's "duration" and token
+            "usage", including input tokens served from the provider's
+            prompt cache
+          stage: a stage finished, with its "duration", the agreement
+            between its reviews ("similarities") and whether the reviewers
+            have converged ("convergence"), or for the "sections" stage of a
+            long document the number of "sections"
+          consensus: the consensus review, with the "statistics" of the
+            reviewers' scores
+          partial: a provisional "result" shaped like that of done, sent
+            once if a quorum is set, quorum_timeout has passed, at least
+            quorum reviewers have a successful review and the consensus is
+            not ready yet. Its consensus is built locally from each
+            reviewer's latest successful review, and it lists the "missing"
+            reviewers; the review carries on to done.
+          done: the complete result, as returned by process_text, with a
+            "compaction" report of the paper's tokens per reviewer and the
+            "sections" of a long document with their notes. Its updated
+            reviews are those of the last debate round, or the initial ones
+            if the reviewers agreed from the start; "debate" lists every
+            round.
 
-        # Parse the reviews to structured format for consensus generation
-        parsed_reviews = self._parse_reviews(updated_reviews)
+        Stages are not separated by barriers (see _debate_graph), so events
+        of consecutive rounds may interleave and the consensus may come
+        before the last round's stage event; "done" always comes last. An
+        update round started speculatively sends no events until it is
+        known to be needed, and none at all if the reviewers converged.
 
-        # updated similarities
-        updated_similarities = np.ones((3, 3))
-        updated_similarities[0, 1] = get_agreement(
-            updated_reviews["openai"], updated_reviews["claude"]
-        )
-        updated_similarities[0, 2] = get_agreement(
-            updated_reviews["openai"], updated_reviews["mistral"]
+        Args:
+            paper_text: The text content of the paper
+            stream_scores: Stream provider responses to report scores early
+        """
+        started = time.monotonic()
+
+        def event(kind: str, **data: Any) -> Dict[str, Any]:
+            return {
+                "event": kind,
+                "elapsed": round(time.monotonic() - started, 3),
+                **data,
+            }
+
+        # Token counts of each request sent, None for cached reviews
+        usage: Dict[str, Dict[str, Any]] = {"initial": {}, "updated": {}}
+
+        # Each reviewer gets the paper fitted to its model once, and the same
+        # text in every round so the provider's prompt cache still applies.
+        # Compacting and token counting are CPU-bound, so they run in a
+        # thread rather than on the event loop.
+        names = self._select_reviewers()
+        paper_text = await asyncio.to_thread(self._compact, paper_text)
+        papers, compaction = await asyncio.to_thread(self._fit_papers, paper_text, names)
+
+        # Documents too long for a reviewer are critiqued section by section,
+        # spread over all reviewers, and reviewed from the notes
+        sections = None
+        if self._use_long_document(compaction):
+            stage_started = time.monotonic()
+            sections = await asyncio.to_thread(
+                self._split_sections, paper_text, compaction
+            )
+            usage["sections"] = {}
+            async for kind, key, data, duration in self._iter_reviews(
+                self._section_review_calls(paper_text, sections, names)
+            ):
+                index = int(key)
+                if kind == "usage":
+                    usage["sections"][key] = data
+                    continue
+                sections[index]["notes"] = data
+                yield event(
+                    "section",
+                    index=index,
+                    title=sections[index]["title"],
+                    reviewer=sections[index].get("reviewer"),
+                    notes=data,
+                    duration=duration,
+                )
+            notes = format_section_notes(
+                sections, [section.get("notes") for section in sections]
+            )
+            papers, compaction = await asyncio.to_thread(self._fit_papers, notes, names)
+            yield event(
+                "stage",
+                stage="sections",
+                duration=round(time.monotonic() - stage_started, 3),
+                sections=len(sections),
+            )
+
+        section_notes = (
+            [
+                {key: section.get(key) for key in ("title", "reviewer", "notes")}
+                for section in sections
+            ]
+            if sections is not None
+            else None
         )
-        updated_similarities[1, 2] = get_agreement(
-            updated_reviews["claude"], updated_reviews["mistral"]
+
+        # Debate rounds and consensus, each task starting as soon as its
+        # inputs exist, see _debate_graph
+        graph = self._debate_graph(papers, stream_scores)
+        stages: Dict[int, Dict[str, Any]] = {}
+        consensus: Dict[str, Any] = {}
+
+        # With a quorum, a partial result is sent once the deadline has
+        # passed and enough reviewers have a successful review
+        quorum = min(self.quorum, len(names))
+        initial_reviews: Dict[str, Any] = {}
+        received: Dict[str, Any] = {}
+        deadline_passed = False
+        partial_sent = False
+        timer = None
+        if quorum:
+            timer = asyncio.get_running_loop().call_later(
+                max(0.0, self.quorum_timeout - (time.monotonic() - started)),
+                graph.emit,
+                ("quorum",),
+                "deadline",
+            )
+
+        def quorum_met() -> bool:
+            return (
+                quorum > 0
+                and deadline_passed
+                and not partial_sent
+                and not consensus
+                and len(received) >= quorum
+            )
+
+        def held_rounds() -> List[Dict[str, Any]]:
+            return [
+                {
+                    "round": number,
+                    "reviews": stages[number]["reviews"],
+                    "similarities": stages[number]["similarities"],
+                    "convergence": stages[number]["convergence"],
+                }
+                for number in sorted(stages)
+                if number > 0
+            ]
+
+        def partial_result() -> Dict[str, Any]:
+            return self._partial_result(
+                names,
+                initial_reviews,
+                received,
+                held_rounds(),
+                usage,
+                compaction,
+                section_notes,
+            )
+
+        def handle(kind: str, key: Tuple[Any, ...], value: Any) -> Iterator[Dict[str, Any]]:
+            nonlocal consensus, partial_sent
+            task = key[0]
+            if value is SKIPPED or task not in ("review", "stage", "consensus"):
+                return
+            if task == "consensus":
+                consensus = value
+                yield event(
+                    "consensus",
+                    consensus_review=value["review"],
+                    statistics=value["statistics"],
+                    duration=value["duration"],
+                )
+                return
+
+            round_number = key[1]
+            stage = (
+                {"stage": "initial"}
+                if round_number == 0
+                else {"stage": "updated", "round": round_number}
+            )
+            if task == "stage":
+                stages[round_number] = value
+                yield event(
+                    "stage",
+                    **stage,
+                    duration=value["duration"],
+                    similarities=value["similarities"],
+                    convergence=value["convergence"],
+                )
+                return
+
+            name = key[2]
+            stage_usage = usage[stage["stage"]]
+            if kind == "emit":
+                progress, data = value
+                if progress == "scores":
+                    yield event("scores", **stage, reviewer=name, scores=data)
+                elif round_number == 0:
+                    stage_usage[name] = data
+                else:
+                    stage_usage[name] = add_usage(stage_usage.get(name), data)
+                return
+            review, duration = value
+            if round_number == 0:
+                initial_reviews[name] = review
+            if "error" not in review:
+                received[name] = review
+            yield event(
+                "review",
+                **stage,
+                reviewer=name,
+                review=review,
+                duration=duration,
+                usage=stage_usage.get(name),
+            )
+            if quorum_met():
+                partial_sent = True
+                yield event("partial", result=partial_result())
+
+        # Update rounds may start before the decision to hold them (see
+        # _debate_graph). Their events are held until that decision, and
+        # dropped if the reviewers converged first; token usage is counted
+        # either way, since it was spent.
+        decisions: Dict[int, bool] = {}
+        held: Dict[int, List[Tuple[str, Any, Any]]] = {}
+
+        graph_events = graph.run()
+        try:
+            async for kind, key, value in graph_events:
+                task = key[0]
+                if task == "quorum":
+                    deadline_passed = True
+                    if quorum_met():
+                        partial_sent = True
+                        yield event("partial", result=partial_result())
+                    continue
+                # Review tasks report their reviewer's errors in the review,
+                # so an exception here is a task that could not finish
+                if isinstance(value, Exception):
+                    raise value
+                if task == "decision":
+                    decisions[key[1]] = value
+                    for item in held.pop(key[1] + 1, []):
+                        if not value:
+                            for update in handle(*item):
+                                yield update
+                    continue
+                if task == "review" and key[1] and not (
+                    kind == "emit" and value[0] == "usage"
+                ):
+                    decided = decisions.get(key[1] - 1)
+                    if decided is None:
+                        held.setdefault(key[1], []).append((kind, key, value))
+                        continue
+                    if decided:
+                        continue
+                for update in handle(kind, key, value):
+                    yield update
+        finally:
+            if timer is not None:
+                timer.cancel()
+            await graph_events.aclose()
+
+        # The updated reviews are those of the last round held
+        initial = stages[0]
+        last = stages[max(stages)]
+
+        yield event(
+            "done",
+            result={
+                "partial": False,
+                "individual_reviews": initial["reviews"],
+                "original_similarities": initial["similarities"],
+                "updated_individual_reviews": last["reviews"],
+                "updated_similarities": last["similarities"],
+                "debate": {
+                    "rounds": held_rounds(),
+                    "converged": last["convergence"]["converged"],
+                },
+                "consensus_review": consensus["review"],
+                "consensus_statistics": consensus["statistics"],
+                "usage": usage,
+                "compaction": compaction,
+                "sections": section_notes,
+            },
         )
-        updated_similarities[1, 0] = updated_similarities[0, 1]
-        updated_similarities[2, 0] = updated_similarities[0, 2]
-        updated_similarities[2, 1] = updated_similarities[1, 2]
-        # Generate consensus review if we have valid parsed reviews
-        consensus_review = None
-        if parsed_reviews:
-            try:
-                aggregated_data = aggregate_feedback(parsed_reviews)
-                consensus_review = convert_to_openreview(aggregated_data)
-            except Exception as e:
-                consensus_review = {"error": f"Failed to generate consensus: {str(e)}"}
 
+    def _partial_result(
+        self,
+        names: List[str],
+        initial_reviews: Dict[str, Any],
+        received: Dict[str, Any],
+        rounds: List[Dict[str, Any]],
+        usage: Dict[str, Dict[str, Any]],
+        compaction: Dict[str, Dict[str, Any]],
+        sections: Optional[List[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        The provisional result of a review whose quorum is met.
+
+        The consensus is built locally (see app.review_engine.consensus),
+        which needs no further provider call, and agreement is computed from
+        the reviews received so far.
+
+        Args:
+            names: The reviewers of the paper
+            initial_reviews: The initial reviews received so far
+            received: Each reviewer's latest successful review so far
+            rounds: The update rounds finished so far
+            usage: Token counts so far
+            compaction: Compaction report of the paper per reviewer
+            sections: The sections of a long document with their notes
+
+        Returns:
+            Dictionary like the final result, with "partial" set and the
+            "missing" reviewers that have no successful review yet
+        """
+        initial_reviews = self._in_registry_order(initial_reviews)
+        received = self._in_registry_order(received)
+        parsed_reviews = self._parse_reviews(received)
         return {
-            "individual_reviews": individual_reviews,
-            # "original_similarities": original_similarities, # TODO: Needs to be JSON-parseable
-            "updated_individual_reviews": updated_reviews,
-            # "updated_similarities": updated_similarities,
-            "consensus_review": consensus_review,
+            "partial": True,
+            "missing": [name for name in names if name not in received],
+            "individual_reviews": initial_reviews,
+            "original_similarities": matrix_to_json(
+                list(initial_reviews), compute_agreement(list(initial_reviews.values()))
+            ),
+            "updated_individual_reviews": received,
+            "updated_similarities": matrix_to_json(
+                list(received), compute_agreement(list(received.values()))
+            ),
+            "debate": {"rounds": rounds, "converged": False},
+            "consensus_review": build_consensus(parsed_reviews) if parsed_reviews else None,
+            "consensus_statistics": consensus_statistics(parsed_reviews),
+            "usage": {stage: dict(counts) for stage, counts in usage.items()},
+            "compaction": compaction,
+            "sections": sections,
         }
 
-    async def _get_all_reviews(self, paper_text: str) -> Dict[str, Any]:
+    def _debate_graph(
+        self, papers: Dict[str, str], stream_scores: bool = False
+    ) -> TaskGraph:
         """
-        Get reviews from all configured LLM services in parallel.
+        Build the task graph of the review rounds and the consensus.
+
+        Rounds are not separated by barriers: a reviewer's review in round k
+        needs only the other reviewers' latest reviews, an agreement between
+        two reviews (in "llm" mode) only those two reviews, and the
+        consensus only the final reviews. So a reviewer whose peers are done
+        starts its update while a straggler's review is still running.
+
+        With speculative_rounds, round k starts without waiting for the
+        decision to hold it, which needs every review of round k-1 and, by
+        default, their agreement. If the reviewers converged, the decision
+        cancels the later rounds' calls, and the reviewers' latest reviews,
+        the stage and the consensus ignore whatever those rounds returned.
+        Otherwise round k also waits for the decision, which waits for round
+        k-1 only as far as the convergence test needs: not at all if neither
+        criterion is set, for the round's reviews if only score spread is,
+        and for their agreement otherwise. Rounds after the reviewers
+        converged are SKIPPED.
+
+        Tasks, by key:
+          ("review", k, name): the reviewer's review and call duration in
+            round k, 0 being the initial review; emits ("scores", scores)
+            and ("usage", usage) while it runs
+          ("latest", k, name): the reviewer's latest successful review after
+            round k, its failed review if it never succeeded
+          ("pair", k, i, j): LLM agreement of two of round k's reviews
+          ("agreement", k): round k's agreement matrix
+          ("stage", k): round k's reviews, similarities, convergence and
+            duration
+          ("decision", k): whether the debate ends after round k
+          ("consensus",): the consensus review, statistics and duration
 
         Args:
-            paper_text: The text content of the paper
+            papers: The paper text for each of the paper's reviewers, see
+                _fit_papers
+            stream_scores: Stream provider responses to report scores early
 
         Returns:
-            Dictionary mapping service names to their review results
+            The task graph, ready to run
         """
-        tasks = [
-            self._get_review_from_service("openai", paper_text),
-            self._get_review_from_service("claude", paper_text),
-            self._get_review_from_service("mistral", paper_text),
-        ]
+        graph = TaskGraph()
+        names = list(papers)
+        pairs = [(int(i), int(j)) for i, j in zip(*np.triu_indices(len(names), k=1))]
+        round_started: Dict[int, float] = {}
 
-        # Wait for all reviews to complete
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        def review_task(key: Tuple[Any, ...]):
+            _, round_number, name = key
+
+            async def run(inputs: Dict[Any, Any]):
+                if round_number and inputs.get(("decision", round_number - 1)):
+                    return SKIPPED
+                call_started = time.monotonic()
+                round_started.setdefault(round_number, call_started)
+
+                def on_scores(scores: Dict[str, Any]):
+                    graph.emit(key, ("scores", scores))
+
+                def on_usage(usage: Dict[str, Any]):
+                    graph.emit(key, ("usage", usage))
 
-        # Process results
-        reviews = {}
-        service_names = ["openai", "claude", "mistral"]
-        for name, result in zip(service_names, results):
-            if isinstance(result, Exception):
-                reviews[name] = {"error": str(result)}
-            else:
                 try:
-                    # Parse JSON if it's in JSON format
-                    reviews[name] = self._parse_json_response(result)
-                except json.JSONDecodeError:
-                    reviews[name] = {"error": "Invalid JSON response", "raw": result}
+                    if round_number == 0:
+                        result = await self._get_review_from_service(
+                            name,
+                            papers[name],
+                            on_scores=on_scores if stream_scores else None,
+                            on_usage=on_usage,
+                        )
+                    else:
+                        result = await self._get_updated_review_from_service(
+                            name,
+                            papers[name],
+                            [
+                                inputs[("latest", round_number - 1, other)]
+                                for other in names
+                                if other != name
+                            ],
+                            on_scores=on_scores if stream_scores else None,
+                            on_usage=on_usage,
+                        )
                 except Exception as e:
-                    reviews[name] = {"error": str(e)}
+                    result = e
+                duration = round(time.monotonic() - call_started, 3)
+                return self._parse_review_result(result), duration
 
-        return reviews
+            return run
 
-    async def _get_all_updated_reviews(
-        self, paper_text: str, reviews: dict[str]
-    ) -> Dict[str, Any]:
+        def latest_task(round_number: int, name: str):
+            async def run(inputs: Dict[Any, Any]):
+                result = inputs[("review", round_number, name)]
+                if round_number and inputs[("decision", round_number - 1)]:
+                    result = SKIPPED
+                review = None if result is SKIPPED else result[0]
+                if round_number and (review is None or "error" in review):
+                    return inputs[("latest", round_number - 1, name)]
+                return review
+
+            return run
+
+        def round_reviews(round_number: int, inputs: Dict[Any, Any]):
+            results = [inputs[("review", round_number, name)] for name in names]
+            if any(result is SKIPPED for result in results):
+                return SKIPPED
+            return {name: result[0] for name, result in zip(names, results)}
+
+        def pair_task(round_number: int, i: int, j: int):
+            async def run(inputs: Dict[Any, Any]):
+                first = inputs[("review", round_number, names[i])]
+                second = inputs[("review", round_number, names[j])]
+                if first is SKIPPED or second is SKIPPED:
+                    return SKIPPED
+                return to_score(await get_agreement(first[0], second[0]))
+
+            return run
+
+        def agreement_task(round_number: int):
+            async def run(inputs: Dict[Any, Any]):
+                if self.agreement_mode != "llm":
+                    reviews = round_reviews(round_number, inputs)
+                    if reviews is SKIPPED:
+                        return SKIPPED
+                    return await self._get_similarity_matrix(reviews)
+
+                matrix = np.ones((len(names), len(names)))
+                for i, j in pairs:
+                    score = inputs[("pair", round_number, i, j)]
+                    if score is SKIPPED:
+                        return SKIPPED
+                    if score is None or isinstance(score, Exception):
+                        score = np.nan
+                    matrix[i, j] = matrix[j, i] = score
+                return matrix
+
+            return run
+
+        def stage_task(round_number: int):
+            async def run(inputs: Dict[Any, Any]):
+                if round_number and inputs[("decision", round_number - 1)]:
+                    return SKIPPED
+                reviews = round_reviews(round_number, inputs)
+                matrix = inputs[("agreement", round_number)]
+                if reviews is SKIPPED or matrix is SKIPPED:
+                    return SKIPPED
+                return {
+                    "reviews": reviews,
+                    "similarities": matrix_to_json(names, matrix),
+                    "convergence": self._convergence(reviews, matrix),
+                    "duration": round(
+                        time.monotonic() - round_started[round_number], 3
+                    ),
+                }
+
+            return run
+
+        def converged(round_number: int, inputs: Dict[Any, Any]) -> bool:
+            if round_number and inputs[("decision", round_number - 1)]:
+                return True
+            if ("stage", round_number) in inputs:
+                stage = inputs[("stage", round_number)]
+                return stage is SKIPPED or stage["convergence"]["converged"]
+            if self.convergence_spread is None:
+                return False
+            reviews = round_reviews(round_number, inputs)
+            return reviews is SKIPPED or self._convergence(reviews)["converged"]
+
+        def decision_task(round_number: int):
+            async def run(inputs: Dict[Any, Any]):
+                done = converged(round_number, inputs)
+                if done:
+                    # Stop the rounds started speculatively
+                    for later in range(round_number + 1, self.max_rounds + 1):
+                        for name in names:
+                            graph.cancel(("review", later, name))
+                        for i, j in pairs:
+                            graph.cancel(("pair", later, i, j))
+                return done
+
+            return run
+
+        def decision_deps(round_number: int) -> List[Any]:
+            deps = [("decision", round_number - 1)] if round_number else []
+            if self.convergence_agreement is not None:
+                return deps + [("stage", round_number)]
+            if self.convergence_spread is not None:
+                return deps + [("review", round_number, name) for name in names]
+            return deps
+
+        async def consensus_task(inputs: Dict[Any, Any]):
+            stage_started = time.monotonic()
+            parsed_reviews = self._parse_reviews(
+                {name: inputs[("latest", self.max_rounds, name)] for name in names}
+            )
+            consensus_review = None
+            if parsed_reviews:
+                try:
+                    consensus_review = await self._get_consensus(parsed_reviews)
+                except Exception as e:
+                    consensus_review = {"error": f"Failed to generate consensus: {str(e)}"}
+            return {
+                "review": consensus_review,
+                "statistics": consensus_statistics(parsed_reviews),
+                "duration": round(time.monotonic() - stage_started, 3),
+            }
+
+        for round_number in range(self.max_rounds + 1):
+            for name in names:
+                key = ("review", round_number, name)
+                deps = []
+                if round_number:
+                    deps = [
+                        ("latest", round_number - 1, other)
+                        for other in names
+                        if other != name
+                    ]
+                    if not self.speculative_rounds:
+                        deps.append(("decision", round_number - 1))
+                graph.add(key, review_task(key), deps)
+            for name in names:
+                deps = [("review", round_number, name)]
+                if round_number:
+                    deps += [
+                        ("latest", round_number - 1, name),
+                        ("decision", round_number - 1),
+                    ]
+                graph.add(("latest", round_number, name), latest_task(round_number, name), deps)
+
+            reviews = [("review", round_number, name) for name in names]
+            if self.agreement_mode == "llm":
+                for i, j in pairs:
+                    graph.add(
+                        ("pair", round_number, i, j),
+                        pair_task(round_number, i, j),
+                        [reviews[i], reviews[j]],
+                    )
+                graph.add(
+                    ("agreement", round_number),
+                    agreement_task(round_number),
+                    [("pair", round_number, i, j) for i, j in pairs],
+                )
+            else:
+                graph.add(("agreement", round_number), agreement_task(round_number), reviews)
+            stage_deps = reviews + [("agreement", round_number)]
+            if round_number:
+                stage_deps.append(("decision", round_number - 1))
+            graph.add(("stage", round_number), stage_task(round_number), stage_deps)
+            if round_number < self.max_rounds:
+                graph.add(
+                    ("decision", round_number),
+                    decision_task(round_number),
+                    decision_deps(round_number),
+                )
+
+        graph.add(
+            ("consensus",),
+            consensus_task,
+            [("latest", self.max_rounds, name) for name in names],
+        )
+        return graph
+
+    def _compact(self, paper_text: str) -> str:
+        return compact(paper_text) if self.compaction else paper_text
+
+    def _fit_papers(
+        self, paper_text: str, names: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
         """
-        Get updated reviews from all configured LLM services in parallel.
+        Fit the paper to each reviewer's token budget.
+
+        A reviewer's budget is PAPER_TOKEN_BUDGET or what its model's context
+        window leaves after the prompts, the peer reviews of the update round
+        and the response, whichever is smaller.
 
         Args:
             paper_text: The text content of the paper
-            reviews: The reviews from the previous iteration
+            names: The reviewers to fit it for, defaults to all
 
         Returns:
-            Dictionary mapping service names to their review results
+            Tuple of the paper text for each reviewer and a report for each
+            reviewer, see fit_to_budget
         """
-        tasks = [
-            self._get_updated_review_from_service(
-                "openai", paper_text, reviews["claude"], reviews["mistral"]
-            ),
-            self._get_updated_review_from_service(
-                "claude", paper_text, reviews["openai"], reviews["mistral"]
-            ),
-            self._get_updated_review_from_service(
-                "mistral", paper_text, reviews["openai"], reviews["claude"]
-            ),
-        ]
+        service_names = names if names is not None else self.registry.names()
+        papers = {}
+        reports = {}
+        for name in service_names:
+            reviewer = self.registry.get(name)
+            provider = getattr(reviewer, "provider", "openai")
+            model = getattr(reviewer, "model", None)
 
-        # Wait for all reviews to complete
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+            def count(text: str) -> int:
+                return count_tokens(text, provider, model)
 
-        # Process results
-        reviews = {}
-        service_names = ["openai", "claude", "mistral"]
-        for name, result in zip(service_names, results):
-            if isinstance(result, Exception):
-                reviews[name] = {"error": str(result)}
-            else:
+            # The prompts may be prompt models rendered by str()
+            reserved = (
+                count(str(self.review_prompt))
+                + count(str(self.update_review_prompt))
+                + PEER_REVIEW_TOKENS * (len(service_names) - 1)
+                + ESTIMATED_OUTPUT_TOKENS
+            )
+            papers[name], reports[name] = fit_to_budget(
+                paper_text, context_budget(provider, model, reserved), count
+            )
+        return papers, reports
+
+    def _select_reviewers(self) -> List[str]:
+        """
+        The reviewers to use for a paper, in registry order.
+
+        With reviewers_per_paper set, reviewers whose provider's circuit is
+        open are passed over, and of the rest the fastest by median latency
+        are picked, those without latency data first so they get measured.
+        If too few are healthy, the others make up the number and fail fast.
+        Without it every reviewer is used; those with an open circuit fail
+        at once, see app.services.llm.health.
+
+        Returns:
+            Names of the selected reviewers
+        """
+        names = self.registry.names()
+        if not self.reviewers_per_paper or self.reviewers_per_paper >= len(names):
+            return names
+
+        def rank(name: str) -> Tuple[bool, float]:
+            reviewer = self.registry.get(name)
+            health = getattr(reviewer, "health", None)
+            latency = getattr(reviewer, "latency", None)
+            median = latency.percentile(50) if latency is not None else None
+            healthy = health is None or health.available()
+            return (not healthy, median if median is not None else 0.0)
+
+        selected = set(sorted(names, key=rank)[: self.reviewers_per_paper])
+        return [name for name in names if name in selected]
+
+    def _use_long_document(self, reports: Dict[str, Dict[str, Any]]) -> bool:
+        if self.long_document == "always":
+            return True
+        if self.long_document == "never":
+            return False
+        return any(
+            report["truncated"] or report["dropped_appendix"]
+            for report in reports.values()
+        )
+
+    def _split_sections(
+        self, paper_text: str, reports: Dict[str, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        # Any reviewer may get any section, so sections must fit the smallest
+        # budget with room for the context sent along
+        smallest = min((report["budget"] for report in reports.values()), default=0)
+        max_tokens = min(
+            LONG_DOCUMENT_SECTION_TOKENS,
+            max(1000, smallest - count_tokens(paper_text[:SECTION_CONTEXT_CHARS])),
+        )
+        return split_sections(paper_text, max_tokens, count_tokens)
+
+    def _section_review_calls(
+        self, paper_text: str, sections: List[Dict[str, Any]], names: List[str]
+    ) -> Dict[str, ReviewCall]:
+        semaphore = asyncio.Semaphore(LONG_DOCUMENT_MAX_CONCURRENCY)
+        context = paper_text[:SECTION_CONTEXT_CHARS]
+        return {
+            str(index): functools.partial(
+                self._review_section, index, context, section, semaphore, names
+            )
+            for index, section in enumerate(sections)
+        }
+
+    async def _review_section(
+        self,
+        index: int,
+        context: str,
+        section: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        service_names: List[str],
+        on_scores: Optional[ScoresCallback] = None,
+        on_usage: Optional[UsageCallback] = None,
+    ) -> str:
+        """
+        Get notes on one section of a long document.
+
+        Sections are assigned to reviewers in turn, so the work is spread
+        over all providers; if a reviewer fails, the next one is tried.
+
+        Args:
+            index: Position of the section in the document
+            context: The start of the document
+            section: The section; its "reviewer" is set to the reviewer
+                that wrote the notes
+            semaphore: Bounds the sections critiqued at once
+            service_names: The reviewers of the paper
+            on_scores: Unused, sections have no scores
+            on_usage: Called with the token counts of each request
+
+        Returns:
+            Raw response from the LLM service
+        """
+        request = section_request(context, section)
+        errors = []
+        async with semaphore:
+            for offset in range(len(service_names)):
+                name = service_names[(index + offset) % len(service_names)]
                 try:
-                    # Parse JSON if it's in JSON format
-                    reviews[name] = self._parse_json_response(result)
-                except json.JSONDecodeError:
-                    reviews[name] = {"error": "Invalid JSON response", "raw": result}
+                    # Section notes have no scores, so is_review would never
+                    # let them into the cache
+                    result = await self.registry.get(name).review(
+                        request,
+                        SECTION_REVIEW_PROMPT,
+                        on_usage=on_usage,
+                        cacheable=has_text,
+                    )
                 except Exception as e:
-                    reviews[name] = {"error": str(e)}
+                    errors.append(f"{name}: {str(e)}")
+                    continue
+                section["reviewer"] = name
+                return result
+        raise Exception(f"Section {section['title']} failed: {'; '.join(errors)}")
 
-        return reviews
+    def _in_registry_order(self, reviews: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: reviews[name] for name in self.registry.names() if name in reviews}
 
-    async def _get_review_from_service(self, service_name: str, paper_text: str) -> str:
+    async def _iter_reviews(
+        self, calls: Dict[str, ReviewCall], stream_scores: bool = False
+    ) -> AsyncIterator[Tuple[str, str, Dict[str, Any], Optional[float]]]:
+        """
+        Run review calls concurrently and yield results as they arrive.
+
+        Args:
+            calls: Dictionary mapping service names to review call functions
+            stream_scores: Also yield the scores of each response while it
+                is still being generated
+
+        Yields:
+            Tuples of (kind, service name, data, duration). Kind is "scores",
+            with the scores found so far, "usage", with the token counts of a
+            request sent to the provider, or "review", with the parsed review
+            or error and the call duration. Only reviews have a duration; they
+            come in completion order.
+        """
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def timed(name: str, call: ReviewCall):
+            def on_scores(scores: Dict[str, Any]):
+                results.put_nowait(("scores", name, scores, None))
+
+            def on_usage(usage: Dict[str, Any]):
+                results.put_nowait(("usage", name, usage, None))
+
+            call_started = time.monotonic()
+            try:
+                result = await call(
+                    on_scores=on_scores if stream_scores else None, on_usage=on_usage
+                )
+            except Exception as e:
+                result = e
+            duration = round(time.monotonic() - call_started, 3)
+            results.put_nowait(("review", name, self._parse_review_result(result), duration))
+
+        tasks = [asyncio.ensure_future(timed(name, call)) for name, call in calls.items()]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await results.get()
+                if item[0] == "review":
+                    remaining -= 1
+                yield item
+        finally:
+            # Stop outstanding calls if the consumer goes away
+            for task in tasks:
+                task.cancel()
+
+    def _parse_review_result(self, result: Any) -> Dict[str, Any]:
+        """
+        Turn a raw review call result into a review dictionary.
+
+        Args:
+            result: The raw response text, or the exception the call raised
+
+        Returns:
+            Parsed review, or a dictionary with an "error" key
+        """
+        if isinstance(result, Exception):
+            return {"error": str(result)}
+        try:
+            # Parse JSON if it's in JSON format
+            return self._parse_json_response(result)
+        except ValueError:
+            return {"error": "Invalid JSON response", "raw": result}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def _get_review_from_service(
+        self,
+        service_name: str,
+        paper_text: str,
+        on_scores: Optional[ScoresCallback] = None,
+        on_usage: Optional[UsageCallback] = None,
+    ) -> str:
         """
         Get a review from a specific LLM service.
 
         Args:
-            service_name: Name of the service to use ('openai', 'claude', 'mistral')
+            service_name: Name of the registered reviewer to use
             paper_text: The text content of the paper
+            on_scores: Called with the scores found so far while the
+                response streams in
+            on_usage: Called with the token counts of the request
 
         Returns:
             Raw response from the LLM service
         """
         try:
-            if service_name == "openai":
-                return get_openai_review(paper_text, self.review_prompt)
-            elif service_name == "claude":
-                return get_claude_review(paper_text, self.review_prompt)
-            elif service_name == "mistral":
-                return get_mistral_review(paper_text, self.review_prompt)
-            else:
-                raise ValueError(f"Unknown service: {service_name}")
+            reviewer = self.registry.get(service_name)
+            return await reviewer.review(
+                paper_text, self.review_prompt, on_scores=on_scores, on_usage=on_usage
+            )
         except Exception as e:
             raise Exception(f"Service {service_name} failed: {str(e)}")
 
     async def _get_updated_review_from_service(
-        self, service_name: str, paper_text: str, review1: dict[str], review2: dict[str]
+        self,
+        service_name: str,
+        paper_text: str,
+        other_reviews: List[Dict[str, Any]],
+        on_scores: Optional[ScoresCallback] = None,
+        on_usage: Optional[UsageCallback] = None,
     ) -> str:
         """
         Get an updated review from a specific LLM service.
 
         Args:
-            service_name: Name of the service to use ('openai', 'claude', 'mistral')
+            service_name: Name of the registered reviewer to use
             paper_text: The text content of the paper
-            review1: The review from another service
-            review2: The review from yet another service
+            other_reviews: The reviews from every other reviewer
+            on_scores: Called with the scores found so far while the
+                response streams in
+            on_usage: Called with the token counts of the request
 
         Returns:
             Raw response from the LLM service
         """
         try:
-            if service_name == "openai":
-                return get_updated_openai_review(
-                    paper_text, self.update_review_prompt, review1, review2
-                )
-            elif service_name == "claude":
-                return get_updated_claude_review(
-                    paper_text, self.update_review_prompt, review1, review2
-                )
-            elif service_name == "mistral":
-                return get_updated_mistral_review(
-                    paper_text, self.update_review_prompt, review1, review2
-                )
-            else:
-                raise ValueError(f"Unknown service: {service_name}")
+            reviewer = self.registry.get(service_name)
+            return await reviewer.updated_review(
+                paper_text,
+                self.review_prompt,
+                self.update_review_prompt,
+                other_reviews,
+                on_scores=on_scores,
+                on_usage=on_usage,
+            )
         except Exception as e:
             raise Exception(f"Service {service_name} failed: {str(e)}")
 
+    async def _get_similarity_matrix(self, reviews: Dict[str, Any]) -> np.ndarray:
+        """
+        Compute the pairwise agreement between all reviewers.
+
+        In "local" mode this is computed from the reviews' scores and text,
+        see app.review_engine.agreement. In "llm" mode an LLM judges every
+        pair of reviews.
+
+        Args:
+            reviews: Dictionary mapping reviewer names to their reviews
+
+        Returns:
+            Symmetric N x N matrix with ones on the diagonal, in registry order
+        """
+        if self.agreement_mode != "llm":
+            return compute_agreement(list(reviews.values()))
+
+        names = list(reviews)
+        rows, cols = np.triu_indices(len(names), k=1)
+        agreements = await asyncio.gather(
+            *(
+                get_agreement(reviews[names[i]], reviews[names[j]])
+                for i, j in zip(rows, cols)
+            )
+        )
+
+        similarities = np.ones((len(names), len(names)))
+        similarities[rows, cols] = [
+            score if score is not None else np.nan
+            for score in map(to_score, agreements)
+        ]
+        similarities[cols, rows] = similarities[rows, cols]
+        return similarities
+
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """
-        Parse JSON response from an LLM, handling markdown code blocks.
+        Parse JSON response from an LLM, handling markdown code blocks,
+        surrounding prose and malformed or cut-off JSON, see repair_json.
 
         Args:
             response_text: Raw response text from LLM
 
         Returns:
             Parsed JSON object
-        """
-        # Strip markdown code block if present
-        json_match = re.search(r"```json\n(.*?)\n```", response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
 
-        return json.loads(response_text)
+        Raises:
+            ValueError: If the response holds no JSON object
+        """
+        parsed = repair_json(response_text)
+        if not isinstance(parsed, dict):
+            raise ValueError("Response is not a JSON object")
+        return parsed
 
-    def _parse_reviews(
-        self, individual_reviews: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
+    def _convergence(
+        self, reviews: Dict[str, Any], matrix: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
         """
-        Convert raw reviews to a format suitable for aggregation.
+        Whether the reviewers have converged, ending the debate.
 
         Args:
-            individual_reviews: Dictionary of reviews from different services
+            reviews: The round's reviews, in registry order
+            matrix: Their agreement matrix, if known
 
         Returns:
-            List of parsed review dictionaries ready for aggregation
+            Dictionary with the "score_spread" (see score_dispersion), the
+            mean pairwise "agreement" and whether the reviewers "converged".
+            With a convergence criterion set, fewer than two successful
+            reviewers have nothing to debate; with none, the debate always
+            runs max_rounds.
         """
-        parsed_reviews = []
+        spread = score_dispersion(list(reviews.values()))
+        agreement = float("nan")
+        if matrix is not None:
+            pairs = matrix[~np.eye(len(matrix), dtype=bool)]
+            pairs = pairs[~np.isnan(pairs)]
+            if pairs.size:
+                agreement = float(pairs.mean())
+
+        successful = sum("error" not in review for review in reviews.values())
+        tested = self.convergence_spread is not None or self.convergence_agreement is not None
+        converged = (
+            (tested and successful < 2)
+            or (self.convergence_spread is not None and spread <= self.convergence_spread)
+            or (
+                self.convergence_agreement is not None
+                and agreement >= self.convergence_agreement
+            )
+        )
+        return {
+            "score_spread": None if np.isnan(spread) else round(spread, 3),
+            "agreement": None if np.isnan(agreement) else round(agreement, 3),
+            "converged": bool(converged),
+        }
+
+    async def _get_consensus(self, parsed_reviews: List[ParsedReview]) -> Review:
+        """
+        Write the consensus review.
+
+        In "local" mode it is built from the reviews directly, see
+        app.review_engine.consensus. "polish" has an LLM edit that review,
+        keeping the local one if the LLM call fails. "llm" has the LLM write
+        it from all reviews.
+
+        Args:
+            parsed_reviews: Parsed reviews of the reviewers that succeeded
 
-        for service_name, review in individual_reviews.items():
-            if "error" in review:
-                continue  # Skip failed reviews
+        Returns:
+            The consensus review
+        """
+        if self.consensus_mode == "llm":
+            return await convert_to_openreview(aggregate_feedback(parsed_reviews))
 
+        consensus = build_consensus(parsed_reviews)
+        if self.consensus_mode == "polish":
             try:
-                # Format the review as text for the parser
-                formatted_review = self._format_review_for_parser(review)
-                if formatted_review:
-                    parsed = parse_llm_feedback(formatted_review)
-                    if parsed:
-                        parsed_reviews.append(parsed)
+                return await polish_review(consensus)
             except Exception:
-                continue  # Skip reviews that can't be parsed
+                return consensus
+        return consensus
 
-        return parsed_reviews
-
-    def _format_review_for_parser(self, review: Dict[str, Any]) -> Optional[str]:
+    def _parse_reviews(
+        self, individual_reviews: Dict[str, Any]
+    ) -> List[ParsedReview]:
         """
-        Format a JSON review into text format for the parser.
+        Convert raw reviews to typed reviews for aggregation.
+
+        Reviews whose response was not valid JSON are read from their raw
+        text, so only reviews that failed outright are left out.
 
         Args:
-            review: Review data as a dictionary
+            individual_reviews: Dictionary of reviews from different services
 
         Returns:
-            Formatted text string or None if formatting fails
+            List of parsed reviews ready for aggregation
         """
-        try:
-            # Extract and format different parts of the review
-            summary = review.get("summary", "")
-
-            strengths = "\n".join(review.get("strengths", []))
-            weaknesses = "\n".join(review.get("weaknesses", []))
-
-            # Handle optional fields (could be string or list)
-            questions = review.get("questions", [])
-            if isinstance(questions, list):
-                questions = "\n".join(questions)
-
-            limitations = review.get("limitations", "")
-            if isinstance(limitations, list):
-                limitations = "\n".join(limitations)
-
-            # Use scores directly from provided fields
-            soundness = review.get("soundness", 3)
-            presentation = review.get("presentation", 3)
-            contribution = review.get("contribution", 3)
-            rating = review.get("rating", 5)
-
-            # Create the formatted text
-            formatted = f"""
-            Summary: {summary}
-            Soundness: {soundness}
-            Presentation: {presentation}
-            Contribution: {contribution}
-            Strengths: {strengths}
-            Weaknesses: {weaknesses}
-            Questions: {questions}
-            Limitations: {limitations}
-            Rating: {rating}
-            """.strip()
-            return formatted
-
-        except Exception as e:
-            return None
+        parsed_reviews = []
+        for review in individual_reviews.values():
+            if "error" not in review:
+                parsed_reviews.append(parse_review(review))
+            elif review.get("raw"):
+                parsed_reviews.append(parse_review(review["raw"]))
+        return parsed_reviews
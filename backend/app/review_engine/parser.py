@@ -1,4 +1,248 @@
+import json
 import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+SCORE_FIELDS = ("soundness", "presentation", "contribution", "rating", "confidence")
+TEXT_FIELDS = ("summary", "strengths", "weaknesses", "questions", "limitations")
+
+# Labels of review fields at the start of a line, e.g. "Soundness:",
+# "**Rating**:" or "## Weaknesses:". One pass over the text finds all of them.
+_LABEL = re.compile(
+    r"^[ \t>*#\-]*(" + "|".join(TEXT_FIELDS + SCORE_FIELDS) + r")[ \t*]*:[ \t*]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_CODE_BLOCK = re.compile(r"```(?:json)?\s*\n(.*?)(?:\n\s*```|$)", re.DOTALL)
+
+# Fields dropped from the end of a cut-off object before giving up on it
+MAX_REPAIR_CUTS = 20
+
+_STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+@dataclass(slots=True)
+class ParsedReview:
+    """A review in typed form. Missing scores are None, missing text is empty."""
+
+    summary: str = ""
+    soundness: Optional[float] = None
+    presentation: Optional[float] = None
+    contribution: Optional[float] = None
+    strengths: str = ""
+    weaknesses: str = ""
+    questions: str = ""
+    limitations: str = ""
+    rating: Optional[float] = None
+    confidence: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def to_score(value: Any) -> Optional[float]:
+    """Read a score given as a number, a numeric string or a one-element list."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return float(match.group())
+    return None
+
+
+def to_text(value: Any) -> str:
+    """Flatten a text field given as a string, a list or a mapping."""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return "\n".join(str(item).strip() for item in value if item is not None)
+    if isinstance(value, dict):
+        return "\n".join(f"{key}: {to_text(item)}" for key, item in value.items())
+    return str(value).strip()
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _repair(candidate: str) -> str:
+    """
+    Fix the JSON defects models produce, in one pass over the text.
+
+    Removes // comments and trailing commas, escapes raw control characters
+    inside strings, ignores anything after the top-level value, and closes
+    strings, arrays and objects left open by a cut-off response.
+    """
+    out: List[str] = []
+    closers: List[str] = []
+    in_string = False
+    escaped = False
+    i = 0
+    while i < len(candidate):
+        char = candidate[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            out.append(_STRING_ESCAPES.get(char, char))
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif candidate.startswith("//", i):
+            end = candidate.find("\n", i)
+            i = len(candidate) if end == -1 else end
+            continue
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            if closers:
+                closers.pop()
+            out.append(char)
+            if not closers:
+                break
+        else:
+            out.append(char)
+        i += 1
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    _drop_trailing_comma(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    return "".join(out) + "".join(reversed(closers))
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse the JSON object in a model response, repairing it if needed.
+
+    The object may be inside a code block or surrounded by prose. If it is
+    not valid JSON it is repaired, see _repair; a response cut off in the
+    middle of a field keeps the fields before it.
+
+    Args:
+        text: The response text
+
+    Returns:
+        The parsed object
+
+    Raises:
+        ValueError: If no JSON object can be recovered
+    """
+    block = _CODE_BLOCK.search(text)
+    candidate = block.group(1) if block else text
+    start = candidate.find("{")
+    if start == -1:
+        raise ValueError("No JSON object in response")
+    candidate = candidate[start:]
+
+    try:
+        return json.JSONDecoder().raw_decode(candidate)[0]
+    except ValueError:
+        pass
+    for _ in range(MAX_REPAIR_CUTS):
+        try:
+            return json.loads(_repair(candidate))
+        except ValueError:
+            # Drop the last, incomplete field and try again
+            cut = candidate.rfind(",")
+            if cut <= 0:
+                break
+            candidate = candidate[:cut]
+    raise ValueError("Response is not valid JSON and could not be repaired")
+
+
+def review_from_dict(data: Mapping[str, Any]) -> ParsedReview:
+    """
+    Validate a review returned as JSON into a ParsedReview.
+
+    Field names are matched case-insensitively. Scores may be numbers,
+    numeric strings or one-element lists, and keep their fractional part;
+    text fields may be strings or lists, which are joined line by line.
+    Unknown fields are ignored.
+
+    Args:
+        data: The review as a dictionary
+
+    Returns:
+        The typed review
+    """
+    fields = {str(key).lower(): value for key, value in data.items()}
+    review = ParsedReview()
+    for field in SCORE_FIELDS:
+        setattr(review, field, to_score(fields.get(field)))
+    for field in TEXT_FIELDS:
+        setattr(review, field, to_text(fields.get(field)))
+    return review
+
+
+def review_from_text(text: str) -> ParsedReview:
+    """
+    Extract a review from labelled free text ("Summary: ...", "Rating: 6").
+
+    Each field's value runs from its label to the next label, so multi-line
+    fields are kept whole. When a label appears twice, the first wins.
+
+    Args:
+        text: The review text
+
+    Returns:
+        The typed review, with defaults for fields that were not found
+    """
+    review = ParsedReview()
+    found = set()
+    matches = list(_LABEL.finditer(text))
+    for match, following in zip(matches, matches[1:] + [None]):
+        field = match.group(1).lower()
+        if field in found:
+            continue
+        found.add(field)
+        value = text[match.end() : following.start() if following else len(text)]
+        if field in SCORE_FIELDS:
+            setattr(review, field, to_score(value))
+        else:
+            setattr(review, field, value.strip())
+    return review
+
+
+def parse_review(value: Union[str, Mapping[str, Any]]) -> ParsedReview:
+    """
+    Parse a review from any form a model returns it in.
+
+    Dictionaries are validated directly. Text is parsed as JSON, repaired
+    if needed (see repair_json), and otherwise read as labelled free text.
+
+    Args:
+        value: The review as a dictionary or as the model's response text
+
+    Returns:
+        The typed review
+    """
+    if isinstance(value, Mapping):
+        return review_from_dict(value)
+
+    try:
+        data = repair_json(value)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        return review_from_dict(data)
+    return review_from_text(value)
 
 
 def parse_llm_feedback(text: str) -> dict:
@@ -15,38 +259,9 @@ def parse_llm_feedback(text: str) -> dict:
       Limitations:
       Rating:
 
-    Returns a dictionary with the parsed values.
-    """
-    # Define a regex pattern for each field.
-    patterns = {
-        "summary": r"Summary:\s*(.*?)(?=\n\S+?:|$)",
-        "soundness": r"Soundness:\s*([0-5])",
-        "presentation": r"Presentation:\s*([0-5])",
-        "contribution": r"Contribution:\s*([0-5])",
-        "strengths": r"Strengths:\s*(.*?)(?=\n\S+?:|$)",
-        "weaknesses": r"Weaknesses:\s*(.*?)(?=\n\S+?:|$)",
-        "questions": r"Questions:\s*(.*?)(?=\n\S+?:|$)",
-        "limitations": r"Limitations:\s*(.*?)(?=\n\S+?:|$)",
-        "rating": r"Rating:\s*([0-9]{1,2})",
-    }
-
-    feedback = {}
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-        if match:
-            value = match.group(1).strip()
-            if key in ["soundness", "presentation", "contribution"]:
-                try:
-                    feedback[key] = int(value)
-                except ValueError:
-                    feedback[key] = None
-            elif key == "rating":
-                try:
-                    feedback[key] = int(value)
-                except ValueError:
-                    feedback[key] = None
-            else:
-                feedback[key] = value
-        else:
-            feedback[key] = None
+    Returns a dictionary with the parsed values; missing scores are None.
+    """
+    feedback = review_from_text(text).to_dict()
+    for field in TEXT_FIELDS:
+        feedback[field] = feedback[field] or None
     return feedback
@@ -168,15 +168,19 @@ class PROMPT(BaseModel):
 PROMPT = PROMPT()
 
 class UPDATE_REVIEW_PROMPT(BaseModel):
-    """Prompt for updating a review."""
+    """
+    Prompt for updating a review.
+
+    Sent after the review PROMPT and the paper, which open every request
+    unchanged so providers can serve them from their prompt cache.
+    """
 
     context: str = (
         "You are updating your review for a research paper. "
         "You have already provided an initial review and are now revising it based on new information from other reviewers. "
         "Be professional, polite, and listen to the other reviewers, but do not give in to undue influence. "
         "Clearly indicate how your review has changed and justify any modifications. "
-        "This was the original prompt used for your initial review:\n\n"
-        f"{PROMPT}\n\n"
+        "The instructions for your initial review are given above; the reviews of the other reviewers follow below. "
         "Please provide your updated review structured strictly according to the same JSON schema as your initial response."
     )
 
@@ -186,3 +190,36 @@ class UPDATE_REVIEW_PROMPT(BaseModel):
 # Create the prompt instance - the router code initializes the ReviewEngine with PROMPT
 
 UPDATE_REVIEW_PROMPT = UPDATE_REVIEW_PROMPT()
+
+class SECTION_REVIEW_PROMPT(BaseModel):
+    """
+    Prompt for critiquing one section of a document too long to review at
+    once. The notes on all sections are then turned into a review with PROMPT.
+    """
+
+    context: str = (
+        "You are an expert scientific reviewer. "
+        "The document under review is too long to read at once, so each reviewer critiques one section of it. "
+        "You are given the beginning of the document for context and one section to review. "
+        "Read the section carefully and take notes that another reviewer, who will not see the section, can base a full review on. "
+        "Be specific: name the methods, results, numbers, proofs and claims you comment on. "
+        "Do not reveal or guess author identities."
+    )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.context}\n\n"
+            "Provide your notes structured strictly as JSON according to the following schema:\n\n"
+            "```json\n"
+            "{\n"
+            '  "summary": "<What the section does, in a few sentences>",\n'
+            '  "claims": ["<Main claims or results of the section>"],\n'
+            '  "strengths": ["<Strengths of the section>"],\n'
+            '  "weaknesses": ["<Weaknesses, errors or unsupported claims in the section>"],\n'
+            '  "questions": ["<Questions for the authors about the section>"]\n'
+            "}\n"
+            "```\n\n"
+            "Format your response as valid JSON without any additional text or explanation."
+        )
+
+SECTION_REVIEW_PROMPT = SECTION_REVIEW_PROMPT()
@@ -0,0 +1,180 @@
+"""
+In-process scheduler for review pipelines.
+
+Every review fans out to several providers, so running an unbounded number
+of them at once only multiplies rate-limit errors. The scheduler runs at most
+max_concurrent reviews at a time, serves interactive work before bulk work,
+and turns new work away once the queue is deep enough that it would not
+start soon anyway.
+"""
+import asyncio
+import itertools
+import math
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from app.config import (
+    REVIEW_BULK_MAX_QUEUE,
+    REVIEW_MAX_CONCURRENT,
+    REVIEW_MAX_QUEUE,
+)
+
+# Priority lanes, lower runs first
+INTERACTIVE = 0
+BULK = 1
+
+PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+
+class SchedulerFull(Exception):
+    """Raised when a review is not admitted because the queue is too deep."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Review queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ReviewScheduler:
+    """Priority queue of review jobs drained by a fixed number of workers."""
+
+    def __init__(
+        self,
+        max_concurrent: int = REVIEW_MAX_CONCURRENT,
+        max_queue: int = REVIEW_MAX_QUEUE,
+        bulk_max_queue: int = REVIEW_BULK_MAX_QUEUE,
+    ):
+        """
+        Initialize the scheduler. Workers are started on first submit.
+
+        Args:
+            max_concurrent: Maximum number of reviews running at once
+            max_queue: Queue depth at which all new work is rejected
+            bulk_max_queue: Queue depth at which new bulk work is rejected,
+                keeping the rest of the queue for interactive work
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.bulk_max_queue = bulk_max_queue
+        self.running = 0
+        # Moving average of review duration, used to estimate Retry-After
+        self.average_duration = 60.0
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _retry_after(self) -> int:
+        waves = (self.queue_depth + 1) / self.max_concurrent
+        return max(1, math.ceil(waves * self.average_duration))
+
+    def check_admission(self, priority: int = INTERACTIVE) -> None:
+        """
+        Reject work that would wait too long.
+
+        Raises:
+            SchedulerFull: If the queue for this priority is at capacity
+        """
+        limit = self.max_queue if priority == INTERACTIVE else self.bulk_max_queue
+        if self.queue_depth >= limit:
+            raise SchedulerFull(self._retry_after())
+
+    def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.max_concurrent)
+            ]
+
+    def submit(
+        self, fn: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE
+    ) -> asyncio.Future:
+        """
+        Queue a review and return a future for its result.
+
+        Args:
+            fn: Coroutine function running the review
+            priority: INTERACTIVE or BULK
+
+        Returns:
+            Future resolved with the result of fn
+
+        Raises:
+            SchedulerFull: If the queue for this priority is at capacity
+        """
+        self.check_admission(priority)
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        # The sequence number keeps FIFO order within a priority lane
+        self._queue.put_nowait((priority, next(self._sequence), fn, future))
+        return future
+
+    async def run(
+        self, fn: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE
+    ) -> Any:
+        """Queue a review and wait for its result."""
+        return await self.submit(fn, priority)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, fn, future = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                self.running += 1
+                started = time.monotonic()
+                # The review runs in its own task, so cancelling the caller's
+                # future stops it, and a review that ends cancelled does not
+                # take the worker down with it
+                task = asyncio.ensure_future(fn())
+
+                def stop(future: asyncio.Future, task: asyncio.Task = task) -> None:
+                    if future.cancelled():
+                        task.cancel()
+
+                future.add_done_callback(stop)
+                try:
+                    await asyncio.wait({task})
+                except asyncio.CancelledError:
+                    # The scheduler is shutting down
+                    task.cancel()
+                    raise
+                finally:
+                    self.running -= 1
+                    duration = time.monotonic() - started
+                    self.average_duration = (
+                        0.8 * self.average_duration + 0.2 * duration
+                    )
+                if future.done():
+                    continue
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queue_depth,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "average_duration": round(self.average_duration, 2),
+        }
+
+    async def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+review_scheduler = ReviewScheduler()
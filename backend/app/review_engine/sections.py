@@ -0,0 +1,165 @@
+"""
+Section splitting for long documents.
+
+Papers with long appendices and theses do not fit in one review request.
+They are split into sections of a bounded size, each section is critiqued
+separately, and the notes are put together into one document that reviewers
+write their review from, see ReviewEngine.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+# Headings: markdown headings, numbered headings ("3", "3.2", "A.1") and
+# unnumbered headings common in papers and theses
+_HEADING = re.compile(
+    r"^[ \t]*(?:"
+    r"#{1,6}[ \t]+\S[^\n]*"
+    r"|(?:[A-Z]|\d{1,2})(?:\.\d{1,2}){0,3}\.?[ \t]+[A-Z][^\n.]{1,80}"
+    r"|(?:abstract|introduction|background|related work|conclusions?|discussion"
+    r"|acknowledge?ments|appendix|appendices|chapter[ \t]+\w+)\b[^\n]{0,80}"
+    r")[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+NOTES_PREAMBLE = (
+    "This document is too long to include in full. Below are notes on each "
+    "of its sections, in order, written by reviewers who read the section "
+    "in full. Base your review on these notes."
+)
+
+
+def _by_heading(text: str) -> List[Dict[str, str]]:
+    """Split text at headings into sections with a title and text."""
+    starts = [match.start() for match in _HEADING.finditer(text)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        body = text[start:end].strip()
+        if body:
+            first_line = body.split("\n", 1)[0]
+            title = first_line.lstrip("#").strip() if _HEADING.match(first_line) else "Front matter"
+            sections.append({"title": title[:100], "text": body})
+    return sections
+
+
+def _by_paragraph(section: Dict[str, str], max_tokens: int, count: Callable[[str], int]) -> List[Dict[str, str]]:
+    """Split a section that is too long at paragraphs, or lines as a last resort."""
+    pieces = re.split(r"\n\s*\n", section["text"])
+    if len(pieces) == 1:
+        pieces = section["text"].split("\n")
+
+    parts: List[List[str]] = [[]]
+    tokens = 0
+    for piece in pieces:
+        piece_tokens = count(piece)
+        if parts[-1] and tokens + piece_tokens > max_tokens:
+            parts.append([])
+            tokens = 0
+        parts[-1].append(piece)
+        tokens += piece_tokens
+
+    if len(parts) == 1:
+        return [section]
+    return [
+        {"title": f"{section['title']} (part {k} of {len(parts)})", "text": "\n\n".join(part)}
+        for k, part in enumerate(parts, start=1)
+    ]
+
+
+def split_sections(
+    text: str, max_tokens: int, count: Callable[[str], int]
+) -> List[Dict[str, str]]:
+    """
+    Split a document into sections of at most about max_tokens each.
+
+    The document is split at its headings. Consecutive short sections are
+    merged, so a chunk covers several subsections, and sections longer than
+    max_tokens are split at paragraphs.
+
+    Args:
+        text: The compacted document text
+        max_tokens: Target size of each section in tokens
+        count: Token counting function
+
+    Returns:
+        Sections in document order, each with a "title" and "text"
+    """
+    sections: List[Dict[str, str]] = []
+    for section in _by_heading(text):
+        sections.extend(_by_paragraph(section, max_tokens, count))
+
+    chunks: List[Dict[str, Any]] = []
+    for section in sections:
+        tokens = count(section["text"])
+        if chunks and chunks[-1]["tokens"] + tokens <= max_tokens:
+            chunks[-1]["titles"].append(section["title"])
+            chunks[-1]["text"] += "\n\n" + section["text"]
+            chunks[-1]["tokens"] += tokens
+        else:
+            chunks.append({"titles": [section["title"]], "text": section["text"], "tokens": tokens})
+
+    return [
+        {
+            "title": chunk["titles"][0]
+            if len(chunk["titles"]) == 1
+            else f"{chunk['titles'][0]} to {chunk['titles'][-1]}",
+            "text": chunk["text"],
+        }
+        for chunk in chunks
+    ]
+
+
+def section_request(context: str, section: Dict[str, str]) -> str:
+    """
+    Text sent for the critique of one section.
+
+    Args:
+        context: The start of the document (title, abstract), so the section
+            can be read in context
+        section: The section to critique
+    """
+    return (
+        f"Beginning of the document, for context:\n{context}\n\n"
+        f"Section to review: {section['title']}\n\n{section['text']}"
+    )
+
+
+def _format_list(value: Any) -> str:
+    if isinstance(value, list):
+        return "\n".join(f"- {item}" for item in value)
+    return str(value)
+
+
+def format_section_notes(
+    sections: List[Dict[str, str]], notes: List[Optional[Dict[str, Any]]]
+) -> str:
+    """
+    Put the notes on every section together into one document.
+
+    Args:
+        sections: The sections, in document order
+        notes: Parsed notes for each section; None or a dictionary with an
+            "error" key where a section could not be critiqued
+
+    Returns:
+        The notes as text, preceded by NOTES_PREAMBLE
+    """
+    parts = [NOTES_PREAMBLE]
+    for index, (section, note) in enumerate(zip(sections, notes), start=1):
+        header = f"## Section {index}: {section['title']}"
+        if not note or "error" in note:
+            parts.append(f"{header}\n(No notes: this section could not be reviewed.)")
+            continue
+        lines = [header]
+        for field, label in (
+            ("summary", "Summary"),
+            ("claims", "Claims"),
+            ("strengths", "Strengths"),
+            ("weaknesses", "Weaknesses"),
+            ("questions", "Questions"),
+        ):
+            if note.get(field):
+                lines.append(f"{label}:\n{_format_list(note[field])}")
+        parts.append("\n".join(lines))
+    return "\n\n".join(parts)
@@ -0,0 +1,277 @@
+"""
+Content-addressed caching for LLM calls.
+
+Entries are keyed by a SHA-256 hash of everything that determines a model's
+answer (paper text, provider, model, temperature and rendered prompt), so the
+same request always maps to the same entry. Lookups go through an in-memory
+LRU tier first, then an on-disk tier that survives restarts and is shared by
+all workers on the host.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import (
+    REVIEW_CACHE_DIR,
+    REVIEW_CACHE_ENABLED,
+    REVIEW_CACHE_MAX_BYTES,
+    REVIEW_CACHE_MEMORY_ITEMS,
+    REVIEW_CACHE_TTL_SECONDS,
+)
+
+
+class _Abandoned(Exception):
+    """Set on an in-flight computation whose caller was cancelled."""
+
+
+def make_cache_key(**parts: Any) -> str:
+    """
+    Hash the parts of a request into a cache key.
+
+    Args:
+        **parts: Everything that determines the response, e.g. paper text,
+            provider, model, temperature and prompt
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding of the parts
+    """
+    encoded = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Bounded in-memory mapping that evicts the least recently used entry."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_items <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    JSON files on disk, one per key, with TTL and total-size eviction.
+
+    Writes go through a temporary file and an atomic rename, so several
+    processes can share the same directory. Eviction scans the whole
+    directory, so it runs in a background thread at most once per
+    evict_interval seconds instead of on every write.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        ttl_seconds: int,
+        evict_interval: float = 60.0,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evict_interval = evict_interval
+        self._last_evicted: Optional[float] = None
+        self._evict_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        # Created on first write, so importing the shared caches creates nothing
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        now = time.monotonic()
+        if self._last_evicted is None or now - self._last_evicted >= self.evict_interval:
+            self._last_evicted = now
+            threading.Thread(target=self.evict, daemon=True).start()
+
+    def evict(self) -> None:
+        """Remove expired entries, then the oldest ones until under max_bytes."""
+        with self._evict_lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+class ReviewCache:
+    """Two-tier cache for LLM responses with hit/miss counters."""
+
+    def __init__(
+        self,
+        enabled: bool = REVIEW_CACHE_ENABLED,
+        memory_items: int = REVIEW_CACHE_MEMORY_ITEMS,
+        directory: str = REVIEW_CACHE_DIR,
+        max_bytes: int = REVIEW_CACHE_MAX_BYTES,
+        ttl_seconds: int = REVIEW_CACHE_TTL_SECONDS,
+    ):
+        self.enabled = enabled
+        self.memory = LRUCache(memory_items)
+        self.disk = DiskCache(directory, max_bytes, ttl_seconds) if enabled else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Identical requests already being computed, so concurrent duplicates
+        # wait for the first call instead of paying for their own
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look a key up in memory, then on disk, promoting disk hits."""
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        value = self.disk.get(key) if self.disk else None
+        if value is not None:
+            self.disk_hits += 1
+            self.memory.set(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk:
+            self.disk.set(key, value)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key: Cache key, see make_cache_key
+            compute: Coroutine function producing a JSON-serializable value
+            cacheable: Optional check of a freshly computed value; a value it
+                rejects (e.g. a refusal or an unparseable response) is still
+                returned, but not stored
+
+        Returns:
+            The cached or freshly computed value
+        """
+        if not self.enabled:
+            return await compute()
+
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        if key in self._in_flight:
+            try:
+                return await asyncio.shield(self._in_flight[key])
+            except _Abandoned:
+                # The call computing the value was cancelled, which is no
+                # reason to fail this one; compute it here instead
+                return await self.get_or_compute(key, compute, cacheable)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Cancelling the shared future would cancel every waiter too
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current memory tier size."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                round((self.memory_hits + self.disk_hits) / lookups, 4)
+                if lookups
+                else None
+            ),
+            "memory_items": len(self.memory),
+        }
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+
+review_cache = ReviewCache()
@@ -0,0 +1,291 @@
+"""
+Paper text compaction and context budgeting.
+
+Converted papers carry a lot of text that costs tokens in every request of
+every round without helping a reviewer: running headers and footers, page
+numbers, words hyphenated across lines and the reference list. compact()
+removes it once per paper. fit_to_budget() then makes sure the paper fits a
+reviewer's token budget, dropping the appendix first and then cutting the
+middle of the paper, and says so in the text instead of letting the provider
+reject or silently truncate the request.
+"""
+import functools
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    COMPACTION_DROP_REFERENCES,
+    MODEL_CONTEXT_TOKENS,
+    PAPER_TOKEN_BUDGET,
+)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+# Separates pages in converted text, so running headers can be recognized
+PAGE_BREAK = "\f"
+
+# Lines at the top and bottom of each page that may be running headers/footers
+HEADER_FOOTER_LINES = 3
+
+# Share of the budget kept from the start of the paper when cutting the
+# middle; the rest is kept from the end, where results and conclusions are
+TRUNCATE_HEAD_SHARE = 0.8
+
+TRUNCATION_MARKER = "[... {omitted} tokens of the paper omitted to fit the context window ...]"
+
+# Tokens per tiktoken token for providers whose tokenizers are not public,
+# measured on English scientific text
+TOKENIZER_RATIOS = {"openai": 1.0, "claude": 1.15, "mistral": 1.1}
+
+_PAGE_NUMBER = re.compile(r"^\s*(page\s*)?\d{1,4}(\s*(of|/)\s*\d{1,4})?\s*$", re.IGNORECASE)
+_HEADING_PREFIX = r"^[ \t]*(?:#+[ \t]*)?(?:[A-Z]?\d*\.?[ \t]*)?"
+_REFERENCES_HEADING = re.compile(
+    _HEADING_PREFIX + r"(references|bibliography|works cited|literature cited)[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_APPENDIX_HEADING = re.compile(
+    _HEADING_PREFIX + r"(appendix|appendices|supplementary material)\b[^\n]{0,80}$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_HYPHENATED = re.compile(r"(\w)-\n[ \t]*([a-z])")
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: Optional[str]) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Encodings are downloaded on first use; without network access fall
+        # back to the character estimate
+        return None
+
+
+# The same texts are counted for every reviewer of a model, and the head and
+# tail of a truncated paper again in each step of fit_to_budget. Counts are
+# kept by a digest of the text, so the cache does not hold on to whole papers.
+TOKEN_COUNT_CACHE_SIZE = 256
+_token_counts: "OrderedDict[Tuple[str, int, str, Optional[str]], int]" = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def count_tokens(text: str, provider: str = "openai", model: Optional[str] = None) -> int:
+    """
+    Count the tokens a provider's model will see for a text.
+
+    Uses tiktoken when it is installed: the model's own encoding for OpenAI,
+    and for other providers the closest public encoding scaled by
+    TOKENIZER_RATIOS. Without tiktoken, estimates four characters per token.
+
+    Args:
+        text: The text to count
+        provider: Provider of the model
+        model: Model name
+
+    Returns:
+        Number of tokens
+    """
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), len(text), provider, model)
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+
+    ratio = TOKENIZER_RATIOS.get(provider, 1.0)
+    encoding = _encoding(model if provider == "openai" else None)
+    if encoding is None:
+        count = math.ceil(len(text) / 4 * ratio)
+    else:
+        count = math.ceil(len(encoding.encode(text, disallowed_special=())) * ratio)
+
+    with _token_counts_lock:
+        _token_counts[key] = count
+        while len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def _normalize_line(line: str) -> str:
+    # Page numbers inside a running header change from page to page
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def strip_headers_footers(pages: List[str]) -> List[str]:
+    """
+    Remove running headers, footers and page numbers.
+
+    A line near the top or bottom of a page is a running header or footer
+    when the same line, ignoring digits, is near the top or bottom of at
+    least half of the pages. Bare page numbers there are removed too.
+
+    Args:
+        pages: Text of each page
+
+    Returns:
+        Text of each page without them
+    """
+    page_lines = [page.split("\n") for page in pages]
+
+    def edge_indices(lines: List[str]) -> List[int]:
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        return sorted(set(content[:HEADER_FOOTER_LINES] + content[-HEADER_FOOTER_LINES:]))
+
+    counts: Counter = Counter()
+    for lines in page_lines:
+        counts.update({_normalize_line(lines[i]) for i in edge_indices(lines)})
+    threshold = max(3, math.ceil(len(pages) / 2))
+    repeated = {line for line, count in counts.items() if count >= threshold}
+
+    stripped = []
+    for lines in page_lines:
+        drop = {
+            i
+            for i in edge_indices(lines)
+            if _normalize_line(lines[i]) in repeated or _PAGE_NUMBER.match(lines[i])
+        }
+        stripped.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return stripped
+
+
+def join_hyphenation(text: str) -> str:
+    """Join words hyphenated across line breaks, e.g. "exam-\\nple"."""
+    return _HYPHENATED.sub(r"\1\2", text)
+
+
+def drop_references(text: str) -> str:
+    """
+    Remove the reference list.
+
+    Everything from the last references heading up to the next appendix
+    heading (or the end) is removed.
+    """
+    matches = list(_REFERENCES_HEADING.finditer(text))
+    if not matches:
+        return text
+    start = matches[-1].start()
+    appendix = _APPENDIX_HEADING.search(text, matches[-1].end())
+    end = appendix.start() if appendix else len(text)
+    return text[:start].rstrip() + "\n\n" + text[end:].lstrip()
+
+
+def compact(text: str, references: bool = not COMPACTION_DROP_REFERENCES) -> str:
+    """
+    Remove text that does not help reviewers.
+
+    Args:
+        text: Converted paper text; pages separated by PAGE_BREAK enable
+            header and footer removal
+        references: Keep the reference list
+
+    Returns:
+        The compacted text
+    """
+    pages = text.split(PAGE_BREAK)
+    if len(pages) > 1:
+        pages = strip_headers_footers(pages)
+    text = "\n\n".join(page.strip() for page in pages)
+    text = join_hyphenation(text)
+    if not references:
+        text = drop_references(text)
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def context_budget(
+    provider: str,
+    model: Optional[str],
+    reserved_tokens: int,
+    max_tokens: int = PAPER_TOKEN_BUDGET,
+) -> int:
+    """
+    Tokens available for the paper in a reviewer's requests.
+
+    Args:
+        provider: Provider of the model
+        model: Model name; a model listed in MODEL_CONTEXT_TOKENS overrides
+            its provider's context window
+        reserved_tokens: Tokens needed for everything else in the largest
+            request: prompts, peer reviews and the response
+        max_tokens: Cap on the paper's tokens regardless of the window
+
+    Returns:
+        Token budget for the paper
+    """
+    window = MODEL_CONTEXT_TOKENS.get(model) or MODEL_CONTEXT_TOKENS.get(provider, 32000)
+    return max(0, min(max_tokens, window - reserved_tokens))
+
+
+def _cut(text: str, max_chars: int) -> Tuple[str, str]:
+    """Split the text into a head and a tail of max_chars in total, at paragraphs."""
+    head_chars = int(max_chars * TRUNCATE_HEAD_SHARE)
+    tail_chars = max_chars - head_chars
+    head_end = text.rfind("\n\n", 0, head_chars)
+    head_end = head_end if head_end > head_chars // 2 else head_chars
+    tail_start = text.find("\n\n", len(text) - tail_chars)
+    tail_start = tail_start if tail_start != -1 else len(text) - tail_chars
+    return text[:head_end].rstrip(), text[tail_start:].lstrip()
+
+
+def fit_to_budget(
+    text: str, budget: int, count: Callable[[str], int]
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Shorten the paper to fit a token budget.
+
+    The truncation policy is, in order: keep the paper as is if it fits;
+    drop the appendix; then keep the start and the end of the paper
+    (TRUNCATE_HEAD_SHARE of the budget from the start) and replace the
+    middle with a marker stating how many tokens were left out.
+
+    Args:
+        text: The compacted paper text
+        budget: Maximum number of tokens
+        count: Token counting function for the reviewer's model
+
+    Returns:
+        Tuple of the text and a report with the original and final token
+        counts and which steps were applied
+    """
+    original = tokens = count(text)
+    report = {
+        "original_tokens": original,
+        "tokens": tokens,
+        "budget": budget,
+        "dropped_appendix": False,
+        "truncated": False,
+    }
+    if tokens <= budget:
+        return text, report
+
+    # Skip the first part of the paper, where a table of contents may
+    # mention the appendix
+    appendix = _APPENDIX_HEADING.search(text, len(text) // 3)
+    if appendix:
+        text = text[: appendix.start()].rstrip()
+        tokens = count(text)
+        report.update(tokens=tokens, dropped_appendix=True)
+        if tokens <= budget:
+            return text, report
+
+    full = text
+    max_chars = int(len(full) * budget / tokens)
+    while True:
+        head, tail = _cut(full, max_chars)
+        omitted = tokens - count(head) - count(tail)
+        text = f"{head}\n\n{TRUNCATION_MARKER.format(omitted=omitted)}\n\n{tail}"
+        if count(text) <= budget or max_chars <= 0:
+            break
+        max_chars = int(max_chars * 0.95)
+    report.update(tokens=count(text), truncated=True)
+    return text, report
@@ -0,0 +1,101 @@
+"""
+Cache for PDF conversions.
+
+Converting a PDF, and OCR in particular, is by far the most expensive local
+step, and users often upload the same file more than once. Conversions are
+stored on disk keyed by the SHA-256 of the PDF bytes and the converter
+settings, so a duplicate upload skips conversion entirely.
+"""
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import (
+    PDF_CACHE_DIR,
+    PDF_CACHE_ENABLED,
+    PDF_CACHE_MAX_BYTES,
+    PDF_CACHE_TTL_SECONDS,
+)
+from app.services.cache import DiskCache, make_cache_key
+from app.services.converters.executor import conversion_executor
+from app.services.converters.pdf import converter_settings
+
+
+class ConversionCache:
+    """Disk-backed cache of converted markdown and image metadata."""
+
+    def __init__(
+        self,
+        enabled: bool = PDF_CACHE_ENABLED,
+        directory: str = PDF_CACHE_DIR,
+        max_bytes: int = PDF_CACHE_MAX_BYTES,
+        ttl_seconds: int = PDF_CACHE_TTL_SECONDS,
+    ):
+        self.enabled = enabled
+        self.disk = DiskCache(directory, max_bytes, ttl_seconds) if enabled else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pdf_sha256: str) -> str:
+        return make_cache_key(pdf_sha256=pdf_sha256, settings=converter_settings())
+
+    def get(self, pdf_sha256: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Get the cached (markdown_text, images) for a PDF hash, if any."""
+        if not self.disk:
+            return None
+        cached = self.disk.get(self.make_key(pdf_sha256))
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached["markdown"], cached["images"]
+
+    def set(
+        self, pdf_sha256: str, markdown_text: str, images: List[Dict[str, Any]]
+    ) -> None:
+        if self.disk:
+            self.disk.set(
+                self.make_key(pdf_sha256), {"markdown": markdown_text, "images": images}
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+
+
+conversion_cache = ConversionCache()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def convert_pdf_cached(
+    pdf_path: str, pdf_sha256: Optional[str] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Convert a PDF file to markdown in the conversion pool, reusing a cached
+    conversion when available.
+
+    Args:
+        pdf_path: Path to the PDF file
+        pdf_sha256: SHA-256 of the file, computed from the file when omitted
+
+    Returns:
+        Tuple of (markdown_text, images)
+    """
+    if pdf_sha256 is None:
+        pdf_sha256 = await asyncio.to_thread(hash_file, pdf_path)
+
+    cached = conversion_cache.get(pdf_sha256)
+    if cached is not None:
+        return cached
+
+    markdown_text, images = await conversion_executor.convert(pdf_path)
+    conversion_cache.set(pdf_sha256, markdown_text, images)
+    return markdown_text, images
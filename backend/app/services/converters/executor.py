@@ -0,0 +1,127 @@
+"""
+Process pool for PDF conversion.
+
+Conversion (text extraction, image extraction and OCR) is CPU-bound and
+synchronous, so it runs in worker processes instead of on the event loop.
+Workers receive a file path rather than the PDF bytes, which keeps large
+documents from being pickled through the pool's pipes.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    PDF_CONVERTER_MAX_QUEUE,
+    PDF_CONVERTER_TIMEOUT_SECONDS,
+    PDF_CONVERTER_WORKERS,
+)
+from app.services.converters.pdf import convert_pdf_file_to_markdown
+
+
+class ConversionQueueFull(Exception):
+    """Raised when the conversion queue is at capacity."""
+
+
+class ConversionExecutor:
+    """Bounded, process-backed executor for PDF conversions."""
+
+    def __init__(
+        self,
+        max_workers: int = PDF_CONVERTER_WORKERS,
+        max_queue: int = PDF_CONVERTER_MAX_QUEUE,
+        timeout: float = PDF_CONVERTER_TIMEOUT_SECONDS,
+    ):
+        """
+        Initialize the executor. The worker pool is started on first use.
+
+        Args:
+            max_workers: Number of worker processes
+            max_queue: Maximum number of jobs waiting for a free worker
+            timeout: Per-job time limit in seconds
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        return self._pending
+
+    def is_full(self) -> bool:
+        return self._pending >= self.max_workers + self.max_queue
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn rather than fork: the API process runs threads (event loop,
+            # HTTP clients) that must not be duplicated into workers
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a picklable, module-level function in a worker process.
+
+        Args:
+            fn: Function to run
+            *args: Arguments for fn
+
+        Returns:
+            The function's return value
+
+        Raises:
+            ConversionQueueFull: If the queue is at capacity
+            TimeoutError: If the job exceeds the per-job time limit
+        """
+        if self.is_full():
+            raise ConversionQueueFull(
+                f"Conversion queue is full ({self._pending} jobs pending)"
+            )
+
+        self._pending += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                self._get_pool(), fn, *args
+            )
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"PDF conversion exceeded {self.timeout:.0f}s time limit"
+                )
+        finally:
+            self._pending -= 1
+
+    async def convert(self, pdf_path: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Convert a PDF file in a worker process.
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            Tuple of (markdown_text, images)
+
+        Raises:
+            ConversionQueueFull: If the queue is at capacity
+            TimeoutError: If the conversion exceeds the per-job time limit
+        """
+        # The worker checks the deadline between pages, so a timed-out job
+        # also frees its worker instead of running to completion
+        deadline = time.time() + self.timeout
+        return await self.run(convert_pdf_file_to_markdown, pdf_path, deadline)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+conversion_executor = ConversionExecutor()
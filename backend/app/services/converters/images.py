@@ -0,0 +1,91 @@
+"""
+On-demand extraction of images embedded in a PDF.
+
+Conversion only records which images a document contains. The image bytes
+are extracted the first time a client asks for them, written to disk once per
+distinct image, and served from there.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def load_manifest(output_dir: str) -> List[Dict[str, Any]]:
+    """Load a previously written image manifest, or an empty list."""
+    path = Path(output_dir) / MANIFEST_FILENAME
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def has_manifest(output_dir: str) -> bool:
+    return (Path(output_dir) / MANIFEST_FILENAME).exists()
+
+
+def extract_images(pdf_path: str, output_dir: str) -> List[Dict[str, Any]]:
+    """
+    Extract the distinct images of a PDF to disk.
+
+    Images are deduplicated by xref first, which avoids decoding an image
+    that is repeated on every page, and then by content hash, which catches
+    identical images stored under different xrefs.
+
+    Args:
+        pdf_path: Path to the PDF file
+        output_dir: Directory to write the image files and manifest to
+
+    Returns:
+        Manifest with one entry per distinct image: id (content hash), ext,
+        width, height, size in bytes, and the pages it appears on
+    """
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    by_xref: Dict[int, Dict[str, Any]] = {}
+    by_hash: Dict[str, Dict[str, Any]] = {}
+
+    with fitz.open(pdf_path) as pdf:
+        for page_number, page in enumerate(pdf):
+            for img in page.get_images(full=True):
+                xref = img[0]
+                entry = by_xref.get(xref)
+
+                if entry is None:
+                    base_image = pdf.extract_image(xref)
+                    if not base_image:
+                        continue
+                    image_bytes = base_image["image"]
+                    digest = hashlib.sha256(image_bytes).hexdigest()
+                    entry = by_hash.get(digest)
+
+                    if entry is None:
+                        entry = {
+                            "id": digest,
+                            "ext": base_image["ext"],
+                            "width": base_image["width"],
+                            "height": base_image["height"],
+                            "size": len(image_bytes),
+                            "pages": [],
+                        }
+                        image_path = output / f"{digest}.{entry['ext']}"
+                        if not image_path.exists():
+                            image_path.write_bytes(image_bytes)
+                        by_hash[digest] = entry
+                    by_xref[xref] = entry
+
+                if page_number + 1 not in entry["pages"]:
+                    entry["pages"].append(page_number + 1)
+
+    manifest = list(by_hash.values())
+    tmp_path = output / f"{MANIFEST_FILENAME}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, output / MANIFEST_FILENAME)
+    return manifest
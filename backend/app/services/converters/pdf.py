@@ -1,50 +1,171 @@
-import tempfile
-from typing import Tuple, List, Dict, Any
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Tuple, List, Dict, Any, Optional
 import fitz  # PyMuPDF
-from pdf2image import convert_from_bytes
+from PIL import Image
 import pytesseract
-import base64
+
+from app.config import PDF_OCR_THREADS
+from app.services.compaction import PAGE_BREAK
+
+try:
+    # Binds libtesseract directly, so an engine can be kept alive and reused
+    # instead of spawning a tesseract process per page. It is in the
+    # requirements; pytesseract is only the fallback for installs where it
+    # could not be built.
+    import tesserocr
+except ImportError:  # pragma: no cover - fallback when it cannot be built
+    tesserocr = None
+
+# Converter settings. They are part of the conversion cache key, so changing
+# any of them (or bumping CONVERTER_VERSION after changing the extraction
+# logic) invalidates previously cached conversions.
+CONVERTER_VERSION = 4
+OCR_DPI = 150
+# Pages with less embedded text than this (and at least one image) are OCR'd
+OCR_PAGE_MIN_CHARS = 20
+
+
+def converter_settings() -> Dict[str, Any]:
+    """Settings that determine the output of convert_pdf_bytes_to_markdown."""
+    return {
+        "version": CONVERTER_VERSION,
+        "ocr_dpi": OCR_DPI,
+        "ocr_page_min_chars": OCR_PAGE_MIN_CHARS,
+    }
+
 
 def convert_pdf_bytes_to_markdown(pdf_bytes: bytes) -> Tuple[str, List[Dict[str, Any]]]:
     """
-    Convert PDF bytes to markdown text with extracted images.
+    Convert PDF bytes to markdown text and an image manifest.
 
     Args:
         pdf_bytes: Raw bytes of the PDF file
 
     Returns:
-        Tuple of (markdown_text, images)
+        Tuple of (markdown_text, images), where images lists each distinct
+        embedded image once with its xref, size and the pages it appears on
     """
-    markdown_text = ""
-    images = []
-
-    # First attempt: Extract embedded text and images using PyMuPDF (fast)
     with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
-        for page_number, page in enumerate(pdf):
-            text = page.get_text()
-            markdown_text += text + "\n\n"
-
-            # Extract images from the PDF page
-            for img_index, img in enumerate(page.get_images(full=True)):
-                xref = img[0]
-                base_image = pdf.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                images.append({
-                    "page": page_number + 1,
-                    "image_index": img_index,
-                    "image_base64": image_base64,
-                    "image_ext": image_ext
-                })
-
-    # If embedded text extraction yields little content, fallback to OCR (Tesseract)
-    if len(markdown_text.strip()) < 100:
-        markdown_text = ""
-        # Convert PDF pages to images for OCR processing at reduced dpi (faster OCR)
-        ocr_images = convert_from_bytes(pdf_bytes, dpi=150)
-        for img in ocr_images:
-            ocr_text = pytesseract.image_to_string(img)
-            markdown_text += ocr_text + "\n\n"
-
-    return markdown_text.strip(), images
+        return _convert_document(pdf)
+
+
+def convert_pdf_file_to_markdown(
+    pdf_path: str, deadline: Optional[float] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Convert a PDF file on disk to markdown text and an image manifest.
+
+    Reading from a path lets worker processes open the document themselves,
+    so the PDF bytes never have to be pickled across the process boundary.
+
+    Args:
+        pdf_path: Path to the PDF file
+        deadline: Optional time.time() value after which conversion is
+            abandoned with a TimeoutError, checked between pages
+
+    Returns:
+        Tuple of (markdown_text, images), where images lists each distinct
+        embedded image once with its xref, size and the pages it appears on
+    """
+    with fitz.open(pdf_path) as pdf:
+        return _convert_document(pdf, deadline)
+
+
+def _check_deadline(deadline: Optional[float]) -> None:
+    if deadline is not None and time.time() > deadline:
+        raise TimeoutError("PDF conversion exceeded its time limit")
+
+
+# OCR runs on a per-process thread pool; each thread lazily creates one
+# Tesseract engine and keeps it for the life of the process
+_ocr_pool: Optional[ThreadPoolExecutor] = None
+_ocr_engines = threading.local()
+
+
+def _get_ocr_pool() -> ThreadPoolExecutor:
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ThreadPoolExecutor(
+            max_workers=PDF_OCR_THREADS, thread_name_prefix="ocr"
+        )
+    return _ocr_pool
+
+
+def _ocr_image(image: Image.Image) -> str:
+    """Run OCR on a rendered page with this thread's Tesseract engine."""
+    if tesserocr is None:
+        return pytesseract.image_to_string(image)
+
+    engine = getattr(_ocr_engines, "engine", None)
+    if engine is None:
+        engine = _ocr_engines.engine = tesserocr.PyTessBaseAPI()
+    engine.SetImage(image)
+    return engine.GetUTF8Text()
+
+
+def _render_page(page: fitz.Page) -> Image.Image:
+    """Rasterize a single page in grayscale for OCR."""
+    pix = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def _needs_ocr(text: str, page_images: List[Any]) -> bool:
+    """A page needs OCR when it has images but (almost) no text layer."""
+    return len(text.strip()) < OCR_PAGE_MIN_CHARS and bool(page_images)
+
+
+def _convert_document(
+    pdf: fitz.Document, deadline: Optional[float] = None
+) -> Tuple[str, List[Dict[str, Any]]]:
+    pages_text = []
+    images_by_xref: Dict[int, Dict[str, Any]] = {}
+    ocr_jobs: Dict[int, Future] = {}
+    ocr_pool = _get_ocr_pool()
+    # Rendered pages waiting for OCR are held in memory, so cap how many
+    # can be outstanding at once
+    max_outstanding = 2 * PDF_OCR_THREADS
+
+    for page_number, page in enumerate(pdf):
+        _check_deadline(deadline)
+        # Extract embedded text using PyMuPDF (fast)
+        text = page.get_text()
+        pages_text.append(text)
+        page_images = page.get_images(full=True)
+
+        # Pages without a text layer are rendered one at a time and OCR'd in
+        # the background while the remaining pages are processed
+        if _needs_ocr(text, page_images):
+            outstanding = [job for job in ocr_jobs.values() if not job.done()]
+            if len(outstanding) >= max_outstanding:
+                wait(outstanding, return_when=FIRST_COMPLETED)
+            ocr_jobs[page_number] = ocr_pool.submit(_ocr_image, _render_page(page))
+
+        # Record embedded images without decoding them. Images repeated
+        # across pages (logos, headers) share an xref and are listed once;
+        # the bytes are only extracted on demand, see images.extract_images
+        for img in page_images:
+            xref = img[0]
+            if xref in images_by_xref:
+                images_by_xref[xref]["pages"].append(page_number + 1)
+                continue
+            images_by_xref[xref] = {
+                "xref": xref,
+                "page": page_number + 1,
+                "pages": [page_number + 1],
+                "width": img[2],
+                "height": img[3],
+            }
+
+    for page_number, job in ocr_jobs.items():
+        timeout = None if deadline is None else max(0, deadline - time.time())
+        try:
+            pages_text[page_number] = job.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError("PDF conversion exceeded its time limit")
+
+    # Pages stay separated so compaction can recognize running headers
+    markdown_text = PAGE_BREAK.join(text + "\n\n" for text in pages_text)
+    return markdown_text.strip(), list(images_by_xref.values())
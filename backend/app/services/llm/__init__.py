@@ -0,0 +1,55 @@
+"""
+Async wrappers around the LLM provider APIs.
+
+Every provider module exposes the same coroutine interface, so callers can
+fan out to several providers with ``asyncio.gather`` without blocking the
+event loop:
+
+    review = await get_<provider>_review(paper_text, prompt, model=..., client=...)
+    review = await get_updated_<provider>_review(
+        paper_text, prompt, update_prompt, other_reviews, ...
+    )
+    client = create_client(max_connections)
+
+Both calls send the review prompt as the system prompt and the paper first,
+so the update round repeats the initial round's prompt prefix and is served
+from the provider's prompt cache; see ``base.paper_message``.
+
+Passing ``on_delta`` to the review calls streams the response instead,
+calling ``on_delta`` with each chunk of text as it arrives; the return value
+is the same full text either way. ``on_usage`` is called with the call's token
+counts, including how many input tokens came from the prompt cache.
+"""
+from typing import Any, Awaitable, Callable, Dict, NamedTuple
+
+from app.services.llm import claude, mistral, openai
+
+
+class LLMProvider(NamedTuple):
+    """Coroutine functions implementing a provider's review calls."""
+
+    review: Callable[..., Awaitable[str]]
+    updated_review: Callable[..., Awaitable[str]]
+    create_client: Callable[[int], Any]
+    default_temperature: Any = None
+
+
+PROVIDERS: Dict[str, LLMProvider] = {
+    "openai": LLMProvider(
+        openai.get_openai_review,
+        openai.get_updated_openai_review,
+        openai.create_client,
+        0.3,
+    ),
+    "claude": LLMProvider(
+        claude.get_claude_review,
+        claude.get_updated_claude_review,
+        claude.create_client,
+        0.3,
+    ),
+    "mistral": LLMProvider(
+        mistral.get_mistral_review,
+        mistral.get_updated_mistral_review,
+        mistral.create_client,
+    ),
+}
@@ -0,0 +1,165 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from app.review_engine.parser import SCORE_FIELDS
+
+Score = Union[int, float]
+
+# A score key of the review JSON and its value, tolerating quoted or
+# bracketed numbers. The value must be followed by a non-digit, so "1" is not
+# reported while "10" is still arriving.
+_SCORE_PATTERN = re.compile(
+    r'"(' + "|".join(SCORE_FIELDS) + r')"\s*:\s*[\["]?\s*(\d+(?:\.\d+)?)(?=[^\d.])',
+    re.IGNORECASE,
+)
+
+# Longest text a match can span, kept when scanning resumes after new tokens
+_SCORE_OVERLAP = 64
+
+
+# Token counts of one call: input_tokens, cached_tokens (input tokens served
+# from the provider's prompt cache, None if not reported) and output_tokens
+Usage = Dict[str, Optional[int]]
+UsageCallback = Callable[[Usage], None]
+
+# Sent, for providers without assistant prefill, after a response that was
+# cut off at the output limit, together with the partial response
+CONTINUE_REQUEST = (
+    "Your response was cut off. Continue it exactly where it stopped, "
+    "without repeating anything and without any other text."
+)
+
+
+def add_usage(total: Optional[Usage], usage: Optional[Usage]) -> Optional[Usage]:
+    """Sum the token counts of two calls, e.g. a response and its continuation."""
+    if usage is None:
+        return total
+    if total is None:
+        return dict(usage)
+    return {
+        key: None
+        if total.get(key) is None and usage.get(key) is None
+        else (total.get(key) or 0) + (usage.get(key) or 0)
+        for key in {**total, **usage}
+    }
+
+
+def paper_message(paper_text: str) -> str:
+    """
+    The user message that opens every review request.
+
+    Review requests are laid out as the review instructions (system prompt),
+    then this message, then anything specific to the round. The instructions
+    and the paper are by far the longest part and are identical for every
+    round and every reviewer, so providers can serve them from their prompt
+    cache after the first request.
+
+    Args:
+        paper_text: The text content of the paper
+
+    Returns:
+        The paper, labelled
+    """
+    return f"Paper:\n{paper_text}"
+
+
+def update_request(update_prompt: Any, other_reviews: List[Any]) -> str:
+    """
+    The round-specific part of an update-round request, sent after the paper.
+
+    Args:
+        update_prompt: Instructions for updating the review
+        other_reviews: Reviews from the other reviewers
+
+    Returns:
+        The instructions followed by the peer reviews
+    """
+    return f"{update_prompt}\n\n{format_peer_reviews(other_reviews)}"
+
+
+def format_peer_reviews(reviews: List[Any]) -> str:
+    """
+    Format the reviews of the other reviewers for an update-round prompt.
+
+    Args:
+        reviews: Reviews from the other reviewers, in registry order
+
+    Returns:
+        The reviews numbered as "Review 1:", "Review 2:", ...
+    """
+    return "\n\n".join(
+        f"Review {i + 1}:\n{review}" for i, review in enumerate(reviews)
+    )
+
+
+class ScoreExtractor:
+    """
+    Pulls review scores out of a partial JSON response as tokens stream in.
+
+    The response does not need to be valid JSON at any point; the extractor
+    only looks for score keys followed by a complete number, so it works on
+    fenced or slightly malformed output too. The first value seen for each
+    field wins.
+    """
+
+    def __init__(self, on_scores: Callable[[Dict[str, Score]], None]):
+        """
+        Initialize the extractor.
+
+        Args:
+            on_scores: Called with all scores found so far whenever a new
+                one is found
+        """
+        self.on_scores = on_scores
+        self.scores: Dict[str, Score] = {}
+        self._buffer = ""
+        self._scanned = 0
+
+    def reset(self) -> None:
+        """
+        Forget everything seen so far, e.g. when a request is retried or a
+        different request's response wins. Scores are reported again as the
+        next response streams in.
+        """
+        self.scores = {}
+        self._buffer = ""
+        self._scanned = 0
+
+    def feed(self, delta: str) -> None:
+        """Add the next chunk of streamed text."""
+        self._buffer += delta
+        self._scan(self._buffer)
+
+    def finish(self, text: Optional[str] = None) -> Dict[str, Score]:
+        """
+        Process the complete response and return the scores found.
+
+        Args:
+            text: The full response, for callers that did not stream it,
+                e.g. when it came from the cache
+
+        Returns:
+            Dictionary mapping score fields to values
+        """
+        if text is not None and len(text) > len(self._buffer):
+            self._buffer = text
+        # A number at the very end of the text is complete now
+        self._scan(self._buffer + "\n")
+        return self.scores
+
+    def _scan(self, text: str) -> None:
+        if len(self.scores) == len(SCORE_FIELDS):
+            return
+
+        found = False
+        for match in _SCORE_PATTERN.finditer(text, self._scanned):
+            field = match.group(1).lower()
+            if field in self.scores:
+                continue
+            value = float(match.group(2))
+            self.scores[field] = int(value) if value.is_integer() else value
+            found = True
+        self._scanned = max(0, len(self._buffer) - _SCORE_OVERLAP)
+
+        if found:
+            self.on_scores(dict(self.scores))
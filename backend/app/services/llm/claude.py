@@ -1,10 +1,17 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import anthropic
+import httpx
 import os
 from dotenv import load_dotenv
 
+from app.config import LLM_JSON_MODE, LLM_MAX_CONTINUATIONS, LLM_MAX_OUTPUT_TOKENS
+from app.services.llm.base import Usage, UsageCallback, add_usage, paper_message, update_request
+
 load_dotenv()
 
-anthropic_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+api_key = os.getenv("ANTHROPIC_API_KEY")
+# Retries are handled by the rate limiter, which needs to see every 429
+anthropic_client = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
 
 append_str = """Respond **only** with JSON following this exact schema:
 {
@@ -15,23 +22,141 @@ append_str = """Respond **only** with JSON following this exact schema:
 }
 Do not include any introductory text or explanations."""
 
-def get_claude_review(paper_text, prompt):
-    message = anthropic_client.messages.create(
-        model=os.getenv("CLAUDE_MODEL"),
-        max_tokens=1000,
-        temperature=0.3,
-        messages=[{"role": "user", "content": f"{prompt}\n\nPaper:\n{paper_text}"}],
+
+def create_client(max_connections: int) -> anthropic.AsyncAnthropic:
+    """Create a client with its own connection pool of at most max_connections."""
+    return anthropic.AsyncAnthropic(
+        api_key=api_key,
+        max_retries=0,
+        http_client=anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            )
+        ),
+    )
+
+
+def _usage(usage: Any) -> Usage:
+    # input_tokens excludes tokens read from or written to the cache
+    cached = usage.cache_read_input_tokens or 0
+    written = usage.cache_creation_input_tokens or 0
+    return {
+        "input_tokens": usage.input_tokens + cached + written,
+        "cached_tokens": cached,
+        "output_tokens": usage.output_tokens,
+    }
+
+
+async def _request(
+    client: anthropic.AsyncAnthropic,
+    kwargs: Dict[str, Any],
+    on_delta: Optional[Callable[[str], None]],
+) -> Tuple[str, Optional[str], Usage]:
+    """Send one request and return its text, stop reason and token counts."""
+    if on_delta is None:
+        message = await client.messages.create(**kwargs)
+    else:
+        async with client.messages.stream(**kwargs) as stream:
+            async for delta in stream.text_stream:
+                on_delta(delta)
+            message = await stream.get_final_message()
+    text = "".join(block.text for block in message.content if block.type == "text")
+    return text, message.stop_reason, _usage(message.usage)
+
+
+async def _complete(
+    system: str,
+    content: List[dict],
+    model: Optional[str],
+    client: Optional[anthropic.AsyncAnthropic],
+    temperature: Optional[float],
+    on_delta: Optional[Callable[[str], None]],
+    on_usage: Optional[UsageCallback],
+) -> str:
+    client = client or anthropic_client
+    # Claude continues the assistant turn it is given: "{" makes it answer
+    # with the JSON object directly, and a cut-off response is continued
+    # from where it stopped
+    text = "{" if LLM_JSON_MODE else ""
+    total = None
+    for _ in range(LLM_MAX_CONTINUATIONS + 1):
+        messages = [{"role": "user", "content": content}]
+        # The assistant turn must not end with whitespace
+        text = text.rstrip()
+        if text:
+            messages.append({"role": "assistant", "content": text})
+        kwargs = dict(
+            model=model or os.getenv("CLAUDE_MODEL"),
+            max_tokens=LLM_MAX_OUTPUT_TOKENS,
+            temperature=temperature,
+            system=system,
+            messages=messages,
+        )
+        part, stop_reason, usage = await _request(client, kwargs, on_delta)
+        text += part
+        total = add_usage(total, usage)
+        if stop_reason != "max_tokens":
+            break
+
+    if on_usage is not None:
+        on_usage(total)
+    return text.strip()
+
+
+def _content(paper_text: str, request: Optional[str] = None) -> List[dict]:
+    # The cache breakpoint after the paper caches the system prompt and the
+    # paper, which both rounds and all Claude reviewers share
+    content = [
+        {
+            "type": "text",
+            "text": paper_message(paper_text),
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+    if request is not None:
+        content.append({"type": "text", "text": request})
+    return content
+
+
+async def get_claude_review(
+    paper_text,
+    prompt,
+    model: Optional[str] = None,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    temperature: Optional[float] = 0.3,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[UsageCallback] = None,
+):
+    return await _complete(
+        str(prompt),
+        _content(paper_text),
+        model,
+        client,
+        temperature,
+        on_delta,
+        on_usage,
     )
-    return message.content[0].text.strip()
 
 
-def get_updated_claude_review(paper_text, prompt, review1, review2):
-    message = anthropic_client.messages.create(
-        model=os.getenv("CLAUDE_MODEL"),
-        max_tokens=1000,
-        temperature=0.3,
-        messages=[
-            {"role": "user", "content": f"{append_str}\n\n{prompt}\n\nPaper:\n{paper_text}"}
-        ],
+async def get_updated_claude_review(
+    paper_text,
+    prompt,
+    update_prompt,
+    other_reviews: List[Any],
+    model: Optional[str] = None,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    temperature: Optional[float] = 0.3,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[UsageCallback] = None,
+):
+    request = f"{append_str}\n\n{update_request(update_prompt, other_reviews)}"
+    return await _complete(
+        str(prompt),
+        _content(paper_text, request),
+        model,
+        client,
+        temperature,
+        on_delta,
+        on_usage,
     )
-    return message.content[0].text.strip()
@@ -0,0 +1,193 @@
+"""
+Provider health and circuit breaking.
+
+Each provider gets one health tracker shared by all of its reviewers. It
+keeps the provider's error rate over a rolling window and its latency
+percentiles, and trips a circuit breaker when errors pile up: while the
+circuit is open, requests to the provider fail at once instead of waiting
+for an error that is all but certain. After a cooldown one probe request is
+let through (half-open); its success closes the circuit, its failure opens
+it again.
+
+Only errors that say something about the provider count: timeouts,
+connection errors and 5xx responses. Rate limits are handled by the
+provider's limiter, and other 4xx errors are about the request.
+"""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.config import (
+    CIRCUIT_COOLDOWN_SECONDS,
+    CIRCUIT_ERROR_RATE,
+    CIRCUIT_MIN_CALLS,
+    CIRCUIT_WINDOW_SECONDS,
+)
+from app.services.llm.hedging import LatencyTracker
+from app.services.llm.ratelimit import get_status_code, is_connection_error
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request to a provider whose circuit is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(
+            f"Circuit open for {provider}, next attempt in {retry_in:.0f}s"
+        )
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def is_provider_failure(error: Exception) -> bool:
+    """Whether an error counts against the provider's health."""
+    status = get_status_code(error)
+    if status is not None:
+        return status >= 500
+    # Errors without a status, e.g. a malformed response, are not the
+    # provider being down unless the request never got an answer
+    return is_connection_error(error)
+
+
+class ProviderHealth:
+    """Rolling error rate, latency and circuit breaker of one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        error_rate: float = CIRCUIT_ERROR_RATE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        window: float = CIRCUIT_WINDOW_SECONDS,
+        cooldown: float = CIRCUIT_COOLDOWN_SECONDS,
+    ):
+        """
+        Initialize the tracker with a closed circuit.
+
+        Args:
+            provider: Provider name, for error messages
+            error_rate: Share of failed requests in the window that opens
+                the circuit
+            min_calls: Requests in the window needed before the error rate
+                is acted on
+            window: Seconds of requests the error rate is computed over
+            cooldown: Seconds the circuit stays open before a probe
+        """
+        self.provider = provider
+        self.max_error_rate = error_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+
+        self.latency = LatencyTracker(min_samples=1)
+        self.times_opened = 0
+        self.rejected = 0
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+
+    @property
+    def state(self) -> str:
+        """CLOSED, OPEN or HALF_OPEN; an open circuit half-opens after the cooldown."""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def available(self) -> bool:
+        """Whether a request would be let through right now."""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def error_rate(self) -> Optional[float]:
+        """Share of failed requests in the window, None without requests."""
+        self._prune()
+        if not self._outcomes:
+            return None
+        return sum(not ok for _, ok in self._outcomes) / len(self._outcomes)
+
+    def before_request(self) -> None:
+        """
+        Admit a request, taking the probe slot of a half-open circuit.
+
+        Raises:
+            CircuitOpen: If the circuit is open, or half-open with its probe
+                already in flight
+        """
+        if not self.available():
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.cooldown - time.monotonic())
+            raise CircuitOpen(self.provider, retry_in)
+        if self._state == HALF_OPEN:
+            self._probing = True
+
+    def record_success(self, latency: float) -> None:
+        self.latency.record(latency)
+        if self._state == HALF_OPEN:
+            # The provider is back; its earlier errors no longer say anything
+            self._outcomes.clear()
+            self._state = CLOSED
+            self._probing = False
+        self._record(True)
+
+    def record_failure(self) -> None:
+        self._record(False)
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+            if self.error_rate() >= self.max_error_rate:
+                self._open()
+
+    def record_neutral(self) -> None:
+        """End a request whose outcome says nothing about the provider."""
+        self._probing = False
+
+    def _record(self, ok: bool) -> None:
+        self._outcomes.append((time.monotonic(), ok))
+        self._prune()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.window
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        self.times_opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 3) if value is not None else None
+
+        error_rate = self.error_rate()
+        return {
+            "state": self.state,
+            "error_rate": round(error_rate, 3) if error_rate is not None else None,
+            "calls": len(self._outcomes),
+            "p50": rounded(self.latency.percentile(50)),
+            "p95": rounded(self.latency.percentile(95)),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+_health: Dict[str, ProviderHealth] = {}
+
+
+def get_health(provider: str) -> ProviderHealth:
+    """The shared health tracker for a provider, created on first use."""
+    if provider not in _health:
+        _health[provider] = ProviderHealth(provider)
+    return _health[provider]
+
+
+def health_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every health tracker in use, keyed by provider."""
+    return {name: health.stats() for name, health in _health.items()}
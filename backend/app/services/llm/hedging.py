@@ -0,0 +1,102 @@
+"""
+Hedged requests.
+
+A request that has run longer than almost all earlier ones is more likely
+stuck behind a slow backend than about to finish. Sending a duplicate at that
+point and taking whichever answer comes first cuts the latency tail for the
+price of a few percent extra requests.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.config import LLM_HEDGE_MIN_SAMPLES
+
+
+class LatencyTracker:
+    """Latencies of recent successful requests."""
+
+    def __init__(self, window: int = 200, min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        """
+        Initialize the tracker.
+
+        Args:
+            window: Number of recent latencies to keep
+            min_samples: Samples needed before percentiles are reported
+        """
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """The given percentile of recent latencies, or None without enough samples."""
+        if len(self._samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[Any]],
+    hedge: Callable[[], Awaitable[Any]],
+    delay: Optional[float],
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """
+    Run primary, and also hedge if primary has not finished after delay.
+
+    The first successful result wins and the other request is cancelled. If
+    one of them fails, the other one still gets to finish.
+
+    Args:
+        primary: Coroutine function making the request
+        hedge: Coroutine function making the duplicate request
+        delay: Seconds to wait before hedging, or None to never hedge
+
+    Returns:
+        Tuple of the result and, if a hedge was sent, a record with when it
+        was sent ("fired_after"), which request won ("winner") and the total
+        time taken ("latency")
+
+    Raises:
+        Exception: The primary's error if every request failed
+    """
+    started = time.monotonic()
+    primary_task = asyncio.ensure_future(primary())
+    if delay is None:
+        return await primary_task, None
+
+    hedge_task: Optional[asyncio.Future] = None
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done:
+            return primary_task.result(), None
+
+        hedge_task = asyncio.ensure_future(hedge())
+        fired_after = time.monotonic() - started
+        pending = {primary_task, hedge_task}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), {
+                        "fired_after": round(fired_after, 3),
+                        "winner": "primary" if task is primary_task else "hedge",
+                        "latency": round(time.monotonic() - started, 3),
+                    }
+
+        # Both failed; the hedge's error is only a symptom of the same problem
+        hedge_task.exception()
+        return primary_task.result(), None
+    finally:
+        for task in (primary_task, hedge_task):
+            if task is not None and not task.done():
+                task.cancel()
@@ -1,57 +1,178 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import os
+import httpx
 from mistralai import Mistral
 from dotenv import load_dotenv
 
+from app.config import LLM_JSON_MODE, LLM_MAX_CONTINUATIONS, LLM_MAX_OUTPUT_TOKENS
+from app.services.llm.base import Usage, UsageCallback, add_usage, paper_message, update_request
+
 load_dotenv()
 
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-client = Mistral(api_key=MISTRAL_API_KEY)
+default_client = Mistral(api_key=MISTRAL_API_KEY)
+
+
+def create_client(max_connections: int) -> Mistral:
+    """Create a client with its own connection pool of at most max_connections."""
+    return Mistral(
+        api_key=MISTRAL_API_KEY,
+        async_client=httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        ),
+    )
+
+
+def _usage(usage: Any) -> Usage:
+    # Mistral does not report prompt cache hits
+    return {
+        "input_tokens": usage.prompt_tokens,
+        "cached_tokens": None,
+        "output_tokens": usage.completion_tokens,
+    }
+
+
+async def _request(
+    client: Mistral,
+    kwargs: Dict[str, Any],
+    on_delta: Optional[Callable[[str], None]],
+) -> Tuple[str, Optional[str], Optional[Usage]]:
+    """Send one request and return its text, finish reason and token counts."""
+    if on_delta is None:
+        chat_response = await client.chat.complete_async(**kwargs)
+        choice = chat_response.choices[0]
+        usage = _usage(chat_response.usage) if chat_response.usage is not None else None
+        content = choice.message.content
+        return content if isinstance(content, str) else "", choice.finish_reason, usage
+
+    parts = []
+    finish_reason = None
+    usage = None
+    stream = await client.chat.stream_async(**kwargs)
+    async for event in stream:
+        choices = event.data.choices
+        if choices:
+            delta = choices[0].delta.content
+            if isinstance(delta, str) and delta:
+                parts.append(delta)
+                on_delta(delta)
+            finish_reason = choices[0].finish_reason or finish_reason
+        if event.data.usage is not None:
+            usage = _usage(event.data.usage)
+    return "".join(parts), finish_reason, usage
+
+
+async def _complete(
+    messages: List[dict],
+    model: Optional[str],
+    client: Optional[Mistral],
+    temperature: Optional[float],
+    on_delta: Optional[Callable[[str], None]],
+    on_usage: Optional[UsageCallback],
+) -> str:
+    client = client or default_client
+    text = ""
+    total = None
+    for _ in range(LLM_MAX_CONTINUATIONS + 1):
+        kwargs: Dict[str, Any] = dict(
+            model=model or os.getenv("MISTRAL_MODEL"),
+            messages=messages,
+            max_tokens=LLM_MAX_OUTPUT_TOKENS,
+            **({"temperature": temperature} if temperature is not None else {}),
+        )
+        if text:
+            # The partial response as a prefix, which the model continues
+            kwargs["messages"] = messages + [
+                {"role": "assistant", "content": text, "prefix": True}
+            ]
+        elif LLM_JSON_MODE:
+            kwargs["response_format"] = {"type": "json_object"}
+
+        part, finish_reason, usage = await _request(client, kwargs, on_delta)
+        text += part
+        total = add_usage(total, usage)
+        if finish_reason != "length":
+            break
 
+    if on_usage is not None and total is not None:
+        on_usage(total)
+    return text.strip()
 
-def get_mistral_review(paper_text, prompt):
+
+def _messages(prompt: Any, paper_text: str, request: Optional[str] = None) -> List[dict]:
+    # Same stable prefix as the other providers: instructions, then the paper
+    user = paper_message(paper_text)
+    if request is not None:
+        user = f"{user}\n\n{request}"
+    return [
+        {"role": "system", "content": str(prompt)},
+        {"role": "user", "content": user},
+    ]
+
+
+async def get_mistral_review(
+    paper_text,
+    prompt,
+    model: Optional[str] = None,
+    client: Optional[Mistral] = None,
+    temperature: Optional[float] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[UsageCallback] = None,
+):
     """
     Get a review of a paper from the Mistral API.
 
     Args:
         paper_text: The text content of the paper
         prompt: The review prompt template
+        model: Model name, defaults to the MISTRAL_MODEL environment variable
+        client: Client to send the request with, defaults to the shared client
+        temperature: Sampling temperature, defaults to the model's own default
+        on_delta: If given, the response is streamed and this is called with
+            each chunk of text as it arrives
+        on_usage: Called with the token counts of the call
 
     Returns:
         The raw response from the Mistral API
     """
-    # Correct format: messages should be a list of message objects
-    messages = [{"role": "user", "content": f"{prompt}\n\nPaper:\n{paper_text}"}]
-
-    chat_response = client.chat.complete(
-        model=os.getenv("MISTRAL_MODEL"), messages=messages
-    )
-
-    return chat_response.choices[0].message.content.strip()
+    messages = _messages(prompt, paper_text)
+    return await _complete(messages, model, client, temperature, on_delta, on_usage)
 
 
-def get_updated_mistral_review(paper_text, prompt, review1, review2):
+async def get_updated_mistral_review(
+    paper_text,
+    prompt,
+    update_prompt,
+    other_reviews: List[Any],
+    model: Optional[str] = None,
+    client: Optional[Mistral] = None,
+    temperature: Optional[float] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[UsageCallback] = None,
+):
     """
     Get an updated review of a paper from the Mistral API.
 
     Args:
         paper_text: The text content of the paper
         prompt: The review prompt template
-        review1: The first review
-        review2: The second review
+        update_prompt: Instructions for updating the review
+        other_reviews: The reviews from the other reviewers
+        model: Model name, defaults to the MISTRAL_MODEL environment variable
+        client: Client to send the request with, defaults to the shared client
+        temperature: Sampling temperature, defaults to the model's own default
+        on_delta: If given, the response is streamed and this is called with
+            each chunk of text as it arrives
+        on_usage: Called with the token counts of the call
 
     Returns:
         The raw response from the Mistral API
     """
-    messages = [
-        {"role": "system", "content": str(prompt)},
-        {
-            "role": "user",
-            "content": f"Review 1:\n{review1}\n\nReview 2:\n{review2}\n\nPaper:\n{paper_text}",
-        },
-    ]
-
-    chat_response = client.chat.complete(
-        model=os.getenv("MISTRAL_MODEL"), messages=messages
+    messages = _messages(
+        prompt, paper_text, update_request(update_prompt, other_reviews)
     )
-
-    return chat_response.choices[0].message.content.strip()
+    return await _complete(messages, model, client, temperature, on_delta, on_usage)
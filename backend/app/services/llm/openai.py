@@ -1,37 +1,155 @@
-from openai import OpenAI
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 import os
 from dotenv import load_dotenv
 
+from app.config import LLM_JSON_MODE, LLM_MAX_CONTINUATIONS, LLM_MAX_OUTPUT_TOKENS
+from app.services.llm.base import (
+    CONTINUE_REQUEST,
+    Usage,
+    UsageCallback,
+    add_usage,
+    paper_message,
+    update_request,
+)
+
 load_dotenv()
 
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Retries are handled by the rate limiter, which needs to see every 429
+default_client = AsyncOpenAI(api_key=api_key, max_retries=0)
 
 
-def get_openai_review(paper_text, prompt):
-    messages = [{"role": "user", "content": f"{prompt}\n\nPaper:\n{paper_text}"}]
-    response = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL"),
-        messages=messages,
-        temperature=0.3,
+def create_client(max_connections: int) -> AsyncOpenAI:
+    """Create a client with its own connection pool of at most max_connections."""
+    return AsyncOpenAI(
+        api_key=api_key,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            )
+        ),
     )
-    return response.choices[0].message.content.strip()
-
-
-def get_updated_openai_review(paper_text, prompt, review1, review2):
-    messages = [
-        {
-            "role": "system",
-            "content": str(prompt),
-        },
-        {
-            "role": "user",
-            "content": f"Review 1:\n{review1}\n\nReview 2:\n{review2}\n\nPaper:\n{paper_text}",
-        },
+
+
+def _usage(usage: Any) -> Usage:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "input_tokens": usage.prompt_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None),
+        "output_tokens": usage.completion_tokens,
+    }
+
+
+async def _request(
+    client: AsyncOpenAI,
+    kwargs: Dict[str, Any],
+    on_delta: Optional[Callable[[str], None]],
+) -> Tuple[str, Optional[str], Optional[Usage]]:
+    """Send one request and return its text, finish reason and token counts."""
+    if on_delta is None:
+        response = await client.chat.completions.create(**kwargs)
+        choice = response.choices[0]
+        usage = _usage(response.usage) if response.usage is not None else None
+        return choice.message.content or "", choice.finish_reason, usage
+
+    parts = []
+    finish_reason = None
+    usage = None
+    stream = await client.chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **kwargs
+    )
+    async for chunk in stream:
+        if chunk.choices:
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+                on_delta(choice.delta.content)
+            finish_reason = choice.finish_reason or finish_reason
+        # The last chunk carries the usage and no choices
+        if chunk.usage is not None:
+            usage = _usage(chunk.usage)
+    return "".join(parts), finish_reason, usage
+
+
+async def _complete(
+    messages: List[dict],
+    model: Optional[str],
+    client: Optional[AsyncOpenAI],
+    temperature: Optional[float],
+    on_delta: Optional[Callable[[str], None]],
+    on_usage: Optional[UsageCallback],
+) -> str:
+    client = client or default_client
+    text = ""
+    total = None
+    for _ in range(LLM_MAX_CONTINUATIONS + 1):
+        kwargs: Dict[str, Any] = dict(
+            model=model or os.getenv("OPENAI_MODEL"),
+            messages=messages,
+            temperature=temperature,
+            max_completion_tokens=LLM_MAX_OUTPUT_TOKENS,
+        )
+        if text:
+            # A continuation is a fragment, so it cannot be in JSON mode
+            kwargs["messages"] = messages + [
+                {"role": "assistant", "content": text},
+                {"role": "user", "content": CONTINUE_REQUEST},
+            ]
+        elif LLM_JSON_MODE:
+            kwargs["response_format"] = {"type": "json_object"}
+
+        part, finish_reason, usage = await _request(client, kwargs, on_delta)
+        text += part
+        total = add_usage(total, usage)
+        if finish_reason != "length":
+            break
+
+    if on_usage is not None and total is not None:
+        on_usage(total)
+    return text.strip()
+
+
+def _messages(prompt: Any, paper_text: str, request: Optional[str] = None) -> List[dict]:
+    # OpenAI caches the longest previously seen prompt prefix automatically;
+    # the instructions and the paper come first so both rounds share them
+    user = paper_message(paper_text)
+    if request is not None:
+        user = f"{user}\n\n{request}"
+    return [
+        {"role": "system", "content": str(prompt)},
+        {"role": "user", "content": user},
     ]
-    response = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL"),
-        messages=messages,
-        temperature=0.3,
+
+
+async def get_openai_review(
+    paper_text,
+    prompt,
+    model: Optional[str] = None,
+    client: Optional[AsyncOpenAI] = None,
+    temperature: Optional[float] = 0.3,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[UsageCallback] = None,
+):
+    messages = _messages(prompt, paper_text)
+    return await _complete(messages, model, client, temperature, on_delta, on_usage)
+
+
+async def get_updated_openai_review(
+    paper_text,
+    prompt,
+    update_prompt,
+    other_reviews: List[Any],
+    model: Optional[str] = None,
+    client: Optional[AsyncOpenAI] = None,
+    temperature: Optional[float] = 0.3,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[UsageCallback] = None,
+):
+    messages = _messages(
+        prompt, paper_text, update_request(update_prompt, other_reviews)
     )
-    return response.choices[0].message.content.strip()
+    return await _complete(messages, model, client, temperature, on_delta, on_usage)
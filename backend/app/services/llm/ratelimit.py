@@ -0,0 +1,318 @@
+"""
+Client-side rate limiting for LLM providers.
+
+Each provider gets one limiter shared by all of its reviewers, since provider
+limits apply per account rather than per model. A limiter admits a request
+only when it fits the requests-per-minute and estimated tokens-per-minute
+budgets and the current concurrency limit. The concurrency limit adapts to
+what the provider tolerates (AIMD): it grows by one request per round of
+successful calls and halves on a 429 or when latency climbs well above the
+best seen, which is how a provider shows it is saturated before it starts
+rejecting requests.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.config import LLM_MAX_BACKOFF_SECONDS, LLM_MAX_RETRIES, PROVIDER_RATE_LIMITS
+
+# Output tokens budgeted per review call, on top of the prompt
+ESTIMATED_OUTPUT_TOKENS = 1000
+
+# Latency this many times the baseline counts as a sign of saturation
+LATENCY_TOLERANCE = 2.0
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def estimate_tokens(*texts: str) -> int:
+    """
+    Estimate the tokens a request will use before sending it.
+
+    Uses about four characters per token for the input, which is close for
+    English prose across the supported tokenizers, plus the output budget.
+
+    Args:
+        *texts: The text sent in the request, e.g. the prompt and the paper
+
+    Returns:
+        Estimated total tokens
+    """
+    return sum(len(text) for text in texts) // 4 + ESTIMATED_OUTPUT_TOKENS
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """HTTP status code of a provider SDK error, if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds to wait according to the error's Retry-After header, if any."""
+    response = getattr(error, "response", None) or getattr(error, "raw_response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether an error is a timeout or connection error, which carry no status code."""
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an error is worth retrying: rate limits, overload, timeouts."""
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return is_connection_error(error)
+
+
+class TokenBucket:
+    """Budget of units per minute, refilled continuously."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount units are available, 0 if they are now."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class ProviderLimiter:
+    """Rate and adaptive concurrency limits for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float,
+        tpm: float,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_backoff: float = LLM_MAX_BACKOFF_SECONDS,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Provider name, for stats
+            rpm: Requests per minute allowed by the provider
+            tpm: Tokens per minute allowed by the provider
+            max_concurrency: Upper bound for the adaptive concurrency limit
+            min_concurrency: Lower bound for the adaptive concurrency limit
+            max_retries: Retries of rate-limited and transient errors
+            max_backoff: Longest backoff between retries, unless the provider
+                asks for longer with Retry-After
+        """
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+
+        # Start halfway and let successes find the provider's limit
+        self.concurrency = max(min_concurrency, max_concurrency / 2)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.baseline_latency: Optional[float] = None
+        self.last_decrease = 0.0
+
+        self.rate_limited = 0
+        self.retries = 0
+        self.failures = 0
+
+        # Futures of callers waiting for a concurrency slot. Plain futures are
+        # created per wait, so the limiter is not tied to one event loop.
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        # Concurrency slot first, so requests waiting on the budget hold one
+        while self.in_flight >= int(self.concurrency):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+        try:
+            while True:
+                wait = max(
+                    self.paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.concurrency) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _decrease(self) -> None:
+        # Several requests in flight see the same congestion; react once
+        now = time.monotonic()
+        if now - self.last_decrease < (self.baseline_latency or 1.0):
+            return
+        self.last_decrease = now
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+
+    def on_success(self, latency: float) -> None:
+        """Grow the concurrency limit, or shrink it if latency has degraded."""
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            # Let the baseline drift up slowly so one fast call does not
+            # make every later call look slow
+            self.baseline_latency += 0.01 * (latency - self.baseline_latency)
+
+        if latency > LATENCY_TOLERANCE * self.baseline_latency:
+            self._decrease()
+        else:
+            self.concurrency = min(
+                self.max_concurrency, self.concurrency + 1 / self.concurrency
+            )
+            self._wake()
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> None:
+        """Halve the concurrency limit and pause until Retry-After has passed."""
+        self.rate_limited += 1
+        self._decrease()
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        # Full jitter keeps retries of concurrent requests from lining up
+        return random.uniform(0, min(self.max_backoff, 2 ** attempt))
+
+    async def call(
+        self, fn: Callable[[], Awaitable[Any]], estimated_tokens: int
+    ) -> Any:
+        """
+        Run a provider call within the limits, retrying transient errors.
+
+        Args:
+            fn: Coroutine function making the request
+            estimated_tokens: Tokens the request is expected to use, see
+                estimate_tokens
+
+        Returns:
+            The result of fn
+
+        Raises:
+            Exception: The last error, once it is not retryable or the
+                retries are used up
+        """
+        attempt = 0
+        while True:
+            await self._acquire(estimated_tokens)
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                if get_status_code(e) == 429:
+                    self.on_rate_limited(get_retry_after(e))
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                backoff = self._backoff(attempt, e)
+            else:
+                self.on_success(time.monotonic() - started)
+                return result
+            finally:
+                self._release()
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(backoff)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": round(self.concurrency, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_latency": (
+                round(self.baseline_latency, 3)
+                if self.baseline_latency is not None
+                else None
+            ),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """The shared limiter for a provider, created on first use."""
+    if provider not in _limiters:
+        limits = PROVIDER_RATE_LIMITS.get(provider, {})
+        _limiters[provider] = ProviderLimiter(
+            provider,
+            rpm=limits.get("rpm", 60),
+            tpm=limits.get("tpm", 100000),
+            max_concurrency=limits.get("max_concurrency", 8),
+        )
+    return _limiters[provider]
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every limiter in use, keyed by provider."""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,452 @@
+"""
+Registry of reviewer backends.
+
+A reviewer is one model behind one provider, with its own connection pool and
+a limit on how many requests it keeps in flight. Several reviewers may share a
+provider, e.g. two OpenAI models, so reviewers are identified by name rather
+than by provider. Every request has a deadline, and a reviewer can hedge
+requests that run unusually long by duplicating them, to itself or to a
+fallback reviewer. Requests to a provider whose circuit is open fail at once,
+see app.services.llm.health. Only responses that came from the reviewer
+itself and pass the caller's check are cached: by default they must parse as
+a review with scores, see is_review.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.config import (
+    LLM_CALL_TIMEOUT_SECONDS,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGING_ENABLED,
+    REVIEWERS,
+    REVIEWER_MAX_CONNECTIONS,
+    REVIEWER_MAX_IN_FLIGHT,
+)
+from app.review_engine.parser import SCORE_FIELDS, parse_review
+from app.services.cache import ReviewCache, make_cache_key, review_cache
+from app.services.llm import PROVIDERS, LLMProvider
+from app.services.llm.base import (
+    Score,
+    ScoreExtractor,
+    Usage,
+    UsageCallback,
+    format_peer_reviews,
+)
+from app.services.llm.health import ProviderHealth, get_health, is_provider_failure
+from app.services.llm.hedging import LatencyTracker, hedged
+from app.services.llm.ratelimit import ProviderLimiter, estimate_tokens, get_limiter
+
+ScoresCallback = Callable[[Dict[str, Score]], None]
+
+
+def is_review(text: str) -> bool:
+    """Whether a response reads as a review, i.e. has at least one score."""
+    review = parse_review(text)
+    return any(getattr(review, field) is not None for field in SCORE_FIELDS)
+
+
+def has_text(text: str) -> bool:
+    """Whether a response is not empty, for calls whose answers have no scores."""
+    return bool(text and text.strip())
+
+
+class ReviewerBackend:
+    """A single reviewer model with its own client and concurrency limit."""
+
+    def __init__(
+        self,
+        name: str,
+        provider: str,
+        model: str,
+        temperature: Optional[float] = None,
+        max_in_flight: int = REVIEWER_MAX_IN_FLIGHT,
+        max_connections: int = REVIEWER_MAX_CONNECTIONS,
+        cache: Optional[ReviewCache] = None,
+        limiter: Optional[ProviderLimiter] = None,
+        health: Optional[ProviderHealth] = None,
+        timeout: Optional[float] = LLM_CALL_TIMEOUT_SECONDS,
+        hedge: bool = LLM_HEDGING_ENABLED,
+        hedge_fallback: Optional[str] = None,
+    ):
+        """
+        Initialize the reviewer.
+
+        Args:
+            name: Unique reviewer name, used as the key in review results
+            provider: Provider implementing the calls ('openai', 'claude', 'mistral')
+            model: Model name passed to the provider
+            temperature: Sampling temperature, defaults to the provider default
+            max_in_flight: Maximum number of concurrent requests to this reviewer
+            max_connections: Size of the reviewer's HTTP connection pool
+            cache: Cache for responses, defaults to the shared review cache
+            limiter: Rate limiter, defaults to the one shared by all reviewers
+                of the provider
+            health: Health tracker and circuit breaker, defaults to the one
+                shared by all reviewers of the provider
+            timeout: Deadline in seconds for each request, None for no deadline
+            hedge: Duplicate requests that run past the reviewer's usual latency
+            hedge_fallback: Name of an equivalent reviewer to send duplicates
+                to instead of this one, resolved by load_registry
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider: {provider}")
+
+        self.name = name
+        self.provider = provider
+        self.model = model
+        self.temperature = (
+            temperature
+            if temperature is not None
+            else PROVIDERS[provider].default_temperature
+        )
+        self.max_in_flight = max_in_flight
+        self.max_connections = max_connections
+        self.cache = cache if cache is not None else review_cache
+        self.limiter = limiter if limiter is not None else get_limiter(provider)
+        self.health = health if health is not None else get_health(provider)
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_fallback = hedge_fallback
+        self.fallback: Optional["ReviewerBackend"] = None
+
+        self.latency = LatencyTracker()
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.recent_hedges: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self.usage = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    @property
+    def llm(self) -> LLMProvider:
+        return PROVIDERS[self.provider]
+
+    @property
+    def client(self) -> Any:
+        # Created on first use so that building a registry stays cheap
+        if self._client is None:
+            self._client = self.llm.create_client(self.max_connections)
+        return self._client
+
+    def _call_kwargs(self) -> Dict[str, Any]:
+        kwargs = {"model": self.model, "client": self.client}
+        if self.temperature is not None:
+            kwargs["temperature"] = self.temperature
+        return kwargs
+
+    async def _request(
+        self,
+        method: str,
+        args: Tuple[Any, ...],
+        estimated_tokens: int,
+        extractor: Optional[ScoreExtractor] = None,
+        on_usage: Optional[UsageCallback] = None,
+    ) -> str:
+        """
+        Send one request through the in-flight limit and the provider's rate
+        limiter, with the reviewer's deadline on each attempt. Each attempt
+        is recorded in the provider's health, and refused without being sent
+        while the provider's circuit is open.
+
+        Args:
+            method: Provider call to make, 'review' or 'updated_review'
+            args: Positional arguments of the call
+            estimated_tokens: Tokens the request is expected to use
+            extractor: Streams the response to this extractor if given; it
+                is reset at the start of every attempt, so a timed-out or
+                retried attempt leaves no scores behind
+            on_usage: Called with the token counts of the request
+        """
+        call = getattr(self.llm, method)
+
+        def record_usage(usage: Usage) -> None:
+            self.usage["calls"] += 1
+            for field in ("input_tokens", "cached_tokens", "output_tokens"):
+                self.usage[field] += usage.get(field) or 0
+            if on_usage is not None:
+                on_usage(usage)
+
+        async def attempt() -> str:
+            self.health.before_request()
+            if extractor is not None:
+                extractor.reset()
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    call(
+                        *args,
+                        on_delta=extractor.feed if extractor is not None else None,
+                        on_usage=record_usage,
+                        **self._call_kwargs(),
+                    ),
+                    self.timeout,
+                )
+            except Exception as e:
+                if is_provider_failure(e):
+                    self.health.record_failure()
+                else:
+                    self.health.record_neutral()
+                raise
+            except BaseException:
+                # Cancelled, e.g. a hedge that lost
+                self.health.record_neutral()
+                raise
+            latency = time.monotonic() - started
+            self.latency.record(latency)
+            self.health.record_success(latency)
+            return result
+
+        # Fail fast rather than queue for a provider that is down
+        if not self.health.available():
+            self.health.before_request()
+        async with self._semaphore:
+            return await self.limiter.call(attempt, estimated_tokens)
+
+    async def _cached_call(
+        self,
+        key: str,
+        method: str,
+        args: Tuple[Any, ...],
+        estimated_tokens: int,
+        on_scores: Optional[ScoresCallback],
+        on_usage: Optional[UsageCallback],
+        cacheable: Callable[[str], bool] = is_review,
+    ) -> str:
+        """
+        Run a provider call through the cache, hedging it if enabled.
+
+        With on_scores, the call streams its response and scores are reported
+        as they appear. Cached or deduplicated responses report their scores
+        once the full text is available, and so do responses of a hedge that
+        won, after the streamed primary's scores are dropped. on_usage is only
+        called when a request is actually sent.
+
+        A response is only cached if it passes cacheable and was answered by
+        this reviewer, not by its hedge fallback, since the cache key names
+        this reviewer's model.
+        """
+        extractor = ScoreExtractor(on_scores) if on_scores is not None else None
+        answered_by = self
+
+        async def compute() -> str:
+            nonlocal answered_by
+            if not self.hedge:
+                return await self._request(
+                    method, args, estimated_tokens, extractor, on_usage
+                )
+
+            target = self.fallback or self
+            result, record = await hedged(
+                lambda: self._request(
+                    method, args, estimated_tokens, extractor, on_usage
+                ),
+                # The duplicate does not stream; its scores are read at the end
+                lambda: target._request(
+                    method, args, estimated_tokens, on_usage=on_usage
+                ),
+                self.latency.percentile(LLM_HEDGE_PERCENTILE),
+            )
+            if record is not None:
+                record["target"] = target.name
+                self.hedges_sent += 1
+                self.hedge_wins += record["winner"] == "hedge"
+                self.recent_hedges.append(record)
+                if record["winner"] == "hedge":
+                    answered_by = target
+                    # The scores streamed so far came from the losing primary
+                    if extractor is not None:
+                        extractor.reset()
+            return result
+
+        result = await self.cache.get_or_compute(
+            key,
+            compute,
+            cacheable=lambda text: answered_by is self and cacheable(text),
+        )
+        if extractor is not None:
+            extractor.finish(result)
+        return result
+
+    def _cache_key(self, paper_text: str, prompt: str) -> str:
+        return make_cache_key(
+            paper_text=paper_text,
+            provider=self.provider,
+            model=self.model,
+            temperature=self.temperature,
+            prompt=prompt,
+        )
+
+    async def review(
+        self,
+        paper_text: str,
+        prompt: Any,
+        on_scores: Optional[ScoresCallback] = None,
+        on_usage: Optional[UsageCallback] = None,
+        cacheable: Callable[[str], bool] = is_review,
+    ) -> str:
+        """
+        Get an initial review of the paper from this reviewer.
+
+        Args:
+            paper_text: The text content of the paper
+            prompt: The review prompt
+            on_scores: Called with the scores found so far as the response
+                streams in
+            on_usage: Called with the token counts of the request, unless the
+                review came from the cache
+            cacheable: Whether a response may be cached; the default asks for
+                scores, prompts whose answers have none pass e.g. has_text
+
+        Returns:
+            Raw response from the model
+        """
+        key = self._cache_key(paper_text, f"review:{prompt}")
+        return await self._cached_call(
+            key,
+            "review",
+            (paper_text, prompt),
+            estimate_tokens(str(prompt), paper_text),
+            on_scores,
+            on_usage,
+            cacheable,
+        )
+
+    async def updated_review(
+        self,
+        paper_text: str,
+        prompt: Any,
+        update_prompt: Any,
+        other_reviews: List[Any],
+        on_scores: Optional[ScoresCallback] = None,
+        on_usage: Optional[UsageCallback] = None,
+    ) -> str:
+        """
+        Get an updated review given the other reviewers' reviews.
+
+        Args:
+            paper_text: The text content of the paper
+            prompt: The review prompt, sent as in the initial round so the
+                provider can reuse its cached prefix
+            update_prompt: Instructions for updating the review
+            other_reviews: Reviews from the other reviewers
+            on_scores: Called with the scores found so far as the response
+                streams in
+            on_usage: Called with the token counts of the request, unless the
+                review came from the cache
+
+        Returns:
+            Raw response from the model
+        """
+        peer_reviews = format_peer_reviews(other_reviews)
+        key = self._cache_key(
+            paper_text, f"update:{prompt}\n\n{update_prompt}\n\n{peer_reviews}"
+        )
+        return await self._cached_call(
+            key,
+            "updated_review",
+            (paper_text, prompt, update_prompt, other_reviews),
+            estimate_tokens(str(prompt), str(update_prompt), peer_reviews, paper_text),
+            on_scores,
+            on_usage,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency percentiles, hedging counters and token usage of this reviewer."""
+
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 3) if value is not None else None
+
+        return {
+            "samples": len(self.latency),
+            "p50": rounded(self.latency.percentile(50)),
+            "p95": rounded(self.latency.percentile(95)),
+            "circuit": self.health.state,
+            "hedge": self.hedge,
+            "hedges_sent": self.hedges_sent,
+            "hedge_wins": self.hedge_wins,
+            "recent_hedges": list(self.recent_hedges),
+            "usage": dict(self.usage),
+            "prompt_cache_hit_rate": (
+                round(self.usage["cached_tokens"] / self.usage["input_tokens"], 4)
+                if self.usage["input_tokens"]
+                else None
+            ),
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"ReviewerBackend(name={self.name!r}, provider={self.provider!r}, "
+            f"model={self.model!r})"
+        )
+
+
+class ReviewerRegistry:
+    """Ordered collection of reviewer backends, keyed by name."""
+
+    def __init__(self, reviewers: Optional[List[ReviewerBackend]] = None):
+        self._reviewers: Dict[str, ReviewerBackend] = {}
+        for reviewer in reviewers or []:
+            self.register(reviewer)
+
+    def register(self, reviewer: ReviewerBackend) -> None:
+        """Add a reviewer, rejecting duplicate names."""
+        if reviewer.name in self._reviewers:
+            raise ValueError(f"Reviewer already registered: {reviewer.name}")
+        self._reviewers[reviewer.name] = reviewer
+
+    def get(self, name: str) -> ReviewerBackend:
+        """Get a reviewer by name."""
+        if name not in self._reviewers:
+            raise ValueError(f"Unknown service: {name}")
+        return self._reviewers[name]
+
+    def names(self) -> List[str]:
+        """Names of the registered reviewers, in registration order."""
+        return list(self._reviewers)
+
+    def __iter__(self) -> Iterator[ReviewerBackend]:
+        return iter(self._reviewers.values())
+
+    def __len__(self) -> int:
+        return len(self._reviewers)
+
+
+def load_registry(config: str = REVIEWERS) -> ReviewerRegistry:
+    """
+    Build the reviewer registry from configuration.
+
+    Args:
+        config: JSON list of reviewer definitions. When empty, one reviewer per
+            provider is created from the OPENAI_MODEL, CLAUDE_MODEL and
+            MISTRAL_MODEL environment variables.
+
+    Returns:
+        The populated registry
+    """
+    if config.strip():
+        definitions = json.loads(config)
+    else:
+        definitions = [
+            {
+                "name": provider,
+                "provider": provider,
+                "model": os.getenv(f"{provider.upper()}_MODEL"),
+            }
+            for provider in PROVIDERS
+        ]
+
+    registry = ReviewerRegistry(
+        [ReviewerBackend(**definition) for definition in definitions]
+    )
+    for reviewer in registry:
+        if reviewer.hedge_fallback is not None:
+            reviewer.fallback = registry.get(reviewer.hedge_fallback)
+    return registry
+
+
+default_registry = load_registry()
@@ -1,44 +1,310 @@
-from typing import Dict, Any
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Iterable, List, Optional
+import json
+import shutil
+import sqlite3
+import threading
 import uuid
 import time
 import os
 from pathlib import Path
 
-# Create a directory for storing files
-STORAGE_DIR = Path("./tmp_storage")
-STORAGE_DIR.mkdir(exist_ok=True)
+from app.config import (
+    STORAGE_DIR as STORAGE_PATH,
+    JOB_STORE,
+    JOB_STORE_PATH,
+    JOB_TTL_SECONDS,
+)
 
-# In-memory storage for job tracking
-processing_jobs = {}
+# Directory for storing files, created with the job store, see get_job_store
+STORAGE_DIR = Path(STORAGE_PATH)
+
+# Statuses of jobs still being converted or reviewed, never evicted
+IN_PROGRESS_STATUSES = ("pending", "queued", "reviewing")
+
+
+class JobStore(ABC):
+    """Storage backend for processing jobs."""
+
+    @abstractmethod
+    def create(self, job_id: str, job: Dict[str, Any]) -> None:
+        """Insert a new job."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID, or None if it does not exist."""
+
+    @abstractmethod
+    def update(
+        self,
+        job_id: str,
+        status: str,
+        fields: Dict[str, Any],
+        from_statuses: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """
+        Atomically set a job's status and merge in fields.
+
+        When from_statuses is given, the update only happens if the job's
+        current status is one of them. Returns whether the job was updated.
+        """
+
+    @abstractmethod
+    def list_ids(
+        self,
+        status: Optional[str] = None,
+        created_before: Optional[float] = None,
+        exclude_statuses: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """IDs of jobs, optionally filtered by status and creation time."""
+
+    @abstractmethod
+    def delete(self, job_ids: List[str]) -> None:
+        """Delete jobs by ID."""
+
+
+class MemoryJobStore(JobStore):
+    """Jobs in a dict. Lost on restart and not shared between workers."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, job):
+        with self._lock:
+            self._jobs[job_id] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id, status, fields, from_statuses=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if from_statuses is not None and job["status"] not in from_statuses:
+                return False
+            job.update(fields)
+            job["status"] = status
+            return True
+
+    def list_ids(self, status=None, created_before=None, exclude_statuses=None):
+        excluded = set(exclude_statuses or ())
+        with self._lock:
+            return [
+                job_id
+                for job_id, job in self._jobs.items()
+                if (status is None or job["status"] == status)
+                and (created_before is None or job["created_at"] < created_before)
+                and job["status"] not in excluded
+            ]
+
+    def delete(self, job_ids):
+        with self._lock:
+            for job_id in job_ids:
+                self._jobs.pop(job_id, None)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Jobs in a SQLite database in WAL mode.
+
+    The database is shared by every worker process on the host, so any
+    worker can answer for any job, and jobs survive restarts. Status and
+    creation time are indexed columns; all other fields are stored as JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id, job):
+        self._connect().execute(
+            "INSERT INTO jobs (job_id, status, created_at, data) VALUES (?, ?, ?, ?)",
+            (job_id, job["status"], job["created_at"], json.dumps(job)),
+        )
+
+    def get(self, job_id):
+        row = (
+            self._connect()
+            .execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,))
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id, status, fields, from_statuses=None):
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so the read, the
+        # status check and the write happen as one step across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT status, data FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None or (
+                from_statuses is not None and row[0] not in from_statuses
+            ):
+                conn.execute("ROLLBACK")
+                return False
+
+            job = json.loads(row[1])
+            job.update(fields)
+            job["status"] = status
+            conn.execute(
+                "UPDATE jobs SET status = ?, data = ? WHERE job_id = ?",
+                (status, json.dumps(job), job_id),
+            )
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list_ids(self, status=None, created_before=None, exclude_statuses=None):
+        query = "SELECT job_id FROM jobs WHERE 1 = 1"
+        params: List[Any] = []
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        if created_before is not None:
+            query += " AND created_at < ?"
+            params.append(created_before)
+        excluded = list(exclude_statuses or ())
+        if excluded:
+            query += f" AND status NOT IN ({', '.join('?' for _ in excluded)})"
+            params.extend(excluded)
+        return [row[0] for row in self._connect().execute(query, params)]
+
+    def delete(self, job_ids):
+        self._connect().executemany(
+            "DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in job_ids]
+        )
+
+
+def create_job_store(kind: str = JOB_STORE) -> JobStore:
+    """Create the configured job store ('sqlite' or 'memory')"""
+    if kind == "sqlite":
+        return SQLiteJobStore(JOB_STORE_PATH)
+    if kind == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+_job_store: Optional[JobStore] = None
+_job_store_lock = threading.Lock()
+
+def get_job_store() -> JobStore:
+    """
+    The configured job store, created with the storage directory on first use.
+
+    Nothing is written at import, so importing the app, e.g. in tests, does
+    not create files in the working directory. The app calls this at startup.
+    """
+    global _job_store
+    with _job_store_lock:
+        if _job_store is None:
+            STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+            _job_store = create_job_store()
+        return _job_store
 
 def create_job(filename: str, job_type: str = "pdf_upload") -> str:
     """Create a new processing job and return its ID"""
     job_id = str(uuid.uuid4())
-    processing_jobs[job_id] = {
+    get_job_store().create(job_id, {
         "filename": filename,
         "job_type": job_type,
         "status": "pending",
         "created_at": time.time(),
         "completed_at": None,
         "error": None
-    }
+    })
     return job_id
 
 def update_job_status(job_id: str, status: str, **kwargs) -> None:
     """Update job status and additional fields"""
-    if job_id in processing_jobs:
-        processing_jobs[job_id]["status"] = status
-        
-        if status == "completed":
-            processing_jobs[job_id]["completed_at"] = time.time()
-        
-        # Update any additional fields
-        for key, value in kwargs.items():
-            processing_jobs[job_id][key] = value
+    if status == "completed":
+        kwargs.setdefault("completed_at", time.time())
+    get_job_store().update(job_id, status, kwargs)
+
+def transition_job_status(
+    job_id: str, from_statuses: Iterable[str], status: str, **kwargs
+) -> bool:
+    """Atomically move a job to status if it is currently in one of from_statuses"""
+    if status == "completed":
+        kwargs.setdefault("completed_at", time.time())
+    return get_job_store().update(
+        job_id, status, kwargs, from_statuses=list(from_statuses)
+    )
 
 def get_job(job_id: str) -> Dict[str, Any]:
     """Get job details by ID"""
-    return processing_jobs.get(job_id, {"status": "not_found"})
+    return get_job_store().get(job_id) or {"status": "not_found"}
+
+def evict_expired_jobs(ttl_seconds: int = JOB_TTL_SECONDS) -> int:
+    """
+    Delete jobs older than ttl_seconds with their files, and return how many.
+
+    Jobs still being converted or reviewed are kept however old they are, so
+    a long review does not lose its job and files while it runs.
+    """
+    store = get_job_store()
+    cutoff = time.time() - ttl_seconds
+    job_ids = store.list_ids(
+        created_before=cutoff, exclude_statuses=IN_PROGRESS_STATUSES
+    )
+    for job_id in job_ids:
+        for path in STORAGE_DIR.glob(f"{job_id}.*"):
+            path.unlink(missing_ok=True)
+    store.delete(job_ids)
+
+    # Uploads abandoned mid-transfer and images of PDFs not requested lately
+    for path in STORAGE_DIR.glob("*.part"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+    images_root = STORAGE_DIR / "images"
+    if images_root.exists():
+        for path in images_root.iterdir():
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    return len(job_ids)
+
+def store_pdf(job_id: str, spooled_path: str) -> str:
+    """Move a spooled upload into place as the job's PDF and return the file path"""
+    filepath = STORAGE_DIR / f"{job_id}.pdf"
+    os.replace(spooled_path, filepath)
+    return str(filepath)
+
+def get_images_dir(pdf_sha256: str) -> str:
+    """Directory holding the extracted images of a PDF, shared by identical uploads"""
+    return str(STORAGE_DIR / "images" / pdf_sha256)
 
 def save_markdown(job_id: str, markdown_text: str) -> str:
     """Save markdown text to a file and return the file path"""
@@ -47,10 +313,41 @@ def save_markdown(job_id: str, markdown_text: str) -> str:
         f.write(markdown_text)
     return str(filepath)
 
+# Serializes saving review results, so a partial result cannot be written
+# between another thread's check and write
+_review_result_lock = threading.Lock()
+
+def save_review_result(job_id: str, result: Dict[str, Any]) -> str:
+    """
+    Save a JSON-serializable review result to a file and return the file path.
+
+    A partial result never replaces a complete one: the late reviews of a
+    partial result may be saved before the partial result itself.
+    """
+    filepath = STORAGE_DIR / f"{job_id}.review.json"
+    tmp_path = STORAGE_DIR / f"{job_id}.review.json.{os.getpid()}.tmp"
+    with _review_result_lock:
+        if result.get("partial"):
+            stored = load_review_result(job_id)
+            if stored is not None and not stored.get("partial"):
+                return str(filepath)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, filepath)
+    return str(filepath)
+
+def load_review_result(job_id: str) -> Optional[Dict[str, Any]]:
+    """Load a saved review result, or None if there is none"""
+    filepath = STORAGE_DIR / f"{job_id}.review.json"
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
 def load_markdown(job_id: str) -> str:
     """Load markdown text from a file"""
     filepath = STORAGE_DIR / f"{job_id}.md"
     if os.path.exists(filepath):
         with open(filepath, "r", encoding="utf-8") as f:
             return f.read()
-    return ""
\ No newline at end of file
+    return ""
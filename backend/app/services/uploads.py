@@ -0,0 +1,68 @@
+"""
+Streaming handling of uploaded files.
+
+Uploads are copied to disk chunk by chunk while being hashed, so memory use
+per upload stays at one chunk regardless of file size, and oversized files
+are rejected as soon as they cross the limit.
+"""
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+
+from fastapi import UploadFile
+
+from app.config import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+async def spool_upload(
+    upload: UploadFile,
+    directory: str,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+) -> SpooledUpload:
+    """
+    Stream an uploaded file to a temporary file in directory.
+
+    Args:
+        upload: The uploaded file
+        directory: Directory to create the file in
+        max_bytes: Maximum accepted size in bytes
+        chunk_size: Number of bytes read at a time
+
+    Returns:
+        Path, size and SHA-256 of the stored file. The caller owns the file.
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes
+    """
+    # Reject before reading anything when the size is already known
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    return SpooledUpload(path, size, digest.hexdigest())
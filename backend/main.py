@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from api.main import lifespan
 from api.routes.reviews import router as review_router
-from app.config import APP_NAME, API_PREFIX, CORS_ORIGINS
+from app.config import (
+    APP_NAME,
+    API_PREFIX,
+    CORS_ORIGINS,
+)
+
 
 # Create FastAPI application
 app = FastAPI(
     title=APP_NAME,
     description="API for reviewing academic papers using multiple LLMs",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
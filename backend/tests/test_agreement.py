@@ -0,0 +1,78 @@
+import json
+import unittest
+
+import numpy as np
+
+from app.review_engine.agreement import (
+    compute_agreement,
+    matrix_to_json,
+    score_agreement,
+    score_dispersion,
+    text_agreement,
+)
+
+
+def review(scores, strengths="", weaknesses=""):
+    soundness, presentation, contribution, rating = scores
+    return {
+        "soundness": soundness,
+        "presentation": presentation,
+        "contribution": contribution,
+        "rating": rating,
+        "strengths": strengths,
+        "weaknesses": weaknesses,
+    }
+
+
+class TestAgreement(unittest.TestCase):
+    def test_score_agreement(self):
+        reviews = [
+            review((3, 3, 3, 5)),
+            review((3, 3, 3, 5)),
+            review((5, 5, 5, 10)),
+            {"soundness": "[1]", "rating": "1: trivial"},
+        ]
+        matrix = score_agreement(reviews)
+        self.assertEqual(matrix[0, 1], 1.0)
+        self.assertAlmostEqual(matrix[0, 2], 1 - (0.5 * 3 + 5 / 9) / 4)
+        # Only the scores both reviews gave are compared
+        self.assertAlmostEqual(matrix[2, 3], 0.0)
+        np.testing.assert_allclose(matrix, matrix.T)
+
+    def test_text_agreement_ranks_shared_points_higher(self):
+        reviews = [
+            review((3, 3, 3, 5), "Strong ablations on ImageNet", "No theoretical analysis"),
+            review((3, 3, 3, 5), "Thorough ablations on ImageNet", "Theoretical analysis missing"),
+            review((3, 3, 3, 5), "Clear writing", "Small benchmark, unclear baselines"),
+            review((3, 3, 3, 5)),
+        ]
+        matrix = text_agreement(reviews)
+        self.assertGreater(matrix[0, 1], matrix[0, 2])
+        self.assertEqual(matrix[0, 3], 0.0)
+
+    def test_failed_reviews_have_no_agreement_and_matrix_is_json(self):
+        reviews = [
+            review((3, 3, 3, 5), "ablations"),
+            review((4, 3, 3, 6), "ablations"),
+            {"error": "Service claude failed: timeout"},
+        ]
+        matrix = compute_agreement(reviews)
+        self.assertEqual(list(np.diag(matrix)), [1.0, 1.0, 1.0])
+        self.assertTrue(np.isnan(matrix[0, 2]))
+
+        encoded = matrix_to_json(["a", "b", "c"], matrix)
+        decoded = json.loads(json.dumps(encoded, allow_nan=False))
+        self.assertEqual(decoded["reviewers"], ["a", "b", "c"])
+        self.assertIsNone(decoded["matrix"][0][2])
+        self.assertEqual(decoded["matrix"][0][1], decoded["matrix"][1][0])
+
+
+    def test_score_dispersion(self):
+        # Ratings 2 and 8 on a 1-10 scale are 6/9 apart, std 1/3
+        reviews = [{"rating": 2, "soundness": 3}, {"rating": 8, "soundness": 3}]
+        self.assertAlmostEqual(score_dispersion(reviews), 1 / 3)
+        self.assertTrue(np.isnan(score_dispersion([{"rating": 2}, {"error": "failed"}])))
+
+
+if __name__ == "__main__":
+    unittest.main()
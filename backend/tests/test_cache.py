@@ -0,0 +1,149 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from app.services.cache import DiskCache, LRUCache, ReviewCache, make_cache_key
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_key_depends_on_every_part(self):
+        key = make_cache_key(paper_text="paper", model="gpt-4o", temperature=0.3)
+        self.assertEqual(
+            key, make_cache_key(temperature=0.3, model="gpt-4o", paper_text="paper")
+        )
+        self.assertNotEqual(
+            key, make_cache_key(paper_text="paper", model="gpt-4o", temperature=0.0)
+        )
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_items=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+
+class TestDiskCache(unittest.TestCase):
+    def test_expired_entries_are_dropped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DiskCache(directory, max_bytes=1024 * 1024, ttl_seconds=60)
+            cache.set("key", {"summary": "ok"})
+            self.assertEqual(cache.get("key"), {"summary": "ok"})
+
+            old = time.time() - 120
+            os.utime(os.path.join(directory, "key.json"), (old, old))
+            self.assertIsNone(cache.get("key"))
+
+    def test_size_eviction_removes_oldest(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DiskCache(directory, max_bytes=150, ttl_seconds=60)
+            cache.set("old", "x" * 100)
+            old = time.time() - 10
+            os.utime(os.path.join(directory, "old.json"), (old, old))
+            cache.set("new", "y" * 100)
+            cache.evict()
+            self.assertIsNone(cache.get("old"))
+            self.assertEqual(cache.get("new"), "y" * 100)
+
+    def test_writes_do_not_scan_between_evictions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = DiskCache(directory, max_bytes=150, ttl_seconds=60)
+            cache.evict_interval = 3600
+            cache._last_evicted = time.monotonic()
+            cache.set("old", "x" * 100)
+            cache.set("new", "y" * 100)
+            # Over max_bytes until the next eviction runs
+            self.assertEqual(cache.get("old"), "x" * 100)
+
+
+class TestReviewCache(unittest.TestCase):
+    def test_repeat_call_is_served_from_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ReviewCache(
+                memory_items=4, directory=directory, max_bytes=1024, ttl_seconds=60
+            )
+            calls = []
+
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.01)
+                return "review"
+
+            async def run():
+                # Concurrent duplicates share a single call
+                first = await asyncio.gather(
+                    cache.get_or_compute("key", compute),
+                    cache.get_or_compute("key", compute),
+                )
+                second = await cache.get_or_compute("key", compute)
+                return first, second
+
+            first, second = asyncio.run(run())
+            self.assertEqual(first, ["review", "review"])
+            self.assertEqual(second, "review")
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(cache.stats()["memory_hits"], 1)
+
+            # A fresh process only has the disk tier
+            restarted = ReviewCache(
+                memory_items=4, directory=directory, max_bytes=1024, ttl_seconds=60
+            )
+            self.assertEqual(restarted.get("key"), "review")
+            self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_waiters_recompute_when_the_first_caller_is_cancelled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ReviewCache(
+                memory_items=4, directory=directory, max_bytes=1024, ttl_seconds=60
+            )
+            calls = []
+
+            async def compute():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return "review"
+
+            async def run():
+                first = asyncio.ensure_future(cache.get_or_compute("key", compute))
+                second = asyncio.ensure_future(cache.get_or_compute("key", compute))
+                await asyncio.sleep(0.01)
+                # Like an SSE client disconnecting from the first review
+                first.cancel()
+                return await asyncio.wait_for(second, 1), first.cancelled()
+
+            self.assertEqual(asyncio.run(run()), ("review", True))
+            self.assertEqual(len(calls), 2)
+
+    def test_rejected_values_are_returned_but_not_stored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ReviewCache(
+                memory_items=4, directory=directory, max_bytes=1024, ttl_seconds=60
+            )
+            answers = iter(["I can't help with that.", "0.8"])
+
+            async def compute():
+                return next(answers)
+
+            def cacheable(text):
+                return text[0].isdigit()
+
+            async def run():
+                first = await cache.get_or_compute("key", compute, cacheable)
+                second = await cache.get_or_compute("key", compute, cacheable)
+                third = await cache.get_or_compute("key", compute, cacheable)
+                return first, second, third
+
+            self.assertEqual(
+                asyncio.run(run()), ("I can't help with that.", "0.8", "0.8")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services import compaction
+from app.services.compaction import (
+    PAGE_BREAK,
+    compact,
+    context_budget,
+    count_tokens,
+    drop_references,
+    fit_to_budget,
+    join_hyphenation,
+)
+
+
+SECTIONS = ["introduction", "related work", "method", "experiments", "discussion"]
+
+
+def make_pages(count):
+    return PAGE_BREAK.join(
+        f"Proceedings of the Conference 2024\n"
+        f"Body text about the {SECTIONS[i % len(SECTIONS)]}.\n"
+        f"{i + 1}\n\n"
+        for i in range(count)
+    )
+
+
+def word_count(text):
+    return len(text.split())
+
+
+class TestCompaction(unittest.TestCase):
+    def test_running_headers_and_page_numbers_are_removed(self):
+        text = compact(make_pages(5))
+        self.assertNotIn("Proceedings", text)
+        self.assertNotIn(PAGE_BREAK, text)
+        for section in SECTIONS:
+            self.assertIn(f"Body text about the {section}.", text)
+        self.assertFalse(any(line.strip().isdigit() for line in text.split("\n")))
+
+    def test_lines_repeated_on_few_pages_are_kept(self):
+        text = compact(make_pages(2))
+        self.assertEqual(text.count("Proceedings"), 2)
+
+    def test_hyphenated_words_are_joined(self):
+        self.assertEqual(
+            join_hyphenation("a well-known exam-\nple of state-\nOf"),
+            "a well-known example of state-\nOf",
+        )
+
+    def test_references_are_dropped_up_to_the_appendix(self):
+        text = (
+            "Intro\n\nConclusion text\n\nReferences\n[1] A. Author. A paper. 2020.\n\n"
+            "Appendix A: Proofs\nProof of theorem 1."
+        )
+        compacted = drop_references(text)
+        self.assertNotIn("A. Author", compacted)
+        self.assertIn("Conclusion text", compacted)
+        self.assertIn("Proof of theorem 1.", compacted)
+        self.assertIn("A. Author", compact(text, references=True))
+
+    def test_paper_within_budget_is_unchanged(self):
+        text, report = fit_to_budget("short paper", 100, word_count)
+        self.assertEqual(text, "short paper")
+        self.assertFalse(report["truncated"])
+
+    def test_appendix_is_dropped_before_truncating(self):
+        body = "\n\n".join(f"paragraph {i} " + "word " * 10 for i in range(10))
+        appendix = "\n\nAppendix\n\n" + "extra " * 200
+        text, report = fit_to_budget(body + appendix, 150, word_count)
+        self.assertTrue(report["dropped_appendix"])
+        self.assertFalse(report["truncated"])
+        self.assertEqual(text, body.rstrip())
+
+    def test_long_paper_keeps_head_and_tail(self):
+        body = "\n\n".join(f"paragraph {i} " + "word " * 10 for i in range(100))
+        text, report = fit_to_budget(body, 300, word_count)
+        self.assertTrue(report["truncated"])
+        self.assertLessEqual(word_count(text), 300)
+        self.assertEqual(report["tokens"], word_count(text))
+        self.assertTrue(text.startswith("paragraph 0 "))
+        self.assertIn("paragraph 99 ", text)
+        self.assertIn("omitted to fit the context window", text)
+        self.assertNotIn("paragraph 50 ", text)
+
+    def test_token_counts_and_budgets(self):
+        self.assertGreater(count_tokens("word " * 100, "claude"), 0)
+        self.assertGreaterEqual(
+            count_tokens("word " * 100, "claude"), count_tokens("word " * 100, "openai")
+        )
+        self.assertEqual(context_budget("mistral", "unknown", 2000, max_tokens=10**6), 30000)
+        self.assertEqual(context_budget("claude", None, 2000, max_tokens=50000), 50000)
+
+    def test_token_count_cache_is_bounded_and_keeps_no_text(self):
+        texts = [f"paper {i} " * 200 for i in range(8)]
+        with patch.object(compaction, "TOKEN_COUNT_CACHE_SIZE", 4):
+            counts = [count_tokens(text, "claude") for text in texts]
+            self.assertEqual(counts, [count_tokens(text, "claude") for text in texts])
+            self.assertLessEqual(len(compaction._token_counts), 4)
+            self.assertFalse(any(text in key for key in compaction._token_counts for text in texts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.review_engine.consensus import (
+    build_consensus,
+    merge_points,
+    score_statistics,
+    split_points,
+)
+from app.review_engine.parser import ParsedReview
+
+
+class TestScoreStatistics(unittest.TestCase):
+    def test_robust_statistics(self):
+        stats = score_statistics([1, 6, 6, 7, 10, None], weights=[1, 1, 1, 1, 5, None])
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual(stats["mean"], 6.0)
+        self.assertEqual(stats["median"], 6.0)
+        # One score cut from each end
+        self.assertEqual(stats["trimmed_mean"], 6.33)
+        self.assertEqual(stats["weighted_mean"], 7.78)
+
+    def test_small_panels_are_trimmed(self):
+        # Three reviewers: the outlier is cut, leaving the median
+        self.assertEqual(score_statistics([2, 6, 7])["trimmed_mean"], 6.0)
+        # Two reviewers have nothing to cut
+        self.assertEqual(score_statistics([2, 6])["trimmed_mean"], 4.0)
+
+    def test_no_scores(self):
+        stats = score_statistics([None, None])
+        self.assertEqual(stats["count"], 0)
+        self.assertIsNone(stats["median"])
+
+
+class TestMergePoints(unittest.TestCase):
+    def test_split_points(self):
+        self.assertEqual(
+            split_points("- First point\n* Second point\n1. Third"),
+            ["First point", "Second point", "Third"],
+        )
+        self.assertEqual(
+            split_points("One sentence. Another one."), ["One sentence.", "Another one."]
+        )
+
+    def test_near_duplicates_are_merged(self):
+        merged = merge_points(
+            [
+                ["The experiments lack strong baselines", "Code is not released"],
+                ["The experiments lack strong baselines such as BERT"],
+                ["Writing is unclear in section 3"],
+            ]
+        )
+        self.assertEqual(
+            merged[0],
+            {"text": "The experiments lack strong baselines such as BERT", "support": 2},
+        )
+        self.assertEqual(len(merged), 3)
+
+    def test_merging_is_deterministic(self):
+        points = [
+            ["a novel dataset of protein structures"],
+            ["novel dataset of protein structures"],
+        ]
+        self.assertEqual(merge_points(points), merge_points(points))
+
+
+class TestBuildConsensus(unittest.TestCase):
+    def test_consensus_review(self):
+        reviews = [
+            ParsedReview(
+                summary="A method for X.",
+                soundness=3,
+                rating=6,
+                confidence=4,
+                weaknesses="- The experiments lack strong baselines",
+            ),
+            ParsedReview(
+                summary="A method for X using Y.",
+                soundness=2,
+                rating=4,
+                confidence=2,
+                weaknesses="- The experiments lack strong baselines\n- Small datasets",
+            ),
+        ]
+        review = build_consensus(reviews, statistic="median")
+        self.assertEqual(review.rating, 5.0)
+        self.assertEqual(review.presentation, 0.0)
+        self.assertEqual(
+            review.weaknesses,
+            "- The experiments lack strong baselines (2 of 2 reviewers)\n- Small datasets",
+        )
+        self.assertEqual(review.summary, "A method for X.")
+        self.assertEqual(build_consensus(reviews, statistic="weighted_mean").rating, 5.33)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.llm import claude, mistral, openai
+
+
+class FakeOpenAIClient:
+    """Answers with the given (text, finish_reason) pairs in turn."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        text, finish_reason = self.responses.pop(0)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content=text), finish_reason=finish_reason
+                )
+            ],
+            usage=SimpleNamespace(
+                prompt_tokens=100,
+                completion_tokens=10,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=50),
+            ),
+        )
+
+
+class FakeMistralClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.chat = SimpleNamespace(complete_async=self.complete_async)
+
+    async def complete_async(self, **kwargs):
+        self.requests.append(kwargs)
+        text, finish_reason = self.responses.pop(0)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content=text), finish_reason=finish_reason
+                )
+            ],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=10),
+        )
+
+
+class FakeClaudeClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.messages = SimpleNamespace(create=self.create)
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        text, stop_reason = self.responses.pop(0)
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            stop_reason=stop_reason,
+            usage=SimpleNamespace(
+                input_tokens=10,
+                cache_read_input_tokens=90,
+                cache_creation_input_tokens=0,
+                output_tokens=10,
+            ),
+        )
+
+
+class TestContinuation(unittest.TestCase):
+    def test_openai_continues_a_cut_off_response(self):
+        client = FakeOpenAIClient([('{"rating": 6, "summ', "length"), ('ary": "ok"}', "stop")])
+        usages = []
+        result = asyncio.run(
+            openai.get_openai_review("paper", "prompt", client=client, on_usage=usages.append)
+        )
+
+        self.assertEqual(result, '{"rating": 6, "summary": "ok"}')
+        first, second = client.requests
+        self.assertEqual(first["response_format"], {"type": "json_object"})
+        self.assertNotIn("response_format", second)
+        self.assertEqual(second["messages"][-2]["content"], '{"rating": 6, "summ')
+        self.assertEqual(
+            usages, [{"input_tokens": 200, "cached_tokens": 100, "output_tokens": 20}]
+        )
+
+    def test_mistral_continues_from_a_prefix(self):
+        client = FakeMistralClient([('{"rating": ', "length"), ("6}", "stop")])
+        result = asyncio.run(mistral.get_mistral_review("paper", "prompt", client=client))
+
+        self.assertEqual(result, '{"rating": 6}')
+        self.assertEqual(
+            client.requests[1]["messages"][-1],
+            {"role": "assistant", "content": '{"rating": ', "prefix": True},
+        )
+
+    def test_claude_prefills_json_and_continues(self):
+        client = FakeClaudeClient([('"rating": 6, ', "max_tokens"), ('"summary": "ok"}', "end_turn")])
+        usages = []
+        result = asyncio.run(
+            claude.get_claude_review("paper", "prompt", client=client, on_usage=usages.append)
+        )
+
+        self.assertEqual(result, '{"rating": 6,"summary": "ok"}')
+        first, second = client.requests
+        self.assertEqual(first["messages"][-1], {"role": "assistant", "content": "{"})
+        self.assertEqual(
+            second["messages"][-1], {"role": "assistant", "content": '{"rating": 6,'}
+        )
+        self.assertEqual(usages[0]["cached_tokens"], 180)
+
+    def test_complete_response_is_sent_once(self):
+        client = FakeOpenAIClient([('{"rating": 6}', "stop")])
+        asyncio.run(openai.get_openai_review("paper", "prompt", client=client))
+        self.assertEqual(len(client.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import fitz
+
+from app.services.converters import cache as converter_cache
+from app.services.converters.cache import ConversionCache, convert_pdf_cached
+from app.services.converters.executor import ConversionExecutor, ConversionQueueFull
+
+
+def make_pdf(path: str, text: str) -> None:
+    with fitz.open() as pdf:
+        page = pdf.new_page()
+        page.insert_text((72, 72), text)
+        pdf.save(path)
+
+
+class TestConversionCache(unittest.TestCase):
+    def test_duplicate_upload_skips_conversion(self):
+        text = "A study of caching in document conversion pipelines. " * 4
+
+        with tempfile.TemporaryDirectory() as directory:
+            pdf_path = os.path.join(directory, "paper.pdf")
+            make_pdf(pdf_path, text)
+            cache = ConversionCache(
+                directory=os.path.join(directory, "cache"),
+                max_bytes=1024 * 1024,
+                ttl_seconds=60,
+            )
+            executor = ConversionExecutor(max_workers=1, max_queue=1, timeout=60)
+
+            try:
+                with mock.patch.object(
+                    converter_cache, "conversion_cache", cache
+                ), mock.patch.object(converter_cache, "conversion_executor", executor):
+                    markdown_text, _ = asyncio.run(convert_pdf_cached(pdf_path))
+                    self.assertIn("caching in document conversion", markdown_text)
+
+                    with mock.patch.object(executor, "convert") as convert:
+                        cached_text, _ = asyncio.run(convert_pdf_cached(pdf_path))
+                        convert.assert_not_called()
+            finally:
+                executor.shutdown()
+
+            self.assertEqual(cached_text, markdown_text)
+            self.assertEqual(cache.stats()["hits"], 1)
+            self.assertEqual(cache.stats()["misses"], 1)
+
+
+class TestConversionExecutor(unittest.TestCase):
+    def test_rejects_jobs_when_queue_is_full(self):
+        executor = ConversionExecutor(max_workers=1, max_queue=0, timeout=60)
+        executor._pending = 1
+        with self.assertRaises(ConversionQueueFull):
+            asyncio.run(executor.convert("paper.pdf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
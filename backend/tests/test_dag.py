@@ -0,0 +1,128 @@
+import asyncio
+import unittest
+
+from app.review_engine.dag import SKIPPED, TaskCancelled, TaskGraph
+
+
+def collect(graph):
+    async def run():
+        return [item async for item in graph.run()]
+
+    return asyncio.run(run())
+
+
+class TestTaskGraph(unittest.TestCase):
+    def test_tasks_start_when_their_dependencies_finish(self):
+        graph = TaskGraph()
+        order = []
+
+        def task(name, delay, value):
+            async def run(inputs):
+                await asyncio.sleep(delay)
+                order.append(name)
+                return value + sum(inputs.values())
+
+            return run
+
+        graph.add("slow", task("slow", 0.05, 1))
+        graph.add("fast", task("fast", 0.0, 2))
+        # Needs only the fast task, so it does not wait for the slow one
+        graph.add("after_fast", task("after_fast", 0.0, 10), ["fast"])
+        graph.add("both", task("both", 0.0, 100), ["slow", "after_fast"])
+
+        items = collect(graph)
+
+        self.assertEqual(order, ["fast", "after_fast", "slow", "both"])
+        self.assertEqual(graph.results["both"], 113)
+        self.assertEqual([kind for kind, _, _ in items], ["done"] * 4)
+
+    def test_emitted_progress_comes_before_the_result(self):
+        graph = TaskGraph()
+
+        async def run(inputs):
+            graph.emit("task", "halfway")
+            return "finished"
+
+        graph.add("task", run)
+        self.assertEqual(
+            collect(graph), [("emit", "task", "halfway"), ("done", "task", "finished")]
+        )
+
+    def test_exceptions_are_passed_on_as_results(self):
+        graph = TaskGraph()
+
+        async def fail(inputs):
+            raise RuntimeError("broken")
+
+        async def check(inputs):
+            return isinstance(inputs["fail"], RuntimeError)
+
+        graph.add("fail", fail)
+        graph.add("check", check, ["fail"])
+        collect(graph)
+        self.assertTrue(graph.results["check"])
+
+    def test_dependencies_must_exist(self):
+        graph = TaskGraph()
+
+        async def run(inputs):
+            return None
+
+        with self.assertRaises(ValueError):
+            graph.add("task", run, ["missing"])
+        graph.add("task", run)
+        with self.assertRaises(ValueError):
+            graph.add("task", run)
+
+    def test_cancelled_tasks_finish_as_skipped(self):
+        graph = TaskGraph()
+        stopped = []
+
+        async def speculative(inputs):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                stopped.append("speculative")
+                raise
+            return "wasted"
+
+        async def decide(inputs):
+            graph.cancel("speculative")
+            graph.cancel("later")
+            return "converged"
+
+        async def later(inputs):
+            return "never run"
+
+        graph.add("speculative", speculative)
+        graph.add("decide", decide)
+        graph.add("later", later, ["speculative"])
+
+        collect(graph)
+
+        self.assertEqual(stopped, ["speculative"])
+        self.assertIs(graph.results["speculative"], SKIPPED)
+        self.assertIs(graph.results["later"], SKIPPED)
+        self.assertEqual(graph.results["decide"], "converged")
+
+    def test_cancellation_from_inside_a_task_is_a_failure(self):
+        graph = TaskGraph()
+
+        async def leaks(inputs):
+            raise asyncio.CancelledError()
+
+        async def after(inputs):
+            return isinstance(inputs["leaks"], TaskCancelled)
+
+        graph.add("leaks", leaks)
+        graph.add("after", after, ["leaks"])
+
+        async def run():
+            return [item async for item in graph.run()]
+
+        asyncio.run(asyncio.wait_for(run(), 1))
+        self.assertTrue(graph.results["after"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.cache import ReviewCache
+from app.services.llm import LLMProvider
+from app.services.llm.health import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitOpen,
+    ProviderHealth,
+    is_provider_failure,
+)
+from app.services.llm.ratelimit import ProviderLimiter
+from app.services.llm.registry import ReviewerBackend
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class TestProviderHealth(unittest.TestCase):
+    def test_circuit_opens_on_error_rate(self):
+        health = ProviderHealth("fake", error_rate=0.5, min_calls=4, cooldown=60)
+        health.record_success(0.1)
+        health.record_failure()
+        health.record_failure()
+        self.assertEqual(health.state, CLOSED)
+        health.record_failure()
+
+        self.assertEqual(health.state, OPEN)
+        self.assertEqual(health.error_rate(), 0.75)
+        with self.assertRaises(CircuitOpen):
+            health.before_request()
+        self.assertEqual(health.stats()["rejected"], 1)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        health = ProviderHealth("fake", error_rate=0.5, min_calls=1, cooldown=0.01)
+        health.record_failure()
+        self.assertEqual(health.state, OPEN)
+
+        asyncio.run(asyncio.sleep(0.02))
+        self.assertEqual(health.state, HALF_OPEN)
+        health.before_request()
+        # Only one probe at a time
+        with self.assertRaises(CircuitOpen):
+            health.before_request()
+        health.record_failure()
+        self.assertEqual(health.state, OPEN)
+
+        asyncio.run(asyncio.sleep(0.02))
+        health.before_request()
+        health.record_success(0.2)
+        self.assertEqual(health.state, CLOSED)
+        self.assertEqual(health.error_rate(), 0.0)
+        self.assertEqual(health.stats()["times_opened"], 2)
+
+    def test_old_outcomes_leave_the_window(self):
+        health = ProviderHealth("fake", min_calls=1, window=0.01)
+        health.record_success(0.1)
+        asyncio.run(asyncio.sleep(0.02))
+        self.assertIsNone(health.error_rate())
+
+    def test_only_server_and_connection_errors_are_failures(self):
+        class APIConnectionError(Exception):
+            pass
+
+        self.assertTrue(is_provider_failure(StatusError(503)))
+        self.assertTrue(is_provider_failure(APIConnectionError()))
+        self.assertTrue(is_provider_failure(asyncio.TimeoutError()))
+        self.assertFalse(is_provider_failure(StatusError(400)))
+        self.assertFalse(is_provider_failure(ValueError("unparseable response")))
+
+
+class TestReviewerCircuit(unittest.TestCase):
+    def make_reviewer(self, review, health):
+        fake = LLMProvider(review, review, lambda max_connections: None)
+        self.patch = patch.dict("app.services.llm.registry.PROVIDERS", {"fake": fake})
+        self.patch.start()
+        self.addCleanup(self.patch.stop)
+        return ReviewerBackend(
+            "fake",
+            "fake",
+            "model",
+            cache=ReviewCache(enabled=False),
+            limiter=ProviderLimiter("fake", 6000, 10**7, 4, max_retries=0),
+            health=health,
+        )
+
+    def test_open_circuit_fails_without_calling_the_provider(self):
+        calls = []
+
+        async def review(paper_text, prompt, on_delta=None, **kwargs):
+            calls.append(1)
+            raise StatusError(503)
+
+        health = ProviderHealth("fake", min_calls=2, cooldown=60)
+        reviewer = self.make_reviewer(review, health)
+        for _ in range(2):
+            with self.assertRaises(StatusError):
+                asyncio.run(reviewer.review("paper", "prompt"))
+        with self.assertRaises(CircuitOpen):
+            asyncio.run(reviewer.review("paper", "prompt"))
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(reviewer.stats()["circuit"], OPEN)
+
+    def test_client_errors_do_not_count_against_the_provider(self):
+        async def review(paper_text, prompt, on_delta=None, **kwargs):
+            raise StatusError(400)
+
+        health = ProviderHealth("fake", min_calls=1)
+        reviewer = self.make_reviewer(review, health)
+        with self.assertRaises(StatusError):
+            asyncio.run(reviewer.review("paper", "prompt"))
+        self.assertEqual(health.state, CLOSED)
+        self.assertIsNone(health.error_rate())
+
+
+if __name__ == "__main__":
+    unittest.main()
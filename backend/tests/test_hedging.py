@@ -0,0 +1,174 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.cache import ReviewCache
+from app.services.llm import LLMProvider
+from app.services.llm.hedging import LatencyTracker, hedged
+from app.services.llm.ratelimit import ProviderLimiter
+from app.services.llm.registry import ReviewerBackend
+
+
+def delayed(value, delay, cancelled=None, error=None):
+    async def fn():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.append(value)
+            raise
+        if error is not None:
+            raise error
+        return value
+
+    return fn
+
+
+class TestHedged(unittest.TestCase):
+    def test_fast_primary_is_not_hedged(self):
+        result, record = asyncio.run(
+            hedged(delayed("primary", 0.0), delayed("hedge", 0.0), 0.1)
+        )
+        self.assertEqual(result, "primary")
+        self.assertIsNone(record)
+
+    def test_slow_primary_loses_to_hedge_and_is_cancelled(self):
+        cancelled = []
+        result, record = asyncio.run(
+            hedged(delayed("primary", 1.0, cancelled), delayed("hedge", 0.0), 0.05)
+        )
+        self.assertEqual(result, "hedge")
+        self.assertEqual(record["winner"], "hedge")
+        self.assertGreaterEqual(record["fired_after"], 0.05)
+        self.assertEqual(cancelled, ["primary"])
+
+    def test_failed_hedge_falls_back_to_primary(self):
+        result, record = asyncio.run(
+            hedged(
+                delayed("primary", 0.1),
+                delayed("hedge", 0.0, error=RuntimeError("down")),
+                0.01,
+            )
+        )
+        self.assertEqual(result, "primary")
+        self.assertEqual(record["winner"], "primary")
+
+    def test_primary_error_raised_when_both_fail(self):
+        with self.assertRaisesRegex(RuntimeError, "primary"):
+            asyncio.run(
+                hedged(
+                    delayed(None, 0.05, error=RuntimeError("primary")),
+                    delayed(None, 0.0, error=RuntimeError("hedge")),
+                    0.01,
+                )
+            )
+
+    def test_latency_percentile_needs_samples(self):
+        tracker = LatencyTracker(min_samples=10)
+        for i in range(9):
+            tracker.record(i)
+        self.assertIsNone(tracker.percentile(95))
+        tracker.record(100)
+        self.assertEqual(tracker.percentile(95), 100)
+        self.assertEqual(tracker.percentile(50), 5)
+
+
+class TestReviewerDeadline(unittest.TestCase):
+    def test_timed_out_request_is_retried(self):
+        calls = []
+
+        async def review(paper_text, prompt, on_delta=None, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(1)
+            return "review"
+
+        fake = LLMProvider(review, review, lambda max_connections: None)
+        with patch.dict("app.services.llm.registry.PROVIDERS", {"fake": fake}):
+            reviewer = ReviewerBackend(
+                "fake",
+                "fake",
+                "model",
+                cache=ReviewCache(enabled=False),
+                limiter=ProviderLimiter("fake", 6000, 10**7, 4, max_backoff=0.01),
+                timeout=0.05,
+            )
+            result = asyncio.run(reviewer.review("paper", "prompt"))
+
+        self.assertEqual(result, "review")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(reviewer.limiter.retries, 1)
+
+    def test_timed_out_attempt_leaves_no_scores(self):
+        calls = []
+        reported = []
+
+        async def review(paper_text, prompt, on_delta=None, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                on_delta('{"rating": 2, ')
+                await asyncio.sleep(1)
+            on_delta('{"rating": 8}')
+            return '{"rating": 8}'
+
+        fake = LLMProvider(review, review, lambda max_connections: None)
+        with patch.dict("app.services.llm.registry.PROVIDERS", {"fake": fake}):
+            reviewer = ReviewerBackend(
+                "fake",
+                "fake",
+                "model",
+                cache=ReviewCache(enabled=False),
+                limiter=ProviderLimiter("fake", 6000, 10**7, 4, max_backoff=0.01),
+                timeout=0.05,
+            )
+            asyncio.run(reviewer.review("paper", "prompt", on_scores=reported.append))
+
+        self.assertEqual(reported, [{"rating": 2}, {"rating": 8}])
+
+
+class TestHedgeFallback(unittest.TestCase):
+    def run_hedged(self, cache):
+        reported = []
+
+        async def slow(paper_text, prompt, on_delta=None, **kwargs):
+            if on_delta is not None:
+                on_delta('{"rating": 2, ')
+            await asyncio.sleep(1)
+            return '{"rating": 2}'
+
+        async def fast(paper_text, prompt, on_delta=None, **kwargs):
+            return '{"rating": 8}'
+
+        providers = {
+            "slow": LLMProvider(slow, slow, lambda max_connections: None),
+            "fast": LLMProvider(fast, fast, lambda max_connections: None),
+        }
+        with patch.dict("app.services.llm.registry.PROVIDERS", providers):
+            reviewer = ReviewerBackend("slow", "slow", "model", cache=cache, hedge=True)
+            reviewer.fallback = ReviewerBackend("fast", "fast", "model", cache=cache)
+            reviewer.latency = LatencyTracker(min_samples=1)
+            reviewer.latency.record(0.01)
+            result = asyncio.run(
+                reviewer.review("paper", "prompt", on_scores=reported.append)
+            )
+        return result, reported
+
+    def test_fallback_answer_is_not_cached_as_the_primary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ReviewCache(
+                memory_items=4, directory=directory, max_bytes=1024, ttl_seconds=60
+            )
+            result, reported = self.run_hedged(cache)
+
+            self.assertEqual(result, '{"rating": 8}')
+            # The losing primary's streamed score is replaced by the winner's
+            self.assertEqual(reported[-1], {"rating": 8})
+            self.assertEqual(cache.stats()["memory_items"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.review_engine.orchestrator import ReviewEngine
+from app.review_engine.prompt import SECTION_REVIEW_PROMPT
+from app.review_engine.sections import NOTES_PREAMBLE, format_section_notes, split_sections
+from app.services.cache import ReviewCache
+from app.services.llm import LLMProvider
+from app.services.llm.ratelimit import ProviderLimiter
+from app.services.llm.registry import ReviewerBackend, ReviewerRegistry
+
+
+def word_count(text):
+    return len(text.split())
+
+
+DOCUMENT = "\n\n".join(
+    [
+        "A Long Thesis\n\nAbstract\nWe study things.",
+        "1 Introduction\n" + "intro " * 50,
+        "2 Method\n" + "\n\n".join("method " * 40 for _ in range(5)),
+        "2.1 Setup\n" + "setup " * 10,
+        "3 Results\n" + "results " * 60,
+    ]
+)
+
+
+class FakeReviewer:
+    def __init__(self, name, fail_sections=False):
+        self.name = name
+        self.fail_sections = fail_sections
+        self.sections = []
+        self.papers = []
+
+    async def review(self, paper_text, prompt, on_scores=None, on_usage=None, cacheable=None):
+        await asyncio.sleep(0)
+        if prompt is SECTION_REVIEW_PROMPT:
+            if self.fail_sections:
+                raise RuntimeError("provider down")
+            self.sections.append(paper_text)
+            return json.dumps({"summary": f"notes by {self.name}", "weaknesses": ["w"]})
+        self.papers.append(paper_text)
+        return json.dumps({"summary": f"{self.name} initial", "rating": 5})
+
+    async def updated_review(
+        self, paper_text, prompt, update_prompt, other_reviews, on_scores=None, on_usage=None
+    ):
+        self.papers.append(paper_text)
+        return json.dumps({"summary": f"{self.name} updated", "rating": 5})
+
+
+async def fake_consensus(aggregated):
+    return {"summary": "consensus"}
+
+
+class TestSplitSections(unittest.TestCase):
+    def test_sections_follow_headings_and_fit_the_budget(self):
+        sections = split_sections(DOCUMENT, 120, word_count)
+        self.assertTrue(all(word_count(section["text"]) <= 120 for section in sections))
+        self.assertEqual(" ".join(s["text"] for s in sections).split(), DOCUMENT.split())
+        titles = [section["title"] for section in sections]
+        self.assertTrue(any(title.startswith("2 Method (part") for title in titles))
+        self.assertEqual(titles[-1], "2.1 Setup to 3 Results")
+
+    def test_short_sections_are_merged(self):
+        sections = split_sections(DOCUMENT, 10000, word_count)
+        self.assertEqual(len(sections), 1)
+        self.assertEqual(sections[0]["title"], "A Long Thesis to 3 Results")
+
+    def test_notes_mark_failed_sections(self):
+        text = format_section_notes(
+            [{"title": "Intro"}, {"title": "Method"}],
+            [{"summary": "fine", "weaknesses": ["small sample"]}, {"error": "failed"}],
+        )
+        self.assertTrue(text.startswith(NOTES_PREAMBLE))
+        self.assertIn("## Section 1: Intro", text)
+        self.assertIn("- small sample", text)
+        self.assertIn("could not be reviewed", text)
+
+
+class TestLongDocumentMode(unittest.TestCase):
+    def run_engine(self, reviewers):
+        engine = ReviewEngine(
+            "prompt",
+            "update prompt",
+            registry=ReviewerRegistry(reviewers),
+            long_document="always",
+            max_rounds=1,
+            convergence_spread=None,
+            convergence_agreement=None,
+        )
+
+        async def run():
+            return [event async for event in engine.process_text_stream(DOCUMENT)]
+
+        with patch("app.review_engine.orchestrator.LONG_DOCUMENT_SECTION_TOKENS", 100), patch(
+            "app.review_engine.orchestrator.convert_to_openreview", fake_consensus
+        ):
+            return asyncio.run(run())
+
+    def test_sections_are_spread_over_reviewers_and_reduced(self):
+        first, second = FakeReviewer("first"), FakeReviewer("second")
+        events = self.run_engine([first, second])
+
+        section_events = [event for event in events if event["event"] == "section"]
+        self.assertGreater(len(section_events), 2)
+        self.assertTrue(first.sections and second.sections)
+        self.assertTrue(all("Beginning of the document" in text for text in first.sections))
+
+        # Both rounds review the section notes, not the document
+        for reviewer in (first, second):
+            self.assertEqual(len(reviewer.papers), 2)
+            self.assertTrue(reviewer.papers[0].startswith(NOTES_PREAMBLE))
+            self.assertEqual(reviewer.papers[0], reviewer.papers[1])
+
+        result = events[-1]["result"]
+        self.assertEqual(len(result["sections"]), len(section_events))
+        self.assertEqual(result["individual_reviews"]["first"]["summary"], "first initial")
+
+    def test_failed_section_reviewer_falls_back_to_the_next(self):
+        events = self.run_engine([FakeReviewer("broken", fail_sections=True), FakeReviewer("ok")])
+        sections = events[-1]["result"]["sections"]
+        self.assertTrue(all(section["reviewer"] == "ok" for section in sections))
+
+    def test_second_review_of_a_document_is_served_from_the_cache(self):
+        calls = []
+
+        async def review(paper_text, prompt, on_delta=None, **kwargs):
+            calls.append(prompt)
+            if prompt is SECTION_REVIEW_PROMPT:
+                return json.dumps({"summary": "notes", "weaknesses": ["w"]})
+            return json.dumps({"summary": "initial", "rating": 5})
+
+        async def updated_review(paper_text, prompt, update_prompt, other_reviews, **kwargs):
+            calls.append(update_prompt)
+            return json.dumps({"summary": "updated", "rating": 6})
+
+        fake = LLMProvider(review, updated_review, lambda max_connections: None)
+        with tempfile.TemporaryDirectory() as directory, patch.dict(
+            "app.services.llm.registry.PROVIDERS", {"fake": fake}
+        ):
+            cache = ReviewCache(
+                memory_items=64, directory=directory, max_bytes=10**6, ttl_seconds=60
+            )
+            limiter = ProviderLimiter("fake", 6000, 10**7, 4)
+            reviewers = [
+                ReviewerBackend(name, "fake", "model", cache=cache, limiter=limiter)
+                for name in ("first", "second")
+            ]
+            self.run_engine(reviewers)
+            self.assertIn(SECTION_REVIEW_PROMPT, calls)
+
+            calls.clear()
+            events = self.run_engine(reviewers)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(events[-1]["result"]["individual_reviews"]["first"]["summary"], "initial")
+
+
+if __name__ == "__main__":
+    unittest.main()
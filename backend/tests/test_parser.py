@@ -1,5 +1,5 @@
 import unittest
-from outputparser.parser import parse_llm_feedback
+from app.review_engine.parser import ParsedReview, parse_llm_feedback, parse_review, repair_json
 
 
 class TestParser(unittest.TestCase):
@@ -22,6 +22,76 @@ class TestParser(unittest.TestCase):
         self.assertEqual(result["rating"], 7)
         self.assertIn("A promising approach", result["summary"])
 
+    def test_multiline_fields_and_fractional_scores(self):
+        text = (
+            "**Summary**: First line.\nSecond line.\n"
+            "Soundness: 3.5\n"
+            "Weaknesses:\n- No baselines.\n- Small data: only 10 samples.\n"
+            "Rating: 6\n"
+        )
+        result = parse_llm_feedback(text)
+        self.assertEqual(result["summary"], "First line.\nSecond line.")
+        self.assertEqual(result["soundness"], 3.5)
+        self.assertIn("Small data: only 10 samples.", result["weaknesses"])
+        self.assertIsNone(result["presentation"])
+        self.assertIsNone(result["questions"])
+
+
+class TestParseReview(unittest.TestCase):
+    def test_json_review_is_validated_directly(self):
+        review = parse_review(
+            {
+                "Summary": "Good paper.",
+                "soundness": [3],
+                "presentation": "4 (excellent)",
+                "contribution": 2.5,
+                "strengths": ["Clear", "Novel"],
+                "rating": 7,
+                "unknown": "ignored",
+            }
+        )
+        self.assertIsInstance(review, ParsedReview)
+        self.assertEqual(review.summary, "Good paper.")
+        self.assertEqual(
+            (review.soundness, review.presentation, review.contribution), (3.0, 4.0, 2.5)
+        )
+        self.assertEqual(review.strengths, "Clear\nNovel")
+        self.assertIsNone(review.confidence)
+        self.assertEqual(review.limitations, "")
+
+    def test_text_responses(self):
+        fenced = parse_review('Here it is:\n```json\n{"rating": 5, "summary": "ok"}\n```')
+        self.assertEqual((fenced.rating, fenced.summary), (5.0, "ok"))
+
+        labelled = parse_review("Summary: ok\nRating: 4")
+        self.assertEqual((labelled.rating, labelled.summary), (4.0, "ok"))
+
+        self.assertEqual(parse_review("no review here"), ParsedReview())
+
+
+class TestRepairJson(unittest.TestCase):
+    def test_prose_comments_and_trailing_commas(self):
+        text = (
+            'Here is my review:\n{\n  "soundness": 3, // methodology\n'
+            '  "strengths": ["a", "b",],\n  "summary": "line one\nline two",\n}\nThanks!'
+        )
+        self.assertEqual(
+            repair_json(text),
+            {"soundness": 3, "strengths": ["a", "b"], "summary": "line one\nline two"},
+        )
+
+    def test_cut_off_response_keeps_complete_fields(self):
+        self.assertEqual(
+            repair_json('```json\n{"rating": 6, "weaknesses": ["No baselines", "Small da'),
+            {"rating": 6, "weaknesses": ["No baselines", "Small da"]},
+        )
+        self.assertEqual(repair_json('{"rating": 6, "summ'), {"rating": 6})
+        self.assertEqual(repair_json('{"rating": 6, "summary":'), {"rating": 6, "summary": None})
+
+    def test_no_json(self):
+        with self.assertRaises(ValueError):
+            repair_json("I cannot review this paper.")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import fitz
+
+from app.services.converters import pdf as pdf_converter
+from app.services.converters.images import extract_images, load_manifest
+from app.services.converters.pdf import convert_pdf_bytes_to_markdown
+
+
+def make_mixed_pdf() -> bytes:
+    """A digital page with a text layer followed by an image-only 'scanned' page."""
+    with fitz.open() as pdf:
+        page = pdf.new_page()
+        page.insert_text((72, 72), "Digital page with an embedded text layer.")
+
+        scan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 32, 32), False)
+        scan.clear_with(200)
+        page = pdf.new_page()
+        page.insert_image(fitz.Rect(72, 72, 272, 272), pixmap=scan)
+
+        pdf.new_page()  # blank page, nothing to OCR
+        return pdf.tobytes()
+
+
+class TestPdfConverter(unittest.TestCase):
+    def test_only_pages_without_text_are_ocrd(self):
+        with mock.patch.object(
+            pdf_converter, "_ocr_image", return_value="Scanned page text."
+        ) as ocr:
+            markdown_text, images = convert_pdf_bytes_to_markdown(make_mixed_pdf())
+
+        ocr.assert_called_once()
+        self.assertEqual(ocr.call_args.args[0].mode, "L")
+        self.assertIn("Digital page with an embedded text layer.", markdown_text)
+        self.assertIn("Scanned page text.", markdown_text)
+        self.assertLess(
+            markdown_text.index("embedded text layer"),
+            markdown_text.index("Scanned page text"),
+        )
+        self.assertEqual(len(images), 1)
+        self.assertEqual(images[0]["pages"], [2])
+        self.assertNotIn("image_base64", images[0])
+
+
+class TestImageExtraction(unittest.TestCase):
+    def test_repeated_images_are_stored_once(self):
+        logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 16, 16), False)
+        logo.clear_with(100)
+
+        with tempfile.TemporaryDirectory() as directory:
+            pdf_path = os.path.join(directory, "paper.pdf")
+            with fitz.open() as pdf:
+                for _ in range(3):
+                    page = pdf.new_page()
+                    page.insert_image(fitz.Rect(10, 10, 40, 40), pixmap=logo)
+                pdf.save(pdf_path)
+
+            output_dir = os.path.join(directory, "images")
+            manifest = extract_images(pdf_path, output_dir)
+
+            self.assertEqual(len(manifest), 1)
+            self.assertEqual(manifest[0]["pages"], [1, 2, 3])
+            image_path = os.path.join(
+                output_dir, f"{manifest[0]['id']}.{manifest[0]['ext']}"
+            )
+            self.assertEqual(os.path.getsize(image_path), manifest[0]["size"])
+            self.assertEqual(load_manifest(output_dir), manifest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.llm.ratelimit import ProviderLimiter, TokenBucket, estimate_tokens
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(headers or {})
+
+
+def make_limiter(**kwargs):
+    options = dict(rpm=6000, tpm=10_000_000, max_concurrency=8, max_backoff=0.01)
+    options.update(kwargs)
+    return ProviderLimiter("test", **options)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_wait_time_reflects_budget(self):
+        bucket = TokenBucket(per_minute=60)
+        self.assertEqual(bucket.wait_time(60), 0)
+        bucket.take(60)
+        self.assertAlmostEqual(bucket.wait_time(1), 1.0, delta=0.05)
+        # Requests larger than the whole budget wait for a full bucket
+        self.assertAlmostEqual(bucket.wait_time(1000), 60.0, delta=0.1)
+
+    def test_estimate_tokens_counts_input_and_output(self):
+        self.assertEqual(estimate_tokens("a" * 4000), 1000 + 1000)
+
+
+class TestProviderLimiter(unittest.TestCase):
+    def test_retries_rate_limits_and_honors_retry_after(self):
+        limiter = make_limiter()
+        attempts = []
+
+        async def fn():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise FakeAPIError(429, {"retry-after-ms": "200"})
+            return "ok"
+
+        async def run():
+            return await limiter.call(fn, 100)
+
+        self.assertEqual(asyncio.run(run()), "ok")
+        self.assertEqual(len(attempts), 2)
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.2)
+        self.assertEqual(limiter.rate_limited, 1)
+        self.assertEqual(limiter.retries, 1)
+        # Halved from 4 by the 429, then grown by the successful retry
+        self.assertEqual(limiter.concurrency, 2.5)
+
+    def test_non_retryable_errors_fail_immediately(self):
+        limiter = make_limiter()
+        attempts = []
+
+        async def fn():
+            attempts.append(1)
+            raise FakeAPIError(400)
+
+        with self.assertRaises(FakeAPIError):
+            asyncio.run(limiter.call(fn, 100))
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual(limiter.failures, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_gives_up_after_max_retries(self):
+        limiter = make_limiter(max_retries=2)
+        attempts = []
+
+        async def fn():
+            attempts.append(1)
+            raise FakeAPIError(503)
+
+        with self.assertRaises(FakeAPIError):
+            asyncio.run(limiter.call(fn, 100))
+        self.assertEqual(len(attempts), 3)
+
+    def test_concurrency_limit_is_enforced_and_grows_on_success(self):
+        limiter = make_limiter(max_concurrency=4)
+        running = 0
+        peak = 0
+
+        async def fn():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        async def run():
+            await asyncio.gather(*(limiter.call(fn, 100) for _ in range(20)))
+
+        self.assertEqual(limiter.concurrency, 2)
+        asyncio.run(run())
+        self.assertLessEqual(peak, 4)
+        self.assertGreater(limiter.concurrency, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_token_budget_delays_requests(self):
+        # 6000 tokens per minute refills 100 per second
+        limiter = make_limiter(tpm=6000)
+
+        async def fn():
+            return time.monotonic()
+
+        async def run():
+            started = time.monotonic()
+            await limiter.call(fn, 6000)
+            second = await limiter.call(fn, 20)
+            return second - started
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.15)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,417 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.review_engine.dag import TaskCancelled
+from app.review_engine.orchestrator import ReviewEngine
+from app.review_engine.prompt import PROMPT, UPDATE_REVIEW_PROMPT
+from app.services.llm.health import ProviderHealth
+from app.services.llm.hedging import LatencyTracker
+from app.services.llm.registry import ReviewerRegistry
+
+
+class FakeReviewer:
+    def __init__(self, name, delay, fail=False, ratings=(6, 7)):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.initial_rating, self.updated_rating = ratings
+        self.updates = 0
+
+    async def review(self, paper_text, prompt, on_scores=None, on_usage=None):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        if on_scores is not None:
+            on_scores({"rating": self.initial_rating})
+        if on_usage is not None:
+            on_usage({"input_tokens": 100, "cached_tokens": 0, "output_tokens": 10})
+        return json.dumps({"summary": f"{self.name} initial", "rating": self.initial_rating})
+
+    async def updated_review(
+        self, paper_text, prompt, update_prompt, other_reviews, on_scores=None, on_usage=None
+    ):
+        await asyncio.sleep(self.delay)
+        self.updates += 1
+        if on_scores is not None:
+            on_scores({"rating": self.updated_rating})
+        if on_usage is not None:
+            on_usage({"input_tokens": 120, "cached_tokens": 100, "output_tokens": 10})
+        return json.dumps({"summary": f"{self.name} updated", "rating": self.updated_rating})
+
+
+async def fake_agreement(review1, review2):
+    return "0.5"
+
+
+async def fake_consensus(aggregated):
+    return {"summary": "consensus"}
+
+
+def make_engine(registry, **kwargs):
+    # One update round regardless of agreement, unless a test says otherwise
+    options = dict(
+        consensus_mode="llm",
+        max_rounds=1,
+        convergence_spread=None,
+        convergence_agreement=None,
+    )
+    options.update(kwargs)
+    return ReviewEngine("prompt", "update prompt", registry=registry, **options)
+
+
+class TestReviewStream(unittest.TestCase):
+    def setUp(self):
+        registry = ReviewerRegistry(
+            [FakeReviewer("slow", 0.05), FakeReviewer("fast", 0.0)]
+        )
+        self.engine = make_engine(registry)
+
+    def collect(self, engine):
+        async def run():
+            return [event async for event in engine.process_text_stream("paper")]
+
+        with patch(
+            "app.review_engine.orchestrator.get_agreement", fake_agreement
+        ), patch(
+            "app.review_engine.orchestrator.convert_to_openreview", fake_consensus
+        ):
+            return asyncio.run(run())
+
+    def test_reviews_stream_in_completion_order(self):
+        events = self.collect(self.engine)
+        reviews = [
+            (event["stage"], event["reviewer"])
+            for event in events
+            if event["event"] == "review"
+        ]
+        self.assertEqual(reviews[:2], [("initial", "fast"), ("initial", "slow")])
+        # Updates do not wait for a stage barrier, so their order may vary
+        self.assertCountEqual(reviews[2:], [("updated", "fast"), ("updated", "slow")])
+        kinds = [event["event"] for event in events]
+        self.assertEqual(kinds[-1], "done")
+        self.assertEqual(kinds.count("consensus"), 1)
+
+        result = events[-1]["result"]
+        # The final result keeps registry order regardless of finishing order
+        self.assertEqual(list(result["individual_reviews"]), ["slow", "fast"])
+        self.assertEqual(result["consensus_review"], {"summary": "consensus"})
+        self.assertEqual(result["updated_similarities"]["reviewers"], ["slow", "fast"])
+        self.assertEqual(len(result["updated_similarities"]["matrix"]), 2)
+        self.assertEqual(result["usage"]["updated"]["fast"]["cached_tokens"], 100)
+        self.assertTrue(
+            all(a["elapsed"] <= b["elapsed"] for a, b in zip(events, events[1:]))
+        )
+
+    def test_scores_arrive_before_their_review(self):
+        events = self.collect(self.engine)
+        kinds = [
+            (event["event"], event["reviewer"])
+            for event in events
+            if event["event"] in ("scores", "review") and event["stage"] == "initial"
+        ]
+        self.assertEqual(
+            kinds,
+            [
+                ("scores", "fast"),
+                ("review", "fast"),
+                ("scores", "slow"),
+                ("review", "slow"),
+            ],
+        )
+        scores = next(event for event in events if event["event"] == "scores")
+        self.assertEqual(scores["scores"], {"rating": 6})
+
+    def test_failed_reviewer_is_reported_without_stopping_the_stream(self):
+        registry = ReviewerRegistry(
+            [FakeReviewer("ok", 0.0), FakeReviewer("broken", 0.0, fail=True)]
+        )
+        engine = make_engine(registry)
+        events = self.collect(engine)
+
+        broken = next(
+            event
+            for event in events
+            if event["event"] == "review" and event["reviewer"] == "broken"
+        )
+        self.assertIn("provider down", broken["review"]["error"])
+        self.assertEqual(events[-1]["event"], "done")
+
+    def test_update_does_not_wait_for_a_straggler(self):
+        # The straggler's update needs only the fast review, so it runs
+        # alongside the straggler's initial review instead of after it
+        registry = ReviewerRegistry([FakeReviewer("slow", 0.2), FakeReviewer("fast", 0.0)])
+        events = self.collect(make_engine(registry))
+
+        self.assertLess(events[-1]["elapsed"], 0.35)
+        updated = [
+            event["reviewer"]
+            for event in events
+            if event["event"] == "review" and event["stage"] == "updated"
+        ]
+        self.assertCountEqual(updated, ["slow", "fast"])
+
+    def test_cancellation_leaking_from_a_reviewer_ends_the_stream(self):
+        reviewer = FakeReviewer("leaky", 0.0)
+
+        async def review(*args, **kwargs):
+            raise asyncio.CancelledError()
+
+        reviewer.review = review
+        engine = make_engine(ReviewerRegistry([reviewer, FakeReviewer("fast", 0.0)]))
+        with self.assertRaises(TaskCancelled):
+            asyncio.run(asyncio.wait_for(self._run(engine), 1))
+
+    def test_local_consensus_needs_no_llm_call(self):
+        engine = make_engine(self.engine.registry, consensus_mode="local")
+        with patch(
+            "app.review_engine.orchestrator.convert_to_openreview",
+            side_effect=AssertionError("LLM consensus called"),
+        ):
+            events = asyncio.run(self._run(engine))
+
+        result = events[-1]["result"]
+        self.assertEqual(result["consensus_review"].rating, 7)
+        self.assertEqual(result["consensus_statistics"]["rating"]["count"], 2)
+
+    def test_engine_accepts_the_prompt_models(self):
+        # The routes pass the prompt models, not strings
+        engine = ReviewEngine(
+            PROMPT,
+            UPDATE_REVIEW_PROMPT,
+            registry=self.engine.registry,
+            consensus_mode="local",
+            max_rounds=1,
+            convergence_spread=None,
+            convergence_agreement=None,
+        )
+        result = asyncio.run(engine.process_text("paper"))
+        self.assertEqual(list(result["individual_reviews"]), ["slow", "fast"])
+        self.assertGreater(result["compaction"]["slow"]["budget"], 0)
+
+    async def _run(self, engine):
+        return [event async for event in engine.process_text_stream("paper")]
+
+
+class TestDebate(unittest.TestCase):
+    def run_debate(self, reviewers, **kwargs):
+        options = dict(max_rounds=3, convergence_spread=0.1, convergence_agreement=None)
+        options.update(kwargs)
+        engine = make_engine(ReviewerRegistry(reviewers), **options)
+
+        async def run():
+            return [event async for event in engine.process_text_stream("paper")]
+
+        with patch("app.review_engine.orchestrator.convert_to_openreview", fake_consensus):
+            return asyncio.run(run())
+
+    def test_agreeing_reviewers_skip_the_update_round(self):
+        reviewers = [FakeReviewer("a", 0.0), FakeReviewer("b", 0.0)]
+        events = self.run_debate(reviewers)
+
+        self.assertFalse(any(event.get("stage") == "updated" for event in events))
+        self.assertEqual([reviewer.updates for reviewer in reviewers], [0, 0])
+        result = events[-1]["result"]
+        self.assertTrue(result["debate"]["converged"])
+        self.assertEqual(result["debate"]["rounds"], [])
+        self.assertEqual(result["updated_individual_reviews"], result["individual_reviews"])
+
+    def test_diverging_reviewers_debate_until_they_converge(self):
+        # Ratings 2 and 9 stay apart in the first update round; the
+        # reviewer moving from 2 to 8 then agrees with the other
+        stubborn = FakeReviewer("stubborn", 0.0, ratings=(9, 9))
+        moving = FakeReviewer("moving", 0.0, ratings=(2, 2))
+        original = moving.updated_review
+
+        async def updated_review(*args, **kwargs):
+            moving.updated_rating = 2 if moving.updates == 0 else 9
+            return await original(*args, **kwargs)
+
+        moving.updated_review = updated_review
+        events = self.run_debate([stubborn, moving])
+
+        stages = [
+            (event["stage"], event.get("round"), event["convergence"]["converged"])
+            for event in events
+            if event["event"] == "stage"
+        ]
+        self.assertEqual(
+            stages, [("initial", None, False), ("updated", 1, False), ("updated", 2, True)]
+        )
+        self.assertEqual(len(events[-1]["result"]["debate"]["rounds"]), 2)
+        self.assertEqual(events[-1]["result"]["usage"]["updated"]["moving"]["input_tokens"], 240)
+
+    def test_rounds_are_capped(self):
+        reviewers = [
+            FakeReviewer("high", 0.0, ratings=(9, 9)),
+            FakeReviewer("low", 0.0, ratings=(2, 2)),
+        ]
+        events = self.run_debate(reviewers)
+        self.assertEqual([reviewer.updates for reviewer in reviewers], [3, 3])
+        self.assertFalse(events[-1]["result"]["debate"]["converged"])
+
+    def test_update_round_starts_before_the_convergence_test(self):
+        # The slow reviewer's update needs only the fast review, so it runs
+        # alongside the slow initial review instead of after the round
+        def reviewers():
+            return [
+                FakeReviewer("fast", 0.0, ratings=(9, 9)),
+                FakeReviewer("slow", 0.2, ratings=(2, 2)),
+            ]
+
+        events = self.run_debate(reviewers(), max_rounds=1)
+        self.assertLess(events[-1]["elapsed"], 0.35)
+        self.assertEqual(len(events[-1]["result"]["debate"]["rounds"]), 1)
+
+        events = self.run_debate(reviewers(), max_rounds=1, speculative_rounds=False)
+        self.assertGreaterEqual(events[-1]["elapsed"], 0.4)
+
+    def test_speculative_update_is_cancelled_once_reviewers_converge(self):
+        slow = FakeReviewer("slow", 0.1)
+        cancelled = []
+
+        async def updated_review(*args, **kwargs):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(slow.name)
+                raise
+            return json.dumps({"summary": "never", "rating": 7})
+
+        slow.updated_review = updated_review
+        reviewers = [FakeReviewer("a", 0.0), FakeReviewer("b", 0.0), slow]
+        events = self.run_debate(reviewers)
+
+        self.assertEqual(cancelled, ["slow"])
+        self.assertLess(events[-1]["elapsed"], 0.5)
+        self.assertFalse(any(event.get("stage") == "updated" for event in events))
+        result = events[-1]["result"]
+        self.assertTrue(result["debate"]["converged"])
+        self.assertEqual(result["updated_individual_reviews"], result["individual_reviews"])
+
+
+class TestQuorum(unittest.TestCase):
+    def setUp(self):
+        self.registry = ReviewerRegistry(
+            [
+                FakeReviewer("a", 0.0),
+                FakeReviewer("b", 0.0),
+                FakeReviewer("late", 0.3),
+            ]
+        )
+
+    def make_engine(self, **kwargs):
+        options = dict(
+            consensus_mode="local", max_rounds=0, quorum=2, quorum_timeout=0.05
+        )
+        options.update(kwargs)
+        return make_engine(self.registry, **options)
+
+    def test_partial_result_is_sent_once_the_quorum_is_met(self):
+        engine = self.make_engine()
+
+        async def run():
+            return [event async for event in engine.process_text_stream("paper")]
+
+        events = asyncio.run(run())
+        partial = next(event for event in events if event["event"] == "partial")
+        self.assertLess(partial["elapsed"], 0.2)
+        self.assertTrue(partial["result"]["partial"])
+        self.assertEqual(partial["result"]["missing"], ["late"])
+        self.assertEqual(list(partial["result"]["individual_reviews"]), ["a", "b"])
+        self.assertEqual(partial["result"]["consensus_statistics"]["rating"]["count"], 2)
+
+        done = events[-1]
+        self.assertEqual(done["event"], "done")
+        self.assertFalse(done["result"]["partial"])
+        self.assertEqual(list(done["result"]["individual_reviews"]), ["a", "b", "late"])
+
+    def test_late_reviews_are_merged_after_returning(self):
+        engine = self.make_engine()
+        completed = []
+
+        async def record(result):
+            completed.append(result)
+
+        async def run():
+            result = await engine.process_text("paper", on_complete=record)
+            self.assertEqual(completed, [])
+            await asyncio.sleep(0.4)
+            return result
+
+        result = asyncio.run(run())
+        self.assertTrue(result["partial"])
+        self.assertEqual(len(completed), 1)
+        self.assertEqual(completed[0]["consensus_statistics"]["rating"]["count"], 3)
+
+    def test_background_reviews_are_capped(self):
+        engine = self.make_engine(max_background=1)
+        completed = []
+
+        async def record(result):
+            completed.append(result)
+
+        async def run():
+            first = await engine.process_text("paper", on_complete=record)
+            # The first review still runs in the background, so the second
+            # one waits for its complete result
+            second = await engine.process_text("paper", on_complete=record)
+            await asyncio.sleep(0.4)
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertTrue(first["partial"])
+        self.assertFalse(second["partial"])
+        self.assertEqual(len(completed), 1)
+
+    def test_no_partial_result_when_everyone_is_on_time(self):
+        engine = self.make_engine(quorum_timeout=1.0)
+
+        async def run():
+            return [event async for event in engine.process_text_stream("paper")]
+
+        events = asyncio.run(run())
+        self.assertFalse(any(event["event"] == "partial" for event in events))
+        self.assertFalse(events[-1]["result"]["partial"])
+
+
+class TestReviewerSelection(unittest.TestCase):
+    def reviewer(self, name, median, circuit_open=False):
+        reviewer = FakeReviewer(name, 0.0)
+        reviewer.latency = LatencyTracker(min_samples=1)
+        reviewer.latency.record(median)
+        reviewer.health = ProviderHealth(name, min_calls=1, cooldown=60)
+        if circuit_open:
+            reviewer.health.record_failure()
+        return reviewer
+
+    def test_fastest_healthy_reviewers_are_picked(self):
+        registry = ReviewerRegistry(
+            [
+                self.reviewer("slow", 30.0),
+                self.reviewer("down", 1.0, circuit_open=True),
+                self.reviewer("fast", 5.0),
+                self.reviewer("faster", 2.0),
+            ]
+        )
+        engine = make_engine(registry, consensus_mode="local", reviewers_per_paper=2)
+
+        async def run():
+            return [event async for event in engine.process_text_stream("paper")]
+
+        result = asyncio.run(run())[-1]["result"]
+        self.assertEqual(list(result["individual_reviews"]), ["fast", "faster"])
+        self.assertEqual(result["updated_similarities"]["reviewers"], ["fast", "faster"])
+        self.assertEqual([reviewer.updates for reviewer in registry], [0, 0, 1, 1])
+
+    def test_every_reviewer_is_used_by_default(self):
+        registry = ReviewerRegistry([self.reviewer("a", 1.0), self.reviewer("b", 2.0)])
+        self.assertEqual(make_engine(registry)._select_reviewers(), ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
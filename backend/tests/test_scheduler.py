@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from app.review_engine.scheduler import BULK, INTERACTIVE, ReviewScheduler, SchedulerFull
+
+
+class TestReviewScheduler(unittest.TestCase):
+    def test_concurrency_cap_and_priority_order(self):
+        async def run():
+            scheduler = ReviewScheduler(max_concurrent=1, max_queue=10, bulk_max_queue=10)
+            order = []
+            running = 0
+            peak = 0
+
+            def job(name):
+                async def fn():
+                    nonlocal running, peak
+                    running += 1
+                    peak = max(peak, running)
+                    await asyncio.sleep(0.01)
+                    order.append(name)
+                    running -= 1
+                    return name
+
+                return fn
+
+            futures = [scheduler.submit(job("first"), INTERACTIVE)]
+            futures.append(scheduler.submit(job("bulk"), BULK))
+            futures.append(scheduler.submit(job("interactive"), INTERACTIVE))
+            results = await asyncio.gather(*futures)
+            await scheduler.shutdown()
+            return results, order, peak
+
+        results, order, peak = asyncio.run(run())
+        self.assertEqual(results, ["first", "bulk", "interactive"])
+        self.assertEqual(order, ["first", "interactive", "bulk"])
+        self.assertEqual(peak, 1)
+
+    def test_admission_control_rejects_when_queue_is_deep(self):
+        async def run():
+            scheduler = ReviewScheduler(max_concurrent=1, max_queue=2, bulk_max_queue=1)
+            blocker = asyncio.Event()
+
+            async def fn():
+                await blocker.wait()
+
+            scheduler.submit(fn)
+            await asyncio.sleep(0)  # let the worker pick up the first job
+            scheduler.submit(fn, BULK)
+            with self.assertRaises(SchedulerFull) as bulk_rejected:
+                scheduler.submit(fn, BULK)
+            scheduler.submit(fn, INTERACTIVE)
+            with self.assertRaises(SchedulerFull):
+                scheduler.submit(fn, INTERACTIVE)
+            blocker.set()
+            await scheduler.shutdown()
+            return bulk_rejected.exception
+
+        rejected = asyncio.run(run())
+        self.assertGreaterEqual(rejected.retry_after, 1)
+
+    def test_cancelling_the_future_stops_the_review(self):
+        async def run():
+            scheduler = ReviewScheduler(max_concurrent=1, max_queue=10, bulk_max_queue=10)
+            stopped = asyncio.Event()
+
+            async def slow():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    stopped.set()
+                    raise
+
+            async def fast():
+                return "next"
+
+            future = scheduler.submit(slow)
+            await asyncio.sleep(0.01)
+            future.cancel()
+            await asyncio.wait_for(stopped.wait(), 1)
+            # The worker is free for the next review
+            result = await asyncio.wait_for(scheduler.run(fast), 1)
+            await scheduler.shutdown()
+            return result
+
+        self.assertEqual(asyncio.run(run()), "next")
+
+    def test_worker_survives_a_review_that_ends_cancelled(self):
+        async def run():
+            scheduler = ReviewScheduler(max_concurrent=1, max_queue=10, bulk_max_queue=10)
+
+            async def cancelled():
+                raise asyncio.CancelledError()
+
+            async def fast():
+                return "next"
+
+            first = scheduler.submit(cancelled)
+            second = scheduler.submit(fast)
+            await asyncio.wait({first})
+            result = await asyncio.wait_for(second, 1)
+            await scheduler.shutdown()
+            return first.cancelled(), result
+
+        self.assertEqual(asyncio.run(run()), (True, "next"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.services.llm.base import ScoreExtractor
+
+
+class TestScoreExtractor(unittest.TestCase):
+    def setUp(self):
+        self.reported = []
+        self.extractor = ScoreExtractor(self.reported.append)
+
+    def test_scores_reported_as_soon_as_complete(self):
+        chunks = [
+            '```json\n{\n  "summary": "A pap',
+            'er about X",\n  "soundness": 3,\n  "presen',
+            'tation": 4,\n  "contribution": 2,\n  "strengths": "..."',
+        ]
+        for chunk in chunks:
+            self.extractor.feed(chunk)
+
+        self.assertEqual(
+            self.reported,
+            [
+                {"soundness": 3},
+                {"soundness": 3, "presentation": 4, "contribution": 2},
+            ],
+        )
+
+    def test_number_split_across_chunks_is_not_truncated(self):
+        self.extractor.feed('{"rating": 1')
+        self.assertEqual(self.reported, [])
+        self.extractor.feed("0, ")
+        self.assertEqual(self.extractor.scores, {"rating": 10})
+
+    def test_tolerates_quoted_values_and_number_at_end(self):
+        self.extractor.feed('{"Soundness": "2", "rating": 5.5')
+        self.assertEqual(self.extractor.scores, {"soundness": 2})
+        scores = self.extractor.finish()
+        self.assertEqual(scores, {"soundness": 2, "rating": 5.5})
+
+    def test_confidence_is_reported_with_the_scores(self):
+        self.extractor.feed('{"rating": 6, "confidence": 4, ')
+        self.assertEqual(self.reported[-1], {"rating": 6, "confidence": 4})
+
+    def test_finish_with_unstreamed_text(self):
+        scores = self.extractor.finish('{"soundness": 1, "presentation": 2}')
+        self.assertEqual(scores, {"soundness": 1, "presentation": 2})
+        self.assertEqual(len(self.reported), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+import unittest
+from abc import ABC, abstractmethod
+from pathlib import Path
+from unittest import mock
+
+from app.services import storage
+from app.services.storage import MemoryJobStore, SQLiteJobStore
+
+
+class JobStoreTests(ABC):
+    """Behaviour shared by every job store backend."""
+
+    @abstractmethod
+    def make_store(self, directory):
+        """Create the store under test, keeping any files in directory."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self._tmp.name)
+        self.store = self.make_store(self.directory)
+        self.patches = [
+            mock.patch.object(storage, "_job_store", self.store),
+            mock.patch.object(storage, "STORAGE_DIR", self.directory),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self._tmp.cleanup()
+
+    def test_job_lifecycle(self):
+        job_id = storage.create_job("paper.pdf")
+        self.assertEqual(storage.get_job(job_id)["status"], "pending")
+
+        storage.update_job_status(job_id, "completed", markdown_path="paper.md")
+        job = storage.get_job(job_id)
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["markdown_path"], "paper.md")
+        self.assertIsNotNone(job["completed_at"])
+        self.assertEqual(storage.get_job("missing"), {"status": "not_found"})
+
+    def test_transition_only_from_expected_status(self):
+        job_id = storage.create_job("paper.pdf")
+        self.assertFalse(
+            storage.transition_job_status(job_id, ["completed"], "reviewing")
+        )
+        storage.update_job_status(job_id, "completed")
+        self.assertTrue(
+            storage.transition_job_status(job_id, ["completed"], "reviewing")
+        )
+        self.assertFalse(
+            storage.transition_job_status(job_id, ["completed"], "reviewing")
+        )
+        self.assertEqual(self.store.list_ids(status="reviewing"), [job_id])
+
+    def test_expired_jobs_are_evicted_with_their_files(self):
+        with mock.patch.object(storage.time, "time", return_value=time.time() - 100):
+            old_job = storage.create_job("old.pdf")
+        new_job = storage.create_job("new.pdf")
+        storage.update_job_status(old_job, "completed")
+        storage.save_markdown(old_job, "old")
+        storage.save_markdown(new_job, "new")
+
+        self.assertEqual(storage.evict_expired_jobs(ttl_seconds=50), 1)
+        self.assertEqual(storage.get_job(old_job), {"status": "not_found"})
+        self.assertFalse((self.directory / f"{old_job}.md").exists())
+        self.assertEqual(storage.load_markdown(new_job), "new")
+
+    def test_jobs_in_progress_are_not_evicted(self):
+        with mock.patch.object(storage.time, "time", return_value=time.time() - 100):
+            reviewing_job = storage.create_job("reviewing.pdf")
+            pending_job = storage.create_job("pending.pdf")
+        storage.update_job_status(reviewing_job, "reviewing")
+
+        self.assertEqual(storage.evict_expired_jobs(ttl_seconds=50), 0)
+        self.assertEqual(storage.get_job(reviewing_job)["status"], "reviewing")
+        self.assertEqual(storage.get_job(pending_job)["status"], "pending")
+
+        storage.update_job_status(reviewing_job, "reviewed")
+        self.assertEqual(storage.evict_expired_jobs(ttl_seconds=50), 1)
+        self.assertEqual(storage.get_job(reviewing_job), {"status": "not_found"})
+
+    def test_partial_result_does_not_replace_the_complete_one(self):
+        job_id = storage.create_job("paper.pdf")
+        # The late reviews finished before the partial result was saved
+        storage.save_review_result(job_id, {"partial": False, "rating": 7})
+        storage.save_review_result(job_id, {"partial": True, "rating": 6})
+        self.assertEqual(storage.load_review_result(job_id)["rating"], 7)
+
+        other_job = storage.create_job("other.pdf")
+        storage.save_review_result(other_job, {"partial": True, "rating": 6})
+        storage.save_review_result(other_job, {"partial": False, "rating": 7})
+        self.assertEqual(storage.load_review_result(other_job)["rating"], 7)
+
+
+class TestMemoryJobStore(JobStoreTests, unittest.TestCase):
+    def make_store(self, directory):
+        return MemoryJobStore()
+
+
+class TestSQLiteJobStore(JobStoreTests, unittest.TestCase):
+    def make_store(self, directory):
+        return SQLiteJobStore(os.path.join(directory, "jobs.sqlite3"))
+
+    def test_jobs_are_shared_between_store_instances(self):
+        job_id = storage.create_job("paper.pdf")
+        other_worker = SQLiteJobStore(os.path.join(self.directory, "jobs.sqlite3"))
+        self.assertEqual(other_worker.get(job_id)["filename"], "paper.pdf")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+
+from fastapi import UploadFile
+
+from app.services.uploads import UploadTooLarge, spool_upload
+
+
+class TestSpoolUpload(unittest.TestCase):
+    def test_upload_is_streamed_to_disk_and_hashed(self):
+        content = b"%PDF-1.7\n" + os.urandom(10_000)
+        with tempfile.TemporaryDirectory() as directory:
+            upload = UploadFile(io.BytesIO(content), filename="paper.pdf")
+            spooled = asyncio.run(
+                spool_upload(upload, directory, max_bytes=20_000, chunk_size=1024)
+            )
+
+            self.assertEqual(spooled.size, len(content))
+            self.assertEqual(spooled.sha256, hashlib.sha256(content).hexdigest())
+            with open(spooled.path, "rb") as f:
+                self.assertEqual(f.read(), content)
+
+    def test_oversized_upload_is_rejected_and_removed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            upload = UploadFile(io.BytesIO(b"x" * 5000), filename="paper.pdf")
+            with self.assertRaises(UploadTooLarge):
+                asyncio.run(
+                    spool_upload(upload, directory, max_bytes=4096, chunk_size=1024)
+                )
+            self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()